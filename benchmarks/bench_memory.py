@@ -0,0 +1,51 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+"""Measures the memory held per property by a loaded project.
+
+Usage: python benchmarks/bench_memory.py [property count]
+"""
+
+from __future__ import annotations
+
+import gc
+import json
+import sys
+import tracemalloc
+
+from mavsec.project import Project
+from synthetic import synthetic_project
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    text = json.dumps(synthetic_project(count).to_dict())
+    gc.collect()
+
+    tracemalloc.start()
+    # Parse inside the window so the strings are fresh objects, as when loading a file
+    proj = Project.from_dict(json.loads(text))
+    gc.collect()
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{len(proj.properties)} properties: {held / count:.0f} bytes/property held, "
+          f"{peak / count:.0f} bytes/property peak while loading")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+"""Times loading, saving and emitting synthetic projects, and records the results.
+
+Each run is appended to a JSON Lines results file with the commit it was run on, and compared
+with the last run of the same benchmarks, so a regression between commits shows up as a
+slower time.
+
+Usage: python benchmarks/bench_suite.py [options]
+       python benchmarks/bench_suite.py --help
+"""
+
+from __future__ import annotations
+from typing import Callable, Iterator
+
+import argparse
+import datetime
+import gc
+import json
+import pathlib
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from mavsec.project import Project
+from synthetic import parse_mix, synthetic_project
+
+
+FORMATS = ("yaml", "toml", "json")
+"""The project file formats timed."""
+
+MIN_CHANGE = 0.002
+"""Changes smaller than this many seconds are timer noise, not regressions."""
+
+DEFAULT_RESULTS = pathlib.Path(__file__).parent.joinpath("results.jsonl")
+"""The results file used unless --results is given."""
+
+
+def _best(func: Callable[[], object], repeat: int) -> float:
+    """Times a function, returning the fastest of repeat runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _cases(proj: Project, tmp: pathlib.Path) -> Iterator[tuple[str, Callable[[], object]]]:
+    data = proj.to_dict()
+    yield "to_dict", proj.to_dict
+    yield "from_dict", lambda: Project.from_dict(data)
+
+    for fmt in FORMATS:
+        path = tmp.joinpath(f"project.{fmt}")
+        yield f"{fmt}/to_file", lambda path=path: proj.to_file(path)
+        # Without the cache, so the parser is what is timed
+        yield f"{fmt}/from_file", lambda path=path: Project.from_file(path, use_cache=False)
+
+    # Only some property types can be converted to SVP
+    emittable = Project(proj.info, [prop for prop in proj.properties if prop.ptype.flow])
+    tcl = tmp.joinpath("project.tcl")
+    yield "tcl", lambda: emittable.to_tcl(tcl)
+
+
+def run(args: argparse.Namespace) -> dict[str, float]:
+    """Runs every benchmark.
+
+    Returns:
+        dict[str, float]: The best time in seconds of each benchmark, by name.
+    """
+    mix = None if args.mix is None else parse_mix(args.mix)
+    results = {}
+    for count in args.count:
+        proj = synthetic_project(
+            count, args.seed, mix, args.extra_meta, args.preconditions, args.terms
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, func in _cases(proj, pathlib.Path(tmp)):
+                if args.only and not any(part in name for part in args.only):
+                    continue
+                key = f"{count}/{name}"
+                results[key] = _best(func, args.repeat)
+                print(f"{key:<24}{results[key]:>9.3f}s", flush=True)
+    return results
+
+
+def _commit() -> str:
+    """Gets the commit being benchmarked, marked dirty if the sources have been changed."""
+    repo = pathlib.Path(__file__).parent
+    try:
+        rev = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=repo, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "diff", "--quiet", "HEAD", "--", "../src"], cwd=repo
+        ).returncode != 0
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{rev}-dirty" if dirty else rev
+
+
+def _previous(path: pathlib.Path, params: dict) -> dict | None:
+    """Finds the last recorded run with the same parameters on the same Python."""
+    last = None
+    try:
+        with open(path, "r") as file:
+            for line in file:
+                record = json.loads(line)
+                if record["params"] == params and record["python"] == platform.python_version():
+                    last = record
+    except (OSError, ValueError, KeyError):
+        pass
+    return last
+
+
+def compare(results: dict[str, float], previous: dict, threshold: float) -> list[str]:
+    """Compares a run with an earlier one.
+
+    Args:
+        results (dict[str, float]): The times of this run.
+        previous (dict): The earlier record from the results file.
+        threshold (float): The fraction a time must grow by to be a regression.
+
+    Returns:
+        list[str]: The benchmarks which regressed.
+    """
+    print(f"\nCompared with {previous['commit']} ({previous['time']}):")
+    regressed = []
+    for key, secs in results.items():
+        old = previous["results"].get(key)
+        if old is None or old <= 0:
+            continue
+        change = secs / old - 1
+        flag = ""
+        if abs(secs - old) < MIN_CHANGE:
+            pass
+        elif change > threshold:
+            flag = "  SLOWER"
+            regressed.append(key)
+        elif change < -threshold:
+            flag = "  faster"
+        print(f"{key:<24}{old:>9.3f}s -> {secs:>7.3f}s {change:>+7.1%}{flag}")
+    return regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, nargs="+", default=[1_000, 10_000],
+                        help="the property counts of the projects (default: 1000 10000)")
+    parser.add_argument("--mix", help="the property type weights, e.g. SecureKey=2,"
+                        "SecureKeyGen=1 (default: SecureKey and SecureInternalStorage)")
+    parser.add_argument("--extra-meta", type=int, default=0,
+                        help="unused meta entries added to each property")
+    parser.add_argument("--preconditions", type=int, default=2,
+                        help="preconditions per property")
+    parser.add_argument("--terms", type=int, default=1, help="&& terms per precondition")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="runs of each benchmark")
+    parser.add_argument("--only", nargs="+", help="only run benchmarks whose name contains one "
+                        "of these (e.g. yaml tcl)")
+    parser.add_argument("--results", type=pathlib.Path, default=DEFAULT_RESULTS,
+                        help=f"the results file (default: {DEFAULT_RESULTS.name})")
+    parser.add_argument("--no-record", action="store_true",
+                        help="don't append this run to the results file")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="slowdown reported as a regression (default: 0.1, i.e. 10%%)")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="exit with status 1 if a benchmark regressed")
+    args = parser.parse_args()
+
+    params = {
+        "count": args.count, "mix": args.mix, "extra_meta": args.extra_meta,
+        "preconditions": args.preconditions, "terms": args.terms, "seed": args.seed,
+        "only": args.only,
+    }
+    results = run(args)
+
+    previous = _previous(args.results, params)
+    regressed = [] if previous is None else compare(results, previous, args.threshold)
+
+    if not args.no_record:
+        record = {
+            "commit": _commit(),
+            "time": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "params": params,
+            "results": results,
+        }
+        with open(args.results, "a") as file:
+            file.write(json.dumps(record) + "\n")
+
+    if regressed and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
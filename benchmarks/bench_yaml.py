@@ -0,0 +1,72 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+"""Compares YAML project load/save through libyaml and pure Python.
+
+Usage: python benchmarks/bench_yaml.py [property count]
+"""
+
+from __future__ import annotations
+
+import pathlib
+import sys
+import tempfile
+import time
+
+import yaml
+
+from mavsec.project import Project
+from synthetic import synthetic_project
+
+
+def _time(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    proj = synthetic_project(count)
+    data = proj.to_dict()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fast = pathlib.Path(tmp, "fast.yaml")
+        slow = pathlib.Path(tmp, "slow.yaml")
+
+        def slow_save() -> None:
+            with open(slow, "w") as file:
+                yaml.dump(data, file, Dumper=yaml.SafeDumper)
+
+        def slow_load() -> None:
+            with open(slow, "r") as file:
+                Project.from_dict(yaml.load(file, Loader=yaml.SafeLoader))
+
+        save = (_time(slow_save), _time(lambda: proj.to_yaml(fast)))
+        load = (_time(slow_load), _time(lambda: Project.from_yaml(fast)))
+
+        size = fast.stat().st_size / 2**20
+        identical = fast.read_bytes() == slow.read_bytes()
+
+    print(f"{count} properties, {size:.1f} MiB of YAML, libyaml output identical: {identical}")
+    print(f"{'':6}{'python':>10}{'libyaml':>10}{'speedup':>10}")
+    for name, (py, c) in (("save", save), ("load", load)):
+        print(f"{name:6}{py:>9.2f}s{c:>9.2f}s{py / c:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+"""Deterministic synthetic projects for benchmarking."""
+
+from __future__ import annotations
+
+import random
+
+from mavsec.project import Project, ProjectInfo
+from mavsec.properties import (
+    AnyRtlPath, Property, PropertyType, SecureKeyProperty, SecureInternalStorageProperty
+)
+
+
+BUSES = ["@OUTPUTS", "prdata", "pwdata"]
+"""The public buses the properties are checked against."""
+
+_SHAPES = {
+    SecureKeyProperty.name: ("Key", "u_core", "key"),
+    SecureInternalStorageProperty.name: ("Storage", "u_mem", "data"),
+}
+"""The name, instance and signal prefixes of each property type's properties."""
+
+
+def parse_mix(text: str) -> dict[str, float]:
+    """Parses a property type mix such as ``SecureKey=2,SecureKeyIntegrity=1``.
+
+    Args:
+        text (str): Comma separated property type names, each with an optional weight.
+
+    Returns:
+        dict[str, float]: The weight of each property type, by name.
+    """
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def _meta(ptype: PropertyType, i: int, bus: str) -> dict:
+    _, inst, sig = _SHAPES.get(ptype.name, (ptype.name, "u_blk", "sig"))
+    meta: dict = {}
+    for key, mtype in ptype.meta.items():
+        if key == "public_bus":
+            meta[key] = bus
+        elif mtype == AnyRtlPath:
+            meta[key] = f"{inst}{i % 64}.{sig}{i}"
+        elif mtype is int:
+            meta[key] = 128 if key.startswith("key") else 32
+        else:
+            meta[key] = f"{key} {i}"
+    return meta
+
+
+def synthetic_project(
+            count: int,
+            seed: int = 0,
+            mix: dict[str, float] | None = None,
+            extra_meta: int = 0,
+            preconditions: int = 2,
+            terms: int = 1
+        ) -> Project:
+    """Creates a project of synthetic properties.
+
+    Args:
+        count (int): The number of properties.
+        seed (int): The seed of the random choices, the same arguments always give the same
+            project.
+        mix (dict[str, float] | None): The relative weight of each property type, by name.
+            Defaults to alternating SecureKey and SecureInternalStorage properties.
+        extra_meta (int): The number of meta entries added to each property on top of the ones
+            its type needs.
+        preconditions (int): The number of preconditions of each property.
+        terms (int): The number of ``&&`` terms in each precondition.
+
+    Returns:
+        Project: The project.
+    """
+    rng = random.Random(seed)
+    ptypes = [] if mix is None else [PropertyType.get_type(name) for name in mix]
+    weights = [] if mix is None else list(mix.values())
+    props = []
+    for i in range(count):
+        bus = rng.choice(BUSES)
+        preconds = [
+            " && ".join(f"pprot[{rng.randrange(3)}]=={rng.randrange(2)}" for _ in range(terms))
+            for _ in range(preconditions)
+        ]
+        if mix is None:
+            ptype = SecureKeyProperty if i % 2 else SecureInternalStorageProperty
+        else:
+            ptype = rng.choices(ptypes, weights)[0]
+
+        label = _SHAPES.get(ptype.name, (ptype.name,))[0]
+        meta = _meta(ptype, i, bus)
+        for extra in range(extra_meta):
+            meta[f"note{extra}"] = f"u_dbg{i % 64}.trace{extra}"
+        props.append(Property(
+            f"{label} {i}", f"{label} {i} is never visible on {bus}", meta, ptype, preconds
+        ))
+
+    return Project(ProjectInfo(f"synthetic_{count}", "1.0.0", "A synthetic project"), props)
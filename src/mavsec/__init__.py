@@ -18,9 +18,7 @@
 
 from __future__ import annotations
 
-from PySide6 import QtWidgets
 import sys
-from mavsec._gui import MavSecMainWindow
 
 import re
 
@@ -36,6 +34,10 @@ version_info = [int(x) if x.isdigit() else x for x in re.split(r"\.|-", __versio
 # GUI Entry Point
 #####################################################################################
 def gui():
+    # Qt is only imported here so that headless use of mavsec never loads PySide6
+    from PySide6 import QtWidgets
+    from mavsec._gui import MavSecMainWindow
+
     app = QtWidgets.QApplication(sys.argv)
 
     window = MavSecMainWindow()
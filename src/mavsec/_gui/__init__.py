@@ -17,23 +17,32 @@
 #####################################################################################
 
 from __future__ import annotations
+from typing import Any
+
 import pathlib
 
-from PySide6.QtWidgets import QMainWindow, QTabWidget, QFileDialog, QToolBar
+from PySide6.QtWidgets import (
+    QMainWindow, QTabWidget, QFileDialog, QToolBar, QMessageBox, QLineEdit
+)
 from PySide6 import QtGui, QtCore
 
 import webbrowser
 
 from mavsec.project import Project
+from mavsec.rtl import DesignIndex, design_for
+from mavsec.validate import Severity
 
 from mavsec._gui.proj_tabs import ProjectTab, PropertyDock, ProjectInfoDock
 from mavsec._gui.menus import MenuBar, StatusBar
+from mavsec._gui.workers import FileTask
 
 FILE_FILTERS = [
-    "Project (*.yaml *.yml *.toml *.json)",
+    "Project (*.yaml *.yml *.toml *.json *.jsonl *.db *.sqlite)",
     "YAML (*.yaml *.yml)",
     "TOML (*.toml)",
-    "JSON (*.json)"
+    "JSON (*.json)",
+    "JSON Lines (*.jsonl)",
+    "Project store (*.db *.sqlite)",
 ]
 
 
@@ -41,13 +50,17 @@ FILE_FILTERS = [
 # Main Window
 ################################################################################################
 class MavSecMainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self) -> None:
         super().__init__()
         self.setObjectName(u"MavSecMainWindow")
         self.setWindowTitle("MavSec")
 
         self.resize(1920, 1080)
 
+        self._pool = QtCore.QThreadPool(self)
+        self._tasks: list[FileTask] = []
+        self._saving = 0
+
         self._statusBar = StatusBar(self)
         self.setStatusBar(self._statusBar)
 
@@ -64,6 +77,12 @@ class MavSecMainWindow(QMainWindow):
         self._project = ProjectInfoDock(self)
 
         self._properties = PropertyDock(self)
+        self._project.rtl_changed.connect(self._rtl_changed)
+
+        # Instrumentation of how often the current table is repainted because of edits
+        self._refresh_rate_timer = QtCore.QTimer(self)
+        self._refresh_rate_timer.timeout.connect(self._update_refresh_rate)
+        self._refresh_rate_timer.start(1000)
 
     # Menu Bar Actions
     ################################################################################################
@@ -71,6 +90,8 @@ class MavSecMainWindow(QMainWindow):
         self._menuBar.file.actionNew.triggered.connect(self._new_project)
         self._menuBar.file.actionOpen.triggered.connect(self._open_project)
         self._menuBar.file.actionSave.triggered.connect(self._save_project)
+        self._menuBar.file.actionSaveAs.triggered.connect(self._save_as_project)
+        self._menuBar.file.actionSaveAll.triggered.connect(self._save_all_projects)
         self._menuBar.file.actionExport.triggered.connect(self._export_project)
         self._menuBar.file.actionClose.triggered.connect(self._close_project)
         self._menuBar.file.actionQuit.triggered.connect(self._quit)
@@ -81,7 +102,7 @@ class MavSecMainWindow(QMainWindow):
         self._tabs.setCurrentIndex(tab_idx)
 
     def _open_project(self) -> None:
-        filename, ok = QFileDialog.getOpenFileName(
+        filenames, ok = QFileDialog.getOpenFileNames(
             self,
             "Open Project",
             ".",
@@ -90,9 +111,11 @@ class MavSecMainWindow(QMainWindow):
         if not ok:
             return
 
-        proj = Project.from_file(filename)
-        proj.info.proj_file = filename
+        # Each project is parsed on its own worker, so they are loaded concurrently
+        for filename in filenames:
+            self.open_file(filename)
 
+    def _add_project_tab(self, proj: Project) -> None:
         proj_tab = ProjectTab(self._tabs, proj, self._properties)
         tab_idx = self._tabs.addTab(proj_tab, proj.info.name)
         self._tabs.setCurrentIndex(tab_idx)
@@ -104,9 +127,6 @@ class MavSecMainWindow(QMainWindow):
 
         self.save_tab(tab)
 
-        t_idx = self._tabs.currentIndex()
-        self._tabs.setTabText(t_idx, tab._proj.info.name)
-
     def _save_as_project(self) -> None:
         tab = self._tabs.currentWidget()
         if not isinstance(tab, ProjectTab):
@@ -115,9 +135,10 @@ class MavSecMainWindow(QMainWindow):
         self.save_tab_as(tab)
 
     def _save_all_projects(self) -> None:
+        # Each save is its own task, so the projects are written concurrently
         for tab_idx in range(self._tabs.count()):
             tab = self._tabs.widget(tab_idx)
-            if not isinstance(tab, ProjectTab):
+            if not isinstance(tab, ProjectTab) or not tab.is_dirty():
                 continue
 
             self.save_tab(tab)
@@ -137,13 +158,18 @@ class MavSecMainWindow(QMainWindow):
         if not ok:
             return
 
-        tab.get_proj().to_tcl(filename)
+        try:
+            tab.get_proj().to_tcl(filename, design=tab.design)
+        except (OSError, ValueError, NotImplementedError) as error:
+            QMessageBox.warning(self, "Export Project", f"Export failed:\n{error}")
 
     def _close_project(self) -> None:
         self._tabs.removeTab(self._tabs.currentIndex())
 
     def _quit(self) -> None:
         self._save_all_projects()
+        # Don't exit part way through writing a file
+        self._pool.waitForDone()
 
         self.close()
 
@@ -168,31 +194,72 @@ class MavSecMainWindow(QMainWindow):
             return
 
         tab.activate()
+        self._filter.setText(tab.get_model().filter_text())
+        self._properties.set_design(tab.design)
+        # Picks up any RTL files edited since the tab was last shown
+        self.load_design(tab)
         self._project.setDisabled(False)
         self._project.set_proj(tab._proj)
 
         self._prev_tab = tab
 
+    def _update_refresh_rate(self) -> None:
+        tab = self._tabs.currentWidget()
+        if isinstance(tab, ProjectTab):
+            self._statusBar.set_refresh_rate(tab.get_model().refresh_rate())
+        else:
+            self._statusBar.set_refresh_rate(0)
+
     def _setup_toolbar(self) -> None:
         self._new_property.triggered.connect(self._new_property_action)
         self._remove_property.triggered.connect(self._remove_property_action)
+        self._check_properties.triggered.connect(self._check_properties_action)
+        self._filter.textChanged.connect(self._filter_changed)
+
+    def _filter_changed(self, text: str) -> None:
+        tab = self._tabs.currentWidget()
+        if not isinstance(tab, ProjectTab):
+            return
+
+        tab.set_filter(text)
+        self._statusBar.showMessage(
+            f"{tab.get_model().rowCount()} of {len(tab.get_proj().properties)} properties", 5000
+        )
 
     def _new_property_action(self) -> None:
         tab = self._tabs.currentWidget()
         if not isinstance(tab, ProjectTab):
             return
 
-        tab.insertRow(tab.rowCount())
+        tab.insert_property()
 
     def _remove_property_action(self) -> None:
         tab = self._tabs.currentWidget()
         if not isinstance(tab, ProjectTab):
             return
 
-        tab.removeRow(tab.currentRow())
+        tab.remove_property(tab.current_row())
 
     def _check_properties_action(self) -> None:
-        raise NotImplementedError("Check Properties Action not implemented yet.")
+        tab = self._tabs.currentWidget()
+        if not isinstance(tab, ProjectTab):
+            return
+
+        diagnostics = tab.validator.check(tab.get_proj())
+        errors = sum(diag.severity is Severity.ERROR for diag in diagnostics)
+        self._statusBar.showMessage(
+            f"{errors} errors and {len(diagnostics) - errors} warnings "
+            f"({tab.validator.checked} properties checked)"
+        )
+
+        if not diagnostics:
+            return
+
+        shown = 50
+        text = "\n".join(str(diag) for diag in diagnostics[:shown])
+        if len(diagnostics) > shown:
+            text += f"\n... and {len(diagnostics) - shown} more"
+        QMessageBox.warning(self, "Check Properties", text)
 
     # GUI Creation
     ################################################################################################
@@ -233,24 +300,142 @@ class MavSecMainWindow(QMainWindow):
                                  )
         self._toolbar.addAction(self._check_properties)
 
+        self._toolbar.addSeparator()
+
+        self._filter = QLineEdit(self._toolbar)
+        self._filter.setObjectName(u"propertyFilter")
+        self._filter.setPlaceholderText("Filter properties")
+        self._filter.setClearButtonEnabled(True)
+        self._filter.setMaximumWidth(400)
+        self._toolbar.addWidget(self._filter)
+
+    def _rtl_changed(self) -> None:
+        tab = self._tabs.currentWidget()
+        if isinstance(tab, ProjectTab):
+            self.load_design(tab)
+
+    # File Tasks
+    ################################################################################################
+    def start_task(self, task: FileTask) -> None:
+        task.signals.finished.connect(self._task_finished)
+        task.signals.failed.connect(self._task_failed)
+        task.signals.cancelled.connect(self._task_cancelled)
+
+        self._tasks.append(task)
+        self._statusBar.add_task(task)
+        self._pool.start(task)
+
+    def _task_stopped(self, task: FileTask) -> None:
+        self._tasks.remove(task)
+        self._statusBar.remove_task(task)
+        if task.on_done is not None:
+            task.on_done()
+
+    def _task_finished(self, task: FileTask, result: Any) -> None:
+        self._task_stopped(task)
+        if task.on_finished is not None:
+            task.on_finished(result)
+
+    def _task_failed(self, task: FileTask, error: str) -> None:
+        self._task_stopped(task)
+        QMessageBox.warning(self, "MavSec", f"{task.description} failed:\n{error}")
+
+    def _task_cancelled(self, task: FileTask) -> None:
+        self._task_stopped(task)
+        self._statusBar.showMessage(f"Cancelled: {task.description}", 5000)
+
     # Helper Functions
     ################################################################################################
+    def open_file(self, filename: str) -> None:
+        self.start_task(FileTask(
+            f"Opening {pathlib.Path(filename).name}",
+            lambda: _load_project(filename),
+            on_finished=self._add_project_tab,
+        ))
+
+    def load_design(self, tab: ProjectTab) -> None:
+        info = tab.get_proj().info
+        if not info.rtl_filelist:
+            self._design_loaded(tab, None)
+            return
+
+        filelist, proj_file, top = info.rtl_filelist, info.proj_file, info.rtl_top or None
+        # Only the RTL files which changed since the index was stored are scanned again
+        self.start_task(FileTask(
+            f"Indexing the RTL of {info.name}",
+            lambda: design_for(filelist, proj_file, top),
+            on_finished=lambda design: self._design_loaded(tab, design),
+        ))
+
+    def _design_loaded(self, tab: ProjectTab, design: DesignIndex | None) -> None:
+        tab.design = design
+        tab.validator.design = design
+        if self._tabs.currentWidget() is tab:
+            self._properties.set_design(design)
+
     def save_tab(self, tab: ProjectTab) -> None:
-        if tab.get_proj().info.proj_file is None:
+        proj = tab.get_proj()
+        filename = proj.info.proj_file
+        if filename is None:
             self.save_tab_as(tab)
-        else:
-            tab._proj.to_file(tab._proj.info.proj_file)
+            return
+
+        point = tab.save_point()
+
+        def saved(_: None) -> None:
+            tab.mark_saved(point)
+            t_idx = self._tabs.indexOf(tab)
+            if t_idx >= 0:
+                self._tabs.setTabText(t_idx, proj.info.name)
+            self._statusBar.showMessage(f"Saved {filename}", 5000)
+
+        def done() -> None:
+            tab.setDisabled(False)
+            self._set_saving(-1)
+
+        # The project can't be edited while it is being written
+        tab.setDisabled(True)
+        self._set_saving(1)
+        self.start_task(FileTask(
+            f"Saving {pathlib.Path(filename).name}",
+            lambda: proj.to_file(filename),
+            on_finished=saved,
+            on_done=done,
+            discard=False,
+        ))
+
+    def _set_saving(self, change: int) -> None:
+        # The docks edit the same objects the worker is writing, so they are also locked while
+        # any project is being saved. Their forms are disabled rather than the docks, which
+        # keep their own state for whether there is anything to edit.
+        self._saving += change
+        for dock in (self._project, self._properties):
+            dock.widget().setDisabled(self._saving > 0)
 
     def save_tab_as(self, tab: ProjectTab) -> None:
-        filename, ok = QFileDialog.getSaveFileName(
+        filename, selected = QFileDialog.getSaveFileName(
             self,
             "Save Project As",
             ".",
             ";;".join(FILE_FILTERS),
         )
 
-        if not ok:
+        if not filename:
             return
 
+        # The format is picked by the suffix, so take it from the filter if one wasn't typed
+        if not pathlib.Path(filename).suffix and "(*." in selected:
+            filename += selected.split("(*", 1)[1].split()[0].rstrip(")")
+
         tab._proj.info.proj_file = filename
-        tab.get_proj().to_file(filename)
+        self.save_tab(tab)
+
+
+def _load_project(filename: str) -> Project:
+    """Loads a project on a worker thread."""
+    # Properties are only created as the table shows them
+    proj = Project.from_file(filename, lazy=True)
+    # But the whole file is read here rather than on the GUI thread
+    len(proj.properties)
+    proj.info.proj_file = filename
+    return proj
@@ -18,10 +18,13 @@
 
 from __future__ import annotations
 
-from PySide6.QtWidgets import QStatusBar, QMenuBar, QMenu, QWidget
+from PySide6.QtWidgets import (
+    QStatusBar, QMenuBar, QMenu, QWidget, QProgressBar, QPushButton, QLabel
+)
 from PySide6 import QtGui
 
 from mavsec import _info
+from mavsec._gui.workers import FileTask
 
 
 ####################################################################################################
@@ -32,6 +35,56 @@ class StatusBar(QStatusBar):
         super().__init__(parent)
         self.setObjectName(u"statusBar")
 
+        self._tasks: list[FileTask] = []
+
+        # A busy indicator, since parsing a file doesn't report how far through it is
+        self._progress = QProgressBar(self)
+        self._progress.setRange(0, 0)
+        self._progress.setMaximumWidth(200)
+        self._progress.hide()
+        self.addPermanentWidget(self._progress)
+
+        self._cancel = QPushButton("Cancel", self)
+        self._cancel.clicked.connect(self.cancel_tasks)
+        self._cancel.hide()
+        self.addPermanentWidget(self._cancel)
+
+        self._refresh_rate = QLabel(self)
+        self._refresh_rate.setToolTip("Table cells refreshed in the last second")
+        self.addPermanentWidget(self._refresh_rate)
+        self.set_refresh_rate(0)
+
+    def set_refresh_rate(self, rate: int) -> None:
+        self._refresh_rate.setText(f"{rate} refreshes/s")
+
+    def add_task(self, task: FileTask) -> None:
+        self._tasks.append(task)
+        self._update_tasks()
+
+    def remove_task(self, task: FileTask) -> None:
+        if task in self._tasks:
+            self._tasks.remove(task)
+        self._update_tasks()
+
+    def cancel_tasks(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self.showMessage("Cancelling...")
+
+    def _update_tasks(self) -> None:
+        if not self._tasks:
+            self._progress.hide()
+            self._cancel.hide()
+            self.clearMessage()
+            return
+
+        message = self._tasks[0].description
+        if len(self._tasks) > 1:
+            message += f" (and {len(self._tasks) - 1} more)"
+        self.showMessage(message)
+        self._progress.show()
+        self._cancel.show()
+
 
 class MenuFile(QMenu):
     def __init__(self, parent: QWidget):
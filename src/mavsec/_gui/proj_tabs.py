@@ -17,25 +17,281 @@
 #####################################################################################
 
 from __future__ import annotations
-from typing import Callable, override
+from typing import Any, Callable
 
+from collections.abc import MutableSequence
+
+import bisect
+import collections
 import contextlib
+import time
 
 from PySide6.QtWidgets import (
-    QMainWindow, QTableWidget, QDockWidget, QWidget, QFormLayout,
-    QTextEdit, QLineEdit, QComboBox, QTableWidgetItem, QCheckBox
+    QMainWindow, QTableView, QDockWidget, QWidget, QFormLayout,
+    QTextEdit, QLineEdit, QComboBox, QCheckBox, QCompleter
+)
+from PySide6.QtGui import QIntValidator
+from PySide6.QtCore import (
+    Qt, QAbstractTableModel, QModelIndex, QPersistentModelIndex, QTimer, QStringListModel, Signal
 )
-from PySide6.QtCore import Qt
 
 from mavsec import properties
 from mavsec.project import Project, ProjectInfo
 from mavsec.properties import Property
+from mavsec.rtl import DesignIndex
+from mavsec.search import SearchIndex
+from mavsec.store import StoreProperties
+from mavsec.validate import Validator
+
+
+_ModelIndex = QModelIndex | QPersistentModelIndex
+
+
+####################################################################################################
+# Property Table Model
+####################################################################################################
+class PropertyTableModel(QAbstractTableModel):
+    """A table model which reads straight from the properties of a project.
+
+    Nothing is stored per row, the view only asks for the rows it is showing, so the cost of
+    opening a project does not depend on how many properties it has.
+
+    Edits made elsewhere (e.g. in the PropertyDock) are written to the property straight away,
+    but the view is only told about them in batches, so typing doesn't repaint the table on
+    every keystroke.
+
+    The rows can be filtered with a search (see set_filter). Rows of the view are then not the
+    same as positions in the project, property_row converts between them. The search index is
+    built the first time a filter is set and kept up to date after that.
+    """
+
+    COLUMNS = ["Name", "Type", "Description"]
+    NAME, TYPE, DESCRIPTION = range(len(COLUMNS))
+
+    REFRESH_INTERVAL_MS = 100
+    """How long edits are collected for before the view is refreshed."""
+
+    def __init__(self, proj: Project, parent: QWidget | None = None):
+        super().__init__(parent)
+        self._proj = proj
+
+        self._pending: set[tuple[int, int]] = set()
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.setInterval(self.REFRESH_INTERVAL_MS)
+        self._refresh_timer.timeout.connect(self.flush)
+
+        self.edits = 0
+        """The number of edits reported with cell_changed."""
+        self.changes = 0
+        """The number of changes to the properties, including inserts and removals."""
+        self.refreshes = 0
+        """The number of cells the view has been told to refresh."""
+        self._refresh_times: collections.deque[float] = collections.deque()
+
+        self._filter = ""
+        self._search: SearchIndex | None = None
+        self._stale: set[int] = set()
+        self._rows: list[int] | None = None
+        self._view_rows: dict[int, int] | None = None
+
+    def rowCount(self, parent: _ModelIndex = QModelIndex()) -> int:  # noqa: N802 Qt method
+        if parent.isValid():
+            return 0
+        if self._rows is not None:
+            return len(self._rows)
+        return len(self._proj.properties)
+
+    def columnCount(self, parent: _ModelIndex = QModelIndex()) -> int:  # noqa: N802 Qt method
+        if parent.isValid():
+            return 0
+        return len(self.COLUMNS)
+
+    def data(self, index: _ModelIndex, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+
+        prop = self._proj.properties[self.property_row(index.row())]
+        col = index.column()
+        if col == 0:
+            return prop.name
+        elif col == 1:
+            return prop.type_name()
+        elif col == 2:
+            return prop.description
+        return None
+
+    def headerData(  # noqa: N802 Qt method
+                self,
+                section: int,
+                orientation: Qt.Orientation,
+                role: int = Qt.ItemDataRole.DisplayRole
+            ) -> Any:
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.COLUMNS[section]
+        return self.property_row(section) + 1
+
+    def property_row(self, row: int) -> int:
+        """Gets the position in the project of the property shown in a row of the view."""
+        if self._rows is None:
+            return row
+        return self._rows[row]
+
+    def view_row(self, row: int) -> int | None:
+        """Gets the row of the view showing the property at a position in the project.
+
+        Returns:
+            int | None: The row, or None if the property is hidden by the filter.
+        """
+        if self._rows is None:
+            return row
+        if self._view_rows is None:
+            self._view_rows = {prop_row: idx for idx, prop_row in enumerate(self._rows)}
+        return self._view_rows.get(row)
+
+    def filter_text(self) -> str:
+        """Gets the current filter."""
+        return self._filter
+
+    def set_filter(self, text: str) -> None:
+        """Only shows the properties matching a search.
+
+        Args:
+            text (str): The search (see SearchIndex.search). Empty to show every property.
+        """
+        if text == self._filter:
+            return
+
+        self._filter = text
+        self.beginResetModel()
+        self._apply_filter()
+        self.endResetModel()
+
+    def _apply_filter(self) -> None:
+        self._view_rows = None
+        if not self._filter.strip():
+            self._rows = None
+            return
+
+        self._update_index()
+        assert self._search is not None
+        self._rows = self._search.search(self._filter)
+
+    def _update_index(self) -> None:
+        if self._search is None:
+            self._search = SearchIndex(self._proj.properties)
+        else:
+            for row in self._stale:
+                self._search.update(row, self._proj.properties[row])
+        self._stale.clear()
+
+    def insert_property(self, row: int, prop: Property) -> None:
+        """Inserts a property into the project.
+
+        Args:
+            row (int): The position to insert the property at.
+            prop (Property): The property to insert.
+        """
+        self.changes += 1
+        if self._search is not None:
+            self._update_index()
+
+        if self._rows is None:
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._proj.properties.insert(row, prop)
+            if self._search is not None:
+                self._search.insert(row, prop)
+            self.endInsertRows()
+            return
+
+        self.beginResetModel()
+        self._proj.properties.insert(row, prop)
+        if self._search is not None:
+            self._search.insert(row, prop)
+        self._apply_filter()
+        assert self._rows is not None
+        # Show the new property, even though it doesn't match the filter yet
+        if row not in self._rows:
+            bisect.insort(self._rows, row)
+        self.endResetModel()
+
+    def remove_property(self, row: int) -> None:
+        """Removes a property from the project.
+
+        Args:
+            row (int): The position of the property to remove.
+        """
+        self.changes += 1
+        if self._search is not None:
+            self._update_index()
+
+        if self._rows is None:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self._proj.properties[row]
+            if self._search is not None:
+                self._search.remove(row)
+            self.endRemoveRows()
+            return
+
+        self.beginResetModel()
+        del self._proj.properties[row]
+        if self._search is not None:
+            self._search.remove(row)
+        self._apply_filter()
+        self.endResetModel()
+
+    def property_changed(self, row: int, column: int | None = None) -> None:
+        """Records an edit of a property and schedules a refresh of the cell it changed.
+
+        Args:
+            row (int): The position of the property which changed.
+            column (int | None): The column which changed (e.g. PropertyTableModel.NAME), or
+                None if the edit isn't shown in the table.
+        """
+        self.edits += 1
+        self.changes += 1
+        if isinstance(self._proj.properties, StoreProperties):
+            # Each edit is committed to the store on its own, so there is nothing to save
+            self._proj.properties.changed(row)
+        if self._search is not None:
+            self._stale.add(row)
+        if column is None:
+            return
+
+        self._pending.add((row, column))
+        if not self._refresh_timer.isActive():
+            self._refresh_timer.start()
+
+    def flush(self) -> None:
+        """Refreshes the cells changed since the last refresh."""
+        self._refresh_timer.stop()
+        pending, self._pending = self._pending, set()
+
+        now = time.monotonic()
+        rows = len(self._proj.properties)
+        for row, column in sorted(pending):
+            # The row may have been removed since it was edited, or be hidden by the filter
+            view_row = self.view_row(row) if row < rows else None
+            if view_row is not None:
+                idx = self.index(view_row, column)
+                self.dataChanged.emit(idx, idx, [Qt.ItemDataRole.DisplayRole])
+                self.refreshes += 1
+                self._refresh_times.append(now)
+
+    def refresh_rate(self) -> int:
+        """Gets the number of cells refreshed in the last second."""
+        cutoff = time.monotonic() - 1.0
+        while self._refresh_times and self._refresh_times[0] < cutoff:
+            self._refresh_times.popleft()
+        return len(self._refresh_times)
 
 
 ####################################################################################################
 # Project Tab
 ####################################################################################################
-class ProjectTab(QTableWidget):
+class ProjectTab(QTableView):
     """The project information pane"""
     def __init__(
                     self,
@@ -47,60 +303,123 @@ class ProjectTab(QTableWidget):
         self.setObjectName(u"properties_table")
 
         self._pdock = pdock
-
-        columns = ["Name", "Type", "Description"]
-        self.setColumnCount(len(columns))
-        self.setColumnWidth(0, 250)
-        self.setColumnWidth(1, 250)
-        self.setColumnWidth(2, 500)
-        self.setHorizontalHeaderLabels(columns)
-        self.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.validator = Validator()
+        self.design: DesignIndex | None = None
 
         if proj is None:
             self._proj = Project(ProjectInfo("", "", ""))
         else:
             self._proj = proj
 
-        for i in range(len(self._proj.properties)):
-            super().insertRow(i)
-            self.set_row(i)
+        self._model = PropertyTableModel(self._proj, self)
+        self.setModel(self._model)
+        self._saved = self.save_point()
+
+        self.setColumnWidth(0, 250)
+        self.setColumnWidth(1, 250)
+        self.setColumnWidth(2, 500)
+        self.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
+        self.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        # Rows all have the same height, so the view never has to measure them
+        self.setWordWrap(False)
 
     def activate(self) -> None:
-        self.cellPressed.connect(self._cell_pressed)
+        self.pressed.connect(self._index_pressed)
 
-    def _cell_pressed(self, row: int, col: int) -> None:
+    def _index_pressed(self, index: QModelIndex) -> None:
         if self._pdock is not None:
-            self._pdock.activate(self._proj.properties, row, self.update_current_row)
+            row = self._model.property_row(index.row())
+            self._pdock.activate(
+                self._proj.properties, row, lambda col: self._model.property_changed(row, col)
+            )
 
     def deactivate(self) -> None:
         with contextlib.suppress(RuntimeError):
-            self.cellPressed.disconnect()
+            self.pressed.disconnect()
 
         if self._pdock is not None:
             self._pdock.deactivate()
 
-    @override
-    def insertRow(self, row: int) -> None:  # noqa: N802 this is a parent class method
-        self._proj.properties.insert(row, Property("", "", ptype=properties.SecureKeyProperty))
-        super().insertRow(row)
-        self.set_row(row)
-
-    def set_row(self, row: int) -> None:
-        self.setItem(row, 0, QTableWidgetItem(self._proj.properties[row].name))
-        self.setItem(row, 1, QTableWidgetItem(self._proj.properties[row].type_name()))
-        self.setItem(row, 2, QTableWidgetItem(self._proj.properties[row].description))
-
-    def update_current_row(self) -> None:
-        row = self.currentRow()
-        self.set_row(row)
+    def current_row(self) -> int:
+        """Gets the position in the project of the current property, or -1 if there isn't one."""
+        index = self.currentIndex()
+        if not index.isValid():
+            return -1
+        return self._model.property_row(index.row())
+
+    def insert_property(self, row: int | None = None) -> None:
+        """Inserts a new, empty property.
+
+        Args:
+            row (int | None): The position to insert the property at. Defaults to the end.
+        """
+        if row is None:
+            row = len(self._proj.properties)
+        self._model.insert_property(row, Property("", "", ptype=properties.SecureKeyProperty))
+
+    def remove_property(self, row: int) -> None:
+        """Removes a property.
+
+        Args:
+            row (int): The position of the property to remove.
+        """
+        if not 0 <= row < len(self._proj.properties):
+            return
+        if self._pdock is not None:
+            self._pdock.deactivate()
+        self._model.remove_property(row)
 
     def get_proj(self) -> Project:
         return self._proj
 
+    def save_point(self) -> tuple[int, dict]:
+        """Gets a record of the project's current state, to pass to mark_saved once it has been
+        written."""
+        return self._model.changes, self._proj.info.to_dict()
+
+    def mark_saved(self, point: tuple[int, dict]) -> None:
+        """Records that the project was saved in the state given by save_point."""
+        self._saved = point
+
+    def is_dirty(self) -> bool:
+        """Whether the project has changed since it was opened or last saved."""
+        return self.save_point() != self._saved
+
+    def get_model(self) -> PropertyTableModel:
+        return self._model
+
+    def set_filter(self, text: str) -> None:
+        self._model.set_filter(text)
+
 
 ####################################################################################################
 # Property Information Pane
 ####################################################################################################
+def _preconditions_text(preconditions: str | list[str] | None) -> str:
+    """Gets the text of the preconditions editor, which has one precondition per line."""
+    if preconditions is None:
+        return ""
+    if isinstance(preconditions, str):
+        return preconditions
+    return "\n".join(preconditions)
+
+
+def _preconditions_value(text: str) -> str | list[str]:
+    """Gets the preconditions from the text of the preconditions editor."""
+    lines = text.splitlines()
+    return lines if len(lines) > 1 else text
+
+
+def _set_int(prop: Property, meta: str, text: str) -> None:
+    """Sets an integer metadata field from its editor, unless the text isn't a number yet."""
+    try:
+        value = int(text or 0)
+    except ValueError:
+        # The validator still lets through text which could become a number, e.g. "-"
+        return
+    prop.meta[meta] = value
+
+
 class PropertyDock(QDockWidget):
     """The property information pane"""
     def __init__(self, parent: QMainWindow):
@@ -120,7 +439,9 @@ class PropertyDock(QDockWidget):
         self._description = QTextEdit(self._form)
         self._preconditions = QTextEdit(self._form)
 
-        self._type.addItems([t.name for t in Property.available_types()])
+        self._type.addItems(properties.PropertyType.type_names())
+
+        self._design: DesignIndex | None = None
 
         self._layout.addRow("Name", self._name)
         self._layout.addRow("Type", self._type)
@@ -131,7 +452,12 @@ class PropertyDock(QDockWidget):
 
         self.setWidget(self._form)
 
-    def activate(self, props: list[Property], row: int, update: Callable) -> None:
+    def activate(
+                self,
+                props: MutableSequence[Property],
+                row: int,
+                update: Callable[[int | None], None]
+            ) -> None:
         self.deactivate()
 
         self._props = props
@@ -142,21 +468,42 @@ class PropertyDock(QDockWidget):
         self._type.setCurrentText(prop.type_name())
         self.set_type(prop.type_name())
         self._description.setText(prop.description)
+        self._preconditions.setText(_preconditions_text(prop.preconditions))
 
         self._name.textChanged.connect(lambda text: setattr(prop, "name", text))
-        self._name.textChanged.connect(update)
+        self._name.textChanged.connect(lambda: update(PropertyTableModel.NAME))
         self._type.currentTextChanged.connect(self.set_type)
-        self._type.currentTextChanged.connect(update)
+        self._type.currentTextChanged.connect(lambda: update(PropertyTableModel.TYPE))
         self._description.textChanged.connect(
             lambda: setattr(prop, "description", self._description.toPlainText())
         )
-        self._description.textChanged.connect(update)
+        self._description.textChanged.connect(lambda: update(PropertyTableModel.DESCRIPTION))
         self._preconditions.textChanged.connect(
-            lambda: setattr(prop, "preconditions", self._preconditions.toPlainText())
+            lambda: setattr(
+                prop, "preconditions", _preconditions_value(self._preconditions.toPlainText())
+            )
         )
+        self._preconditions.textChanged.connect(lambda: update(None))
 
         self.setDisabled(False)
 
+    def set_design(self, design: DesignIndex | None) -> None:
+        """Sets the design used to complete RTL paths."""
+        self._design = design
+
+    def _rtl_completer(self, le: QLineEdit) -> None:
+        design = self._design
+        if design is None:
+            return
+
+        # Only the next part of the path is offered, so the list is updated as the path grows
+        model = QStringListModel(le)
+        completer = QCompleter(model, le)
+        completer.setCompletionMode(QCompleter.CompletionMode.PopupCompletion)
+        le.textEdited.connect(lambda text: model.setStringList(design.complete(text)))
+        model.setStringList(design.complete(le.text()))
+        le.setCompleter(completer)
+
     def set_type(self, text: str) -> None:
         ptype = properties.Property.ptype_from_str(text)
         self._props[self._prow].ptype = ptype
@@ -165,12 +512,17 @@ class PropertyDock(QDockWidget):
         self.add_type_fields()
 
     def deactivate(self) -> None:
-        with contextlib.suppress(RuntimeError):
-            self._name.textChanged.disconnect()
-            self._description.textChanged.disconnect()
+        # The previous property's editors must not change the next one
+        for signal in (
+            self._name.textChanged, self._type.currentTextChanged,
+            self._description.textChanged, self._preconditions.textChanged,
+        ):
+            with contextlib.suppress(RuntimeError):
+                signal.disconnect()
 
         self._name.setText("")
         self._description.setText("")
+        self._preconditions.setText("")
 
         self.remove_type_fields()
 
@@ -196,31 +548,34 @@ class PropertyDock(QDockWidget):
                     prop.meta[meta] = False
                 cb.setChecked(prop.meta[meta])
                 self._layout.addRow(meta, cb)
-                cb.stateChanged.connect(lambda state, m=meta: setattr(prop.meta, m, bool(state)))
+                cb.stateChanged.connect(lambda state, m=meta: prop.meta.__setitem__(m, bool(state)))
+                cb.stateChanged.connect(lambda: self._update(None))
             elif mtype is str:
                 le = QLineEdit(self._form)
                 if meta not in prop.meta:
                     prop.meta[meta] = ""
                 le.setText(prop.meta[meta])
-                le.textChanged.connect(lambda text, m=meta: setattr(prop.meta, m, text))
-                le.textChanged.connect(self._update)
+                le.textChanged.connect(lambda text, m=meta: prop.meta.__setitem__(m, text))
+                le.textChanged.connect(lambda: self._update(None))
                 self._layout.addRow(meta, le)
             elif mtype is int:
                 le = QLineEdit(self._form)
                 if meta not in prop.meta:
                     prop.meta[meta] = 0
                 le.setText(str(prop.meta[meta]))
-                le.textChanged.connect(lambda text, m=meta: setattr(prop.meta, m, int(text)))
-                le.textChanged.connect(self._update)
+                le.setValidator(QIntValidator(le))
+                le.textChanged.connect(lambda text, m=meta: _set_int(prop, m, text))
+                le.textChanged.connect(lambda: self._update(None))
                 self._layout.addRow(meta, le)
             elif mtype is properties.AnyRtlPath:
                 le = QLineEdit(self._form)
                 if meta not in prop.meta:
                     prop.meta[meta] = ""
                 le.setText(prop.meta[meta])
-                le.textChanged.connect(lambda text, m=meta: setattr(prop.meta, m, text))
-                le.textChanged.connect(self._update)
+                le.textChanged.connect(lambda text, m=meta: prop.meta.__setitem__(m, text))
+                le.textChanged.connect(lambda: self._update(None))
                 le.setPlaceholderText("Path to signal in RTL")
+                self._rtl_completer(le)
                 self._layout.addRow(meta, le)
 
 
@@ -238,6 +593,10 @@ class ProjectInfoDock(QDockWidget):
     _proj_ptr: Project | None
 
     """The project information pane"""
+
+    rtl_changed = Signal()
+    """Emitted when the RTL file list or top module has been edited."""
+
     def __init__(self, parent: QMainWindow):
         super().__init__("Project Info", parent=parent)
         self.setFeatures(
@@ -253,10 +612,19 @@ class ProjectInfoDock(QDockWidget):
         self._name = QLineEdit(form)
         self._version = QLineEdit(form)
         self._description = QTextEdit(form)
+        self._rtl_filelist = QLineEdit(form)
+        self._rtl_filelist.setPlaceholderText("File list of the design (.f)")
+        self._rtl_top = QLineEdit(form)
+        self._rtl_top.setPlaceholderText("Found from the file list")
 
         layout.addRow("Project Name", self._name)
         layout.addRow("Project Version", self._version)
         layout.addRow("Project Description", self._description)
+        layout.addRow("RTL File List", self._rtl_filelist)
+        layout.addRow("RTL Top Module", self._rtl_top)
+
+        self._rtl_filelist.editingFinished.connect(self.rtl_changed.emit)
+        self._rtl_top.editingFinished.connect(self.rtl_changed.emit)
 
         self.setDisabled(True)
 
@@ -270,6 +638,8 @@ class ProjectInfoDock(QDockWidget):
         self._name.setText("")
         self._version.setText("")
         self._description.setText("")
+        self._rtl_filelist.setText("")
+        self._rtl_top.setText("")
 
     def set_proj(self, proj: Project) -> None:
         self._proj_ptr = proj
@@ -279,14 +649,20 @@ class ProjectInfoDock(QDockWidget):
             self._name.textChanged.disconnect()
             self._version.textChanged.disconnect()
             self._description.textChanged.disconnect()
+            self._rtl_filelist.textChanged.disconnect()
+            self._rtl_top.textChanged.disconnect()
 
         self._name.textChanged.connect(_project_setter(self._proj_ptr, "name"))
         self._version.textChanged.connect(_project_setter(self._proj_ptr, "version"))
         self._description.textChanged.connect(
             lambda: _project_setter(self._proj_ptr, "description")(self._description.toPlainText())
         )
+        self._rtl_filelist.textChanged.connect(_project_setter(self._proj_ptr, "rtl_filelist"))
+        self._rtl_top.textChanged.connect(_project_setter(self._proj_ptr, "rtl_top"))
 
     def set_from_proj(self, proj: Project) -> None:
         self._name.setText(proj.info.name)
         self._version.setText(proj.info.version)
         self._description.setText(proj.info.description)
+        self._rtl_filelist.setText(proj.info.rtl_filelist or "")
+        self._rtl_top.setText(proj.info.rtl_top or "")
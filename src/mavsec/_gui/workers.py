@@ -0,0 +1,100 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+
+from __future__ import annotations
+from typing import Any, Callable
+
+import threading
+
+from PySide6.QtCore import QObject, QRunnable, Signal
+
+
+####################################################################################################
+# File Tasks
+####################################################################################################
+class TaskSignals(QObject):
+    """The signals a FileTask uses to report back to the GUI thread.
+
+    Each signal passes the task so one slot can handle every task.
+    """
+    finished = Signal(object, object)
+    failed = Signal(object, str)
+    cancelled = Signal(object)
+
+
+class FileTask(QRunnable):
+    """Runs a slow file operation (e.g. loading or saving a project) on a QThreadPool.
+
+    The function is run on a worker thread, so it must not touch any widgets. The outcome is
+    reported through signals, which are delivered on the GUI thread.
+
+    Args:
+        description (str): What the task is doing, shown in the status bar.
+        func (Callable[[], Any]): The function to run on the worker thread.
+        on_finished (Callable[[Any], None] | None): Called with the result of func once it
+            succeeds.
+        on_done (Callable[[], None] | None): Called once the task has finished, failed or
+            been cancelled.
+        discard (bool): Whether the result is thrown away if the task is cancelled while
+            func is running. Otherwise cancelling only stops a task which hasn't started.
+    """
+    def __init__(
+                self,
+                description: str,
+                func: Callable[[], Any],
+                on_finished: Callable[[Any], None] | None = None,
+                on_done: Callable[[], None] | None = None,
+                discard: bool = True
+            ):
+        super().__init__()
+        # The main window keeps the task until its signals have been handled
+        self.setAutoDelete(False)
+
+        self.description = description
+        self.on_finished = on_finished
+        self.on_done = on_done
+        self.signals = TaskSignals()
+
+        self._func = func
+        self._discard = discard
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        """Cancels the task. A function which is already running is not interrupted."""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the task was cancelled."""
+        return self._cancelled.is_set()
+
+    def run(self) -> None:
+        if self.cancelled:
+            self.signals.cancelled.emit(self)
+            return
+
+        try:
+            result = self._func()
+        except Exception as err:
+            self.signals.failed.emit(self, f"{type(err).__name__}: {err}")
+            return
+
+        if self._discard and self.cancelled:
+            self.signals.cancelled.emit(self)
+        else:
+            self.signals.finished.emit(self, result)
@@ -0,0 +1,237 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+"""Building many project files into TCL at once."""
+
+from __future__ import annotations
+from typing import Iterable
+
+from dataclasses import dataclass, field
+from concurrent import futures
+
+import glob
+import os
+import pathlib
+import time
+
+from mavsec.project import Project
+from mavsec import rtl, trace
+
+
+@dataclass
+class BuildResult:
+    """The outcome of building one project file."""
+
+    project: pathlib.Path
+    """The project file."""
+    output: pathlib.Path
+    """The TCL file written for the project."""
+    properties: int = 0
+    """The number of properties in the project."""
+    seconds: float = 0.0
+    """The time spent loading and emitting the project."""
+    emitted: int = 0
+    """The number of properties converted to SVP (fewer than properties if incremental)."""
+    error: str | None = None
+    """The reason the build failed, or None if it succeeded."""
+
+    @property
+    def ok(self) -> bool:
+        """Whether the build succeeded."""
+        return self.error is None
+
+
+@dataclass
+class BatchReport:
+    """The outcome of building a batch of project files."""
+
+    results: list[BuildResult] = field(default_factory=list)
+    """The result of each project, in the order the projects were given."""
+    seconds: float = 0.0
+    """The wall clock time of the whole batch."""
+
+    @property
+    def failed(self) -> list[BuildResult]:
+        """The builds which failed."""
+        return [res for res in self.results if not res.ok]
+
+    def summary(self) -> str:
+        """Creates a plain text report of the batch.
+
+        Returns:
+            str: One line per failed project followed by the totals.
+        """
+        lines = [f"FAILED {res.project}: {res.error}" for res in self.failed]
+        props = sum(res.properties for res in self.results)
+        emitted = sum(res.emitted for res in self.results)
+        lines.append(
+            f"{len(self.results) - len(self.failed)} built, {len(self.failed)} failed, "
+            f"{props} properties ({emitted} regenerated) in {self.seconds:.2f}s"
+        )
+        return "\n".join(lines)
+
+
+def expand_projects(
+            patterns: Iterable[str | pathlib.Path],
+            manifest: str | pathlib.Path | None = None,
+            unmatched: list[str] | None = None
+        ) -> list[pathlib.Path]:
+    """Expands globs and a manifest into a list of project files.
+
+    Args:
+        patterns (Iterable[str | pathlib.Path]): Project files or globs (``**`` is supported).
+        manifest (str | pathlib.Path | None): A text file listing one project file or glob per
+            line, relative to the manifest. Blank lines and lines starting with ``#`` are
+            ignored.
+        unmatched (list[str] | None): A list the globs which matched no files are added to,
+            so they can be reported (e.g. a typo in a manifest).
+
+    Returns:
+        list[pathlib.Path]: The project files, without duplicates, in the order found.
+    """
+    globs = [str(pat) for pat in patterns]
+
+    if manifest is not None:
+        root = pathlib.Path(manifest).parent
+        with open(manifest, "r") as file:
+            for line in file:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    globs.append(str(root.joinpath(line)))
+
+    paths: dict[pathlib.Path, None] = {}
+    for pat in globs:
+        if glob.has_magic(pat):
+            matches = sorted(glob.glob(pat, recursive=True))
+            if not matches and unmatched is not None:
+                unmatched.append(pat)
+            for match in matches:
+                paths[pathlib.Path(match)] = None
+        else:
+            # Missing files are kept so they are reported as a failed build
+            paths[pathlib.Path(pat)] = None
+
+    return list(paths)
+
+
+@trace.traced("build")
+def build_one(
+            project: pathlib.Path,
+            output: pathlib.Path,
+            incremental: bool = False
+        ) -> BuildResult:
+    """Loads a project and writes its TCL, capturing any error in the result.
+
+    Args:
+        project (pathlib.Path): The project file.
+        output (pathlib.Path): The TCL file to write.
+        incremental (bool): Only regenerate the properties which changed since the last build.
+
+    Returns:
+        BuildResult: The outcome of the build.
+    """
+    start = time.perf_counter()
+    result = BuildResult(project, output)
+    emitting = False
+    try:
+        proj = Project.from_file(project)
+        proj.info.proj_file = project
+        result.properties = len(proj.properties)
+        design = rtl.design_for(proj.info.rtl_filelist, project, proj.info.rtl_top)
+        emitting = True
+        result.emitted = proj.to_tcl(output, incremental, design)
+    except Exception as err:
+        result.error = f"{type(err).__name__}: {err}"
+        if emitting and not incremental:
+            # Don't leave a truncated TCL file behind
+            output.unlink(missing_ok=True)
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def _build_worker(
+            project: pathlib.Path,
+            output: pathlib.Path,
+            incremental: bool,
+            tracing: bool
+        ) -> tuple[BuildResult, tuple[list, dict[str, int]] | None]:
+    if not tracing:
+        return build_one(project, output, incremental), None
+    # The worker may have been forked with the parent's spans
+    trace.reset()
+    trace.enable()
+    return build_one(project, output, incremental), trace.take()
+
+
+def build_many(
+            projects: Iterable[str | pathlib.Path],
+            jobs: int | None = None,
+            output_dir: str | pathlib.Path | None = None,
+            incremental: bool = False
+        ) -> BatchReport:
+    """Builds the TCL for many projects in a process pool.
+
+    A project which fails to load or emit is recorded in the report and does not stop the
+    other projects being built.
+
+    Args:
+        projects (Iterable[str | pathlib.Path]): The project files.
+        jobs (int | None): The number of worker processes. Defaults to the number of CPUs.
+            With one job the projects are built in this process.
+        output_dir (str | pathlib.Path | None): The directory to write the TCL files to.
+            Defaults to next to each project file.
+        incremental (bool): Only regenerate the properties which changed since the last build.
+
+    Returns:
+        BatchReport: The result of every project.
+    """
+    start = time.perf_counter()
+    paths = [pathlib.Path(proj) for proj in projects]
+
+    if output_dir is None:
+        outputs = [proj.with_suffix(".tcl") for proj in paths]
+    else:
+        outputs = [pathlib.Path(output_dir).joinpath(proj.stem + ".tcl") for proj in paths]
+        if len(set(outputs)) != len(outputs):
+            raise ValueError(f"Project files with the same name would overwrite in {output_dir}")
+        os.makedirs(output_dir, exist_ok=True)
+
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    jobs = max(1, min(jobs, len(paths)))
+
+    if jobs == 1:
+        results = [build_one(proj, out, incremental) for proj, out in zip(paths, outputs)]
+    else:
+        results = []
+        with futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+            # Each worker sends back its spans with its result when tracing
+            pending = [
+                pool.submit(_build_worker, proj, out, incremental, trace.enabled())
+                for proj, out in zip(paths, outputs)
+            ]
+            for proj, out, fut in zip(paths, outputs, pending):
+                try:
+                    result, traced = fut.result()
+                    results.append(result)
+                    if traced is not None:
+                        trace.merge(*traced)
+                except Exception as err:
+                    # The worker itself died (e.g. killed for using too much memory)
+                    results.append(BuildResult(proj, out, error=f"{type(err).__name__}: {err}"))
+
+    return BatchReport(results, time.perf_counter() - start)
@@ -0,0 +1,217 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+"""A binary cache of parsed project files.
+
+The parsed contents of a project file are stored with :mod:`marshal` in a ``.mavsec-cache``
+directory next to the file. An entry is used while the file's modification time and size are
+unchanged, or if they changed but its content hash did not. Entries are evicted least recently
+used first once the directory is over its size cap.
+
+Set ``MAVSEC_NO_CACHE=1`` to disable the cache and ``MAVSEC_CACHE_MAX_BYTES`` to change the cap.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import marshal
+import os
+import pathlib
+import threading
+
+from mavsec.schema import Schema
+from mavsec import trace
+
+
+CACHE_DIR = ".mavsec-cache"
+"""The name of the cache directory created next to project files."""
+
+DISABLE_ENV = "MAVSEC_NO_CACHE"
+"""The environment variable which disables the cache when set to a non-empty value."""
+
+MAX_BYTES_ENV = "MAVSEC_CACHE_MAX_BYTES"
+"""The environment variable which sets the size cap of a cache directory."""
+
+DEFAULT_MAX_BYTES = 256 * 2**20
+"""The default size cap of a cache directory."""
+
+_MAGIC = b"MAVSEC-CACHE\x02"
+
+
+def enabled() -> bool:
+    """Whether the cache is enabled (i.e. ``MAVSEC_NO_CACHE`` is not set)."""
+    return not os.environ.get(DISABLE_ENV)
+
+
+def max_bytes() -> int:
+    """The size cap of a cache directory."""
+    return int(os.environ.get(MAX_BYTES_ENV, DEFAULT_MAX_BYTES))
+
+
+def entry_path(source: pathlib.Path) -> pathlib.Path:
+    """Gets the cache entry for a source file.
+
+    Args:
+        source (pathlib.Path): The project file.
+
+    Returns:
+        pathlib.Path: The ``.mavsec-cache/<hash>.bin`` file for the source.
+    """
+    source = source.resolve()
+    key = hashlib.blake2b(str(source).encode(), digest_size=16).hexdigest()
+    return source.parent.joinpath(CACHE_DIR, f"{key}.bin")
+
+
+def is_fresh(source: str | pathlib.Path) -> bool:
+    """Checks whether a file's cache entry is up to date, without reading the file or the data.
+
+    Args:
+        source (str | pathlib.Path): The project file.
+
+    Returns:
+        bool: Whether the cache is enabled and the file's modification time and size are the
+        ones in its entry.
+    """
+    if not enabled():
+        return False
+    source = pathlib.Path(source)
+    try:
+        stat = os.stat(source)
+        with open(entry_path(source), "rb") as file:
+            if file.read(len(_MAGIC)) != _MAGIC:
+                return False
+            header = marshal.loads(file.read(int.from_bytes(file.read(4), "little")))
+        return header["mtime_ns"] == stat.st_mtime_ns and header["size"] == stat.st_size
+    except (OSError, ValueError, EOFError, TypeError, KeyError):
+        return False
+
+
+def _content_hash(source: pathlib.Path) -> str:
+    digest = hashlib.blake2b(digest_size=32)
+    with open(source, "rb") as file:
+        while chunk := file.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_data(source: str | pathlib.Path) -> dict:
+    """Reads the dictionary stored in a project file, through the cache.
+
+    Args:
+        source (str | pathlib.Path): The YAML, JSON or TOML file.
+
+    Returns:
+        dict: The parsed contents of the file.
+    """
+    source = pathlib.Path(source)
+    if not enabled():
+        return Schema.read_data(source)
+
+    stat = os.stat(source)
+    entry = entry_path(source)
+    content_hash = None
+
+    try:
+        with open(entry, "rb") as file:
+            if file.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError("Not a cache entry")
+            header = marshal.loads(file.read(int.from_bytes(file.read(4), "little")))
+            if header["mtime_ns"] != stat.st_mtime_ns or header["size"] != stat.st_size:
+                content_hash = _content_hash(source)
+                if header["hash"] != content_hash:
+                    raise ValueError("Stale cache entry")
+            # marshal.load reads a file in small pieces, reading it all at once is much faster
+            data = marshal.loads(file.read())
+    except (OSError, ValueError, EOFError, TypeError, KeyError):
+        pass
+    else:
+        trace.count("cache.hit")
+        if content_hash is None:
+            # Mark the entry as recently used for the LRU eviction
+            _touch(entry)
+        else:
+            # Only the mtime changed, so record the new one
+            _store(entry, stat, content_hash, data)
+        return data
+
+    trace.count("cache.miss")
+    data = Schema.read_data(source)
+    _store(entry, stat, content_hash or _content_hash(source), data)
+    return data
+
+
+def _touch(entry: pathlib.Path) -> None:
+    try:
+        os.utime(entry)
+    except OSError:
+        pass
+
+
+def _store(entry: pathlib.Path, stat: os.stat_result, content_hash: str, data: dict) -> None:
+    header = marshal.dumps(
+        {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "hash": content_hash}
+    )
+    tmp = entry.with_name(f"{entry.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        entry.parent.mkdir(exist_ok=True)
+        with open(tmp, "wb") as file:
+            file.write(_MAGIC)
+            file.write(len(header).to_bytes(4, "little"))
+            file.write(header)
+            file.write(marshal.dumps(data))
+        os.replace(tmp, entry)
+    except (OSError, ValueError):
+        # The cache is best effort, e.g. the project directory may be read only
+        tmp.unlink(missing_ok=True)
+        return
+
+    evict(entry.parent)
+
+
+def evict(cache_dir: pathlib.Path, limit: int | None = None) -> None:
+    """Deletes the least recently used entries of a cache directory until it is under its cap.
+
+    Args:
+        cache_dir (pathlib.Path): The ``.mavsec-cache`` directory.
+        limit (int | None): The size cap in bytes. Defaults to max_bytes().
+    """
+    if limit is None:
+        limit = max_bytes()
+
+    entries = []
+    for entry in cache_dir.glob("*.bin"):
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime_ns, stat.st_size, entry))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, entry in sorted(entries):
+        if total <= limit:
+            break
+        entry.unlink(missing_ok=True)
+        total -= size
+
+
+def clear(cache_dir: pathlib.Path) -> None:
+    """Deletes every entry of a cache directory.
+
+    Args:
+        cache_dir (pathlib.Path): The ``.mavsec-cache`` directory.
+    """
+    evict(cache_dir, 0)
@@ -0,0 +1,228 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+"""The ``mavsec`` command line interface.
+
+Nothing in this module imports Qt, only the ``gui`` subcommand does, so the CLI can be used
+on headless machines.
+"""
+
+from __future__ import annotations
+from typing import Sequence
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from mavsec import _info, batch, cache, diff, rtl, trace
+from mavsec.project import Project
+from mavsec.validate import Severity, Validator
+
+
+def _build(args: argparse.Namespace) -> int:
+    unmatched: list[str] = []
+    projects = batch.expand_projects(args.projects, args.manifest, unmatched)
+    for pat in unmatched:
+        print(f"mavsec: warning: {pat} matched no project files", file=sys.stderr)
+    if not projects:
+        raise ValueError("No project files to build.")
+
+    if args.output is not None:
+        if len(projects) != 1:
+            raise ValueError("--output can only be used when building a single project.")
+        proj = Project.from_file(projects[0])
+        proj.info.proj_file = projects[0]
+        design = rtl.design_for(proj.info.rtl_filelist, projects[0], proj.info.rtl_top)
+        proj.to_tcl(args.output, args.incremental, design)
+        return 0
+
+    report = batch.build_many(projects, args.jobs, args.output_dir, args.incremental)
+    print(report.summary())
+    return 1 if report.failed else 0
+
+
+def _convert(args: argparse.Namespace) -> int:
+    proj = Project.from_file(args.source)
+    proj.to_file(args.dest)
+    return 0
+
+
+def _validate(args: argparse.Namespace) -> int:
+    errors = 0
+    report = {}
+    for path in args.projects:
+        proj = Project.from_file(path)
+        if args.rtl is not None:
+            design: rtl.DesignIndex | None = rtl.DesignIndex.from_filelist(args.rtl, args.top)
+        else:
+            design = rtl.design_for(
+                proj.info.rtl_filelist, path, args.top or proj.info.rtl_top
+            )
+        diagnostics = Validator(design).check(proj)
+        errors += sum(diag.severity is Severity.ERROR for diag in diagnostics)
+        if args.json:
+            report[path] = [diag.to_dict() for diag in diagnostics]
+        else:
+            for diag in diagnostics:
+                print(f"{path}: {diag}")
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    return 1 if errors else 0
+
+
+def _diff(args: argparse.Namespace) -> int:
+    result = diff.diff(Project.from_file(args.old), Project.from_file(args.new))
+    if args.json:
+        print(json.dumps(result.to_dict(), indent=2))
+    else:
+        sys.stdout.writelines(f"{line}\n" for line in result.lines())
+    return 1 if args.exit_code and result else 0
+
+
+def _watch(args: argparse.Namespace) -> int:
+    from mavsec import watch
+
+    session = watch.WatchSession(args.project, args.output, validate=not args.no_validate)
+    watcher = watch.create_watcher(args.poll, args.interval)
+    print(f"Watching {args.project} ({type(watcher).__name__}), press Ctrl+C to stop.")
+
+    def report(build: watch.BuildReport) -> None:
+        for diag in build.diagnostics:
+            print(f"{args.project}: {diag}")
+        print(f"[{time.strftime('%H:%M:%S')}] {build.summary()}", flush=True)
+
+    try:
+        watch.watch(session, watcher, args.debounce, report)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+    return 0
+
+
+def _gui(args: argparse.Namespace) -> int:
+    from mavsec import gui
+
+    gui()
+    return 0
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="mavsec",
+        description="A tool for the creation of JasperGold SVP principle tcl files. "
+                    "Starts the GUI when no command is given."
+    )
+    parser.add_argument("--version", action="version", version=f"%(prog)s {_info.__version__}")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Don't read or write the .mavsec-cache of parsed project files.")
+    parser.add_argument("--trace", default=None, metavar="FILE",
+                        help="Write a Chrome trace (chrome://tracing or Perfetto) of where the "
+                             "time went to FILE.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Print a table of where the time went to stderr.")
+    parser.set_defaults(func=_gui)
+    sub = parser.add_subparsers(title="commands")
+
+    build = sub.add_parser("build", help="Generate the SVP TCL for projects.")
+    build.add_argument("projects", nargs="*", help="The project files or globs.")
+    build.add_argument("-m", "--manifest", default=None,
+                       help="A file listing one project file or glob per line.")
+    build.add_argument("-o", "--output", default=None,
+                       help="The TCL file to write when building a single project. "
+                            "Defaults to the project file with .tcl.")
+    build.add_argument("-d", "--output-dir", default=None,
+                       help="The directory to write the TCL files to.")
+    build.add_argument("-j", "--jobs", type=int, default=None,
+                       help="The number of projects built in parallel. Defaults to the CPU count.")
+    build.add_argument("-i", "--incremental", action="store_true",
+                       help="Only regenerate the properties which changed since the last build.")
+    build.set_defaults(func=_build)
+
+    convert = sub.add_parser("convert", help="Convert a project between file formats.")
+    convert.add_argument("source", help="The project file to read.")
+    convert.add_argument("dest", help="The project file to write. The format is set by its suffix.")
+    convert.set_defaults(func=_convert)
+
+    validate = sub.add_parser("validate", help="Check the properties of projects.")
+    validate.add_argument("projects", nargs="+", help="The project files to check.")
+    validate.add_argument("--json", action="store_true",
+                          help="Print the diagnostics of each project as JSON.")
+    validate.add_argument("--rtl", default=None,
+                          help="Check the RTL paths against the design in this file list. "
+                               "Defaults to the rtl_filelist of each project.")
+    validate.add_argument("--top", default=None, help="The top module of the design.")
+    validate.set_defaults(func=_validate)
+
+    diff_cmd = sub.add_parser("diff", help="Show the property changes between two projects.")
+    diff_cmd.add_argument("old", help="The old project file.")
+    diff_cmd.add_argument("new", help="The new project file, in any format.")
+    diff_cmd.add_argument("--json", action="store_true", help="Print the changes as JSON.")
+    diff_cmd.add_argument("--exit-code", action="store_true",
+                          help="Exit with 1 if the projects differ (errors exit with 1 too).")
+    diff_cmd.set_defaults(func=_diff)
+
+    watch = sub.add_parser("watch", help="Regenerate a project's TCL whenever its files change.")
+    watch.add_argument("project", help="The project file.")
+    watch.add_argument("-o", "--output", default=None,
+                       help="The TCL file. Defaults to the project file with .tcl.")
+    watch.add_argument("--no-validate", action="store_true",
+                       help="Write the TCL without checking the properties first.")
+    watch.add_argument("--poll", action="store_true",
+                       help="Poll the files for changes instead of using inotify.")
+    watch.add_argument("--interval", type=float, default=0.5,
+                       help="The seconds between polls (default: 0.5).")
+    watch.add_argument("--debounce", type=float, default=0.2,
+                       help="The quiet seconds which end a burst of changes (default: 0.2).")
+    watch.set_defaults(func=_watch)
+
+    gui = sub.add_parser("gui", help="Start the MavSec GUI.")
+    gui.set_defaults(func=_gui)
+
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Run the ``mavsec`` command line interface.
+
+    Args:
+        argv (Sequence[str] | None): The arguments. Defaults to ``sys.argv[1:]``.
+
+    Returns:
+        int: The process exit code.
+    """
+    args = _parser().parse_args(argv)
+    if args.no_cache:
+        # Set in the environment so batch worker processes see it too
+        os.environ[cache.DISABLE_ENV] = "1"
+
+    if args.trace or args.profile:
+        trace.enable()
+
+    try:
+        return args.func(args)
+    except (OSError, ValueError, NotImplementedError) as err:
+        print(f"mavsec: error: {err}", file=sys.stderr)
+        return 1
+    finally:
+        if args.trace:
+            trace.write_chrome(args.trace)
+        if args.profile:
+            print(trace.summary(), file=sys.stderr)
@@ -0,0 +1,241 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+"""Structural differences between two versions of a project.
+
+Properties are matched by name, so a diff is not affected by the order of the keys in the
+project files or of the properties in the project. Properties which share a name are matched
+in the order they appear.
+"""
+
+from __future__ import annotations
+from typing import Any, Iterator
+
+from dataclasses import dataclass, field
+
+from mavsec.project import Project
+from mavsec.properties import Property
+
+
+class _Missing:
+    def __repr__(self) -> str:
+        return "<missing>"
+
+
+MISSING: Any = _Missing()
+"""The old or new value of a field which was added or removed."""
+
+_INFO_FIELDS = ("name", "version", "description", "rtl_filelist", "rtl_top")
+
+
+@dataclass(frozen=True)
+class FieldChange:
+    """A change to one field of a property or of the project information."""
+
+    field: str
+    """The field, e.g. ``description`` or ``meta.key_loc``."""
+    old: Any
+    """The old value, or MISSING if the field was added."""
+    new: Any
+    """The new value, or MISSING if the field was removed."""
+
+    def __str__(self) -> str:
+        if self.old is MISSING:
+            return f"{self.field}: added {self.new!r}"
+        if self.new is MISSING:
+            return f"{self.field}: removed {self.old!r}"
+        return f"{self.field}: {self.old!r} -> {self.new!r}"
+
+    def to_dict(self) -> dict:
+        """Convert the change to a dictionary, without ``old`` or ``new`` if it is missing."""
+        data = {"field": self.field}
+        if self.old is not MISSING:
+            data["old"] = self.old
+        if self.new is not MISSING:
+            data["new"] = self.new
+        return data
+
+
+@dataclass(frozen=True)
+class PropertyChange:
+    """The changes to a property which is in both versions of a project."""
+
+    name: str
+    """The name of the property."""
+    old_index: int
+    """The position of the property in the old project."""
+    new_index: int
+    """The position of the property in the new project."""
+    fields: list[FieldChange]
+    """The fields which changed."""
+
+    def to_dict(self) -> dict:
+        """Convert the change to a dictionary."""
+        return {
+            "name": self.name,
+            "old_index": self.old_index,
+            "new_index": self.new_index,
+            "fields": [change.to_dict() for change in self.fields],
+        }
+
+
+@dataclass
+class ProjectDiff:
+    """The differences between two versions of a project."""
+
+    info: list[FieldChange] = field(default_factory=list)
+    """The changes to the project information."""
+    added: list[tuple[int, Property]] = field(default_factory=list)
+    """The properties only in the new project, with their positions, in order."""
+    removed: list[tuple[int, Property]] = field(default_factory=list)
+    """The properties only in the old project, with their positions, in order."""
+    changed: list[PropertyChange] = field(default_factory=list)
+    """The properties in both projects which changed, in the order of the new project."""
+    unchanged: int = 0
+    """The number of properties in both projects which didn't change."""
+
+    def __bool__(self) -> bool:
+        return bool(self.info or self.added or self.removed or self.changed)
+
+    def summary(self) -> str:
+        """Gets the number of properties added, removed, changed and unchanged."""
+        return (
+            f"{len(self.added)} added, {len(self.removed)} removed, {len(self.changed)} changed, "
+            f"{self.unchanged} unchanged"
+        )
+
+    def lines(self) -> Iterator[str]:
+        """Creates a plain text report of the differences, one line at a time.
+
+        Yields:
+            str: ``+``/``-`` lines for added/removed properties and ``~`` lines for changes,
+            each changed field on an indented line, then the summary.
+        """
+        for change in self.info:
+            yield f"~ project {change}"
+        for idx, prop in self.removed:
+            yield f"- {prop.name} ({prop.type_name()}) [{idx}]"
+        for idx, prop in self.added:
+            yield f"+ {prop.name} ({prop.type_name()}) [{idx}]"
+        for pchange in self.changed:
+            yield f"~ {pchange.name} [{pchange.old_index} -> {pchange.new_index}]"
+            for change in pchange.fields:
+                yield f"    {change}"
+        yield self.summary()
+
+    def to_dict(self) -> dict:
+        """Convert the differences to a dictionary, for machine readable output."""
+        return {
+            "info": [change.to_dict() for change in self.info],
+            "added": [{"index": idx, **prop.to_dict()} for idx, prop in self.added],
+            "removed": [{"index": idx, **prop.to_dict()} for idx, prop in self.removed],
+            "changed": [change.to_dict() for change in self.changed],
+            "unchanged": self.unchanged,
+        }
+
+
+def _compare(key: str, old: Any, new: Any, changes: list[FieldChange]) -> None:
+    if old != new:
+        changes.append(FieldChange(key, old, new))
+
+
+def diff_properties(old: Property, new: Property) -> list[FieldChange]:
+    """Finds the fields which differ between two versions of a property.
+
+    Args:
+        old (Property): The old version.
+        new (Property): The new version.
+
+    Returns:
+        list[FieldChange]: The description, type, each meta key and preconditions which
+        changed.
+    """
+    changes: list[FieldChange] = []
+    _compare("description", old.description, new.description, changes)
+    _compare("ptype", old.type_name(), new.type_name(), changes)
+
+    if old.meta != new.meta:
+        for key, value in old.meta.items():
+            _compare(f"meta.{key}", value, new.meta.get(key, MISSING), changes)
+        for key, value in new.meta.items():
+            if key not in old.meta:
+                changes.append(FieldChange(f"meta.{key}", MISSING, value))
+
+    # A single precondition may be a string or a one item list, which are the same
+    old_pre, new_pre = old.precondition_list(), new.precondition_list()
+    if old_pre != new_pre:
+        changes.append(FieldChange("preconditions", old_pre, new_pre))
+    return changes
+
+
+def _keyed(props: list[Property]) -> dict[tuple[str, int], int]:
+    """Gets the position of each property by its name and the number of earlier properties
+    with the same name."""
+    seen: dict[str, int] = {}
+    keys = {}
+    for idx, prop in enumerate(props):
+        nth = seen.get(prop.name, 0)
+        seen[prop.name] = nth + 1
+        keys[(prop.name, nth)] = idx
+    return keys
+
+
+def diff(old: Project, new: Project) -> ProjectDiff:
+    """Finds the differences between two versions of a project.
+
+    Runs in linear time: the properties are matched through a hash table of their names and
+    only the matched properties which aren't equal are compared field by field.
+
+    Args:
+        old (Project): The old version.
+        new (Project): The new version.
+
+    Returns:
+        ProjectDiff: The differences.
+    """
+    result = ProjectDiff()
+    for name in _INFO_FIELDS:
+        _compare(name, getattr(old.info, name), getattr(new.info, name), result.info)
+
+    old_props, new_props = list(old.properties), list(new.properties)
+    old_keys = _keyed(old_props)
+    matched = set()
+
+    for key, new_idx in _keyed(new_props).items():
+        old_idx = old_keys.get(key)
+        prop = new_props[new_idx]
+        if old_idx is None:
+            result.added.append((new_idx, prop))
+            continue
+        matched.add(old_idx)
+        before = old_props[old_idx]
+        if (
+            before.meta == prop.meta and before.description == prop.description and
+            before.ptype is prop.ptype and before.preconditions == prop.preconditions
+        ):
+            result.unchanged += 1
+            continue
+        changes = diff_properties(before, prop)
+        if changes:
+            result.changed.append(PropertyChange(prop.name, old_idx, new_idx, changes))
+        else:
+            result.unchanged += 1
+
+    result.removed = [
+        (idx, prop) for idx, prop in enumerate(old_props) if idx not in matched
+    ]
+    return result
@@ -0,0 +1,383 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+"""Projects split over several files with ``include``.
+
+A project file may list other files, or globs, to take properties from:
+
+.. code-block:: yaml
+
+    project:
+      name: soc
+      version: 1.0.0
+      description: ''
+    include:
+      - cpu/properties.yaml
+      - 'periph/*.yaml'
+    properties: []
+
+Paths are relative to the file which includes them. An included file holds a ``properties``
+list (any ``project`` information in it is ignored) and may include other files itself. Each
+file is included once, however many times it is listed.
+
+Saving the project back over its project file writes each property to the file it came from
+(see Origins), so the files stay split.
+
+The included files are read concurrently, each through the cache (see :mod:`mavsec.cache`),
+so after editing one file only that file is parsed again. Files which need parsing are parsed
+in worker processes when there are several of them, since parsing holds the GIL. The properties
+are merged in a fixed order whatever order the reads finish in: a file's own properties, then
+those of each file it includes, in the order listed (glob matches sorted by path).
+"""
+
+from __future__ import annotations
+from typing import TYPE_CHECKING, Callable, Iterable, Mapping, TypeVar
+
+from dataclasses import dataclass, field
+from concurrent import futures
+
+import glob
+import multiprocessing
+import os
+import pathlib
+import threading
+
+from mavsec import cache, trace
+from mavsec.schema import Schema, write_data
+
+if TYPE_CHECKING:
+    from mavsec.project import Project
+
+
+INCLUDE_KEY = "include"
+"""The key of a project file listing the files to include."""
+
+PropT = TypeVar("PropT")
+
+
+def _read(path: pathlib.Path, use_cache: bool) -> dict:
+    data = cache.read_data(path) if use_cache else Schema.read_data(path)
+    if isinstance(data, list):
+        # A file holding only a list of properties
+        return {"properties": data}
+    if not isinstance(data, dict):
+        raise ValueError(f"{path} does not hold a project or a list of properties.")
+    return data
+
+
+def _read_all(
+            paths: list[pathlib.Path],
+            use_cache: bool,
+            jobs: int | None,
+            threads: futures.Executor
+        ) -> dict[pathlib.Path, dict]:
+    """Reads files concurrently.
+
+    Reading a file from the cache is mostly I/O, so those are read in the thread pool. Parsing
+    holds the GIL, so when several files need parsing they are parsed in worker processes
+    (which also update the cache). Off the main thread (e.g. on a GUI worker) the processes are
+    spawned rather than forked, since forking while other threads hold locks can deadlock.
+    """
+    parse = [path for path in paths if not (use_cache and cache.is_fresh(path))]
+    cpus = os.cpu_count() or 1
+    procs = None
+    if len(parse) > 1 and cpus > 1:
+        context = None
+        if threading.current_thread() is not threading.main_thread():
+            context = multiprocessing.get_context("spawn")
+        procs = futures.ProcessPoolExecutor(
+            max_workers=min(len(parse), jobs or cpus), mp_context=context
+        )
+
+    try:
+        pending = {
+            path: (procs if procs is not None and path in parse else threads).submit(
+                _read, path, use_cache
+            )
+            for path in paths
+        }
+        return {path: fut.result() for path, fut in pending.items()}
+    finally:
+        if procs is not None:
+            procs.shutdown(cancel_futures=True)
+
+
+def _patterns(data: dict, source: pathlib.Path) -> list[str]:
+    patterns = data.get(INCLUDE_KEY) or []
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    if not isinstance(patterns, list) or not all(isinstance(pat, str) for pat in patterns):
+        raise ValueError(f"{INCLUDE_KEY} in {source} must be a path or a list of paths.")
+    return patterns
+
+
+def expand(patterns: Iterable[str], base: pathlib.Path) -> list[pathlib.Path]:
+    """Expands include paths and globs.
+
+    Args:
+        patterns (Iterable[str]): The paths and globs (``**`` is supported).
+        base (pathlib.Path): The directory they are relative to.
+
+    Returns:
+        list[pathlib.Path]: The files, in the order listed with glob matches sorted.
+    """
+    paths: list[pathlib.Path] = []
+    for pat in patterns:
+        full = base.joinpath(pat)
+        if glob.has_magic(pat):
+            matches = sorted(glob.glob(str(full), recursive=True))
+            paths.extend(pathlib.Path(match) for match in matches)
+        else:
+            # A missing file is an error when it is read, unlike a glob which matches nothing
+            paths.append(full)
+    return paths
+
+
+@dataclass
+class IncludeTree:
+    """The files a project file includes, directly or through other included files."""
+
+    source: pathlib.Path
+    """The project file, resolved."""
+    files: dict[pathlib.Path, dict] = field(default_factory=dict)
+    """The contents of every file, including the project file, by resolved path."""
+    children: dict[pathlib.Path, list[pathlib.Path]] = field(default_factory=dict)
+    """The files each file includes, in the order listed."""
+    globs: list[str] = field(default_factory=list)
+    """The globs files were included by, as absolute patterns, so new matches can be found."""
+
+    def order(self) -> list[pathlib.Path]:
+        """Gets the files in the order their properties are merged in."""
+        order: dict[pathlib.Path, None] = {}
+        stack = [self.source]
+        while stack:
+            path = stack.pop()
+            if path not in order:
+                order[path] = None
+                stack.extend(reversed(self.children.get(path, [])))
+        return list(order)
+
+
+def load(
+            data: dict,
+            source: str | pathlib.Path,
+            use_cache: bool = True,
+            jobs: int | None = None,
+            loaded: Mapping[pathlib.Path, dict] | None = None
+        ) -> IncludeTree:
+    """Reads every file a project file includes.
+
+    Args:
+        data (dict): The contents of the project file.
+        source (str | pathlib.Path): The project file.
+        use_cache (bool): Read the included files through the cache.
+        jobs (int | None): The number of threads, and processes, reading files. Defaults to
+            the ThreadPoolExecutor default and the number of CPUs.
+        loaded (Mapping[pathlib.Path, dict] | None): The contents of files which are already
+            known (e.g. they haven't changed since they were last read), by resolved path.
+
+    Returns:
+        IncludeTree: The included files.
+    """
+    tree = IncludeTree(pathlib.Path(source).resolve())
+    tree.files[tree.source] = data
+    loaded = loaded or {}
+
+    # Read a level of includes at a time, so every file of a level is read at once
+    level = [tree.source]
+    with futures.ThreadPoolExecutor(max_workers=jobs) as pool:
+        while level:
+            added: dict[pathlib.Path, None] = {}
+            for path in level:
+                patterns = _patterns(tree.files[path], path)
+                tree.globs.extend(
+                    str(path.parent.joinpath(pat)) for pat in patterns if glob.has_magic(pat)
+                )
+                tree.children[path] = []
+                for child in expand(patterns, path.parent):
+                    child = child.resolve()
+                    tree.children[path].append(child)
+                    if child not in tree.files:
+                        added[child] = None
+
+            unread = [path for path in added if path not in loaded]
+            tree.files.update({path: loaded[path] for path in added if path in loaded})
+            tree.files.update(_read_all(unread, use_cache, jobs, pool))
+            level = list(added)
+    return tree
+
+
+def merge(
+            parts: Iterable[tuple[pathlib.Path, Iterable[PropT]]],
+            name: Callable[[PropT], object],
+            owners: dict[str, pathlib.Path] | None = None
+        ) -> list[PropT]:
+    """Merges the properties of several files, checking no two files use the same name.
+
+    Args:
+        parts (Iterable[tuple[pathlib.Path, Iterable[PropT]]]): Each file and its properties,
+            in order (see IncludeTree.order).
+        name (Callable[[PropT], object]): Gets the name of a property.
+        owners (dict[str, pathlib.Path] | None): The file of properties already merged, by
+            name.
+
+    Raises:
+        ValueError: If two files have properties with the same name.
+
+    Returns:
+        list[PropT]: The properties.
+    """
+    owners = {} if owners is None else owners
+    merged: list[PropT] = []
+    for path, props in parts:
+        for prop in props:
+            prop_name = name(prop)
+            if isinstance(prop_name, str):
+                # Repeats within a file are left for the validator to report
+                owner = owners.setdefault(prop_name, path)
+                if owner != path:
+                    raise ValueError(f"Property {prop_name!r} is in both {owner} and {path}.")
+            merged.append(prop)
+    return merged
+
+
+def _dict_name(prop: object) -> object:
+    return prop.get("name") if isinstance(prop, dict) else None
+
+
+@dataclass
+class Origins:
+    """Where the properties of a project split over several files came from."""
+
+    tree: IncludeTree
+    """The files of the project, as they were last read or written."""
+    owners: dict[int, tuple[object, pathlib.Path]] = field(default_factory=dict)
+    """The file each property came from, by the id of the property (or of the dictionary it
+    is created from). The property is kept with it so the id isn't reused."""
+
+    def add(self, prop: object, path: pathlib.Path) -> None:
+        """Records the file a property came from."""
+        self.owners[id(prop)] = (prop, path)
+
+    def adopt(self, data: dict, prop: object) -> None:
+        """Moves the file of a dictionary to the property created from it."""
+        owner = self.owners.pop(id(data), None)
+        if owner is not None and owner[0] is data:
+            self.add(prop, owner[1])
+
+    def owner(self, prop: object) -> pathlib.Path:
+        """Gets the file a property came from, the project file if it wasn't in any."""
+        owner = self.owners.get(id(prop))
+        return self.tree.source if owner is None or owner[0] is not prop else owner[1]
+
+    def save(self, project: Project) -> list[pathlib.Path]:
+        """Writes each property of a project back to the file it came from.
+
+        Properties are followed by identity, so a renamed property stays in its file.
+        Properties which weren't in any file (e.g. added since the project was loaded) are
+        written to the project file. The ``include`` lists are kept, and files whose
+        properties haven't changed aren't written.
+
+        Args:
+            project (Project): The project, which must have been loaded from tree.source.
+
+        Returns:
+            list[pathlib.Path]: The files written.
+        """
+        tree = self.tree
+        parts: dict[pathlib.Path, list[dict]] = {path: [] for path in tree.order()}
+        owners: dict[int, tuple[object, pathlib.Path]] = {}
+        for prop in project.properties:
+            path = self.owner(prop)
+            parts[path].append(prop.to_dict())
+            owners[id(prop)] = (prop, path)
+
+        written = []
+        for path, props in parts.items():
+            data = dict(tree.files[path])
+            if path == tree.source:
+                data["project"] = project.info.to_dict()
+            data["properties"] = props
+            if data == tree.files[path]:
+                continue
+            write_data(path, data)
+            tree.files[path] = data
+            written.append(path)
+
+        self.owners = owners
+        return written
+
+
+def resolve_origins(
+            data: dict,
+            source: str | pathlib.Path,
+            use_cache: bool = True,
+            jobs: int | None = None,
+            names: Iterable[str] = ()
+        ) -> tuple[dict, Origins | None]:
+    """Merges the properties of the files a project file includes into it (see resolve),
+    recording which file each came from.
+
+    Returns:
+        tuple[dict, Origins | None]: The merged contents, and where the properties came from
+        or None if nothing is included.
+    """
+    source = pathlib.Path(source)
+    if not _patterns(data, source):
+        return data, None
+
+    with trace.span("include", file=str(source)):
+        tree = load(data, source, use_cache, jobs)
+        trace.count("include.files", len(tree.files) - 1)
+        parts = [(path, tree.files[path].get("properties") or []) for path in tree.order()]
+        properties = merge(parts, _dict_name, dict.fromkeys(names, tree.source))
+
+    origins = Origins(tree)
+    for path, props in parts:
+        for prop in props:
+            origins.add(prop, path)
+    merged = {key: value for key, value in data.items() if key != INCLUDE_KEY}
+    merged["properties"] = properties
+    return merged, origins
+
+
+def resolve(
+            data: dict,
+            source: str | pathlib.Path,
+            use_cache: bool = True,
+            jobs: int | None = None,
+            names: Iterable[str] = ()
+        ) -> dict:
+    """Merges the properties of the files a project file includes into it.
+
+    Args:
+        data (dict): The contents of the project file.
+        source (str | pathlib.Path): The project file.
+        use_cache (bool): Read the included files through the cache.
+        jobs (int | None): The number of threads, and processes, reading files. Defaults to
+            the ThreadPoolExecutor default and the number of CPUs.
+        names (Iterable[str]): The names of properties of the project file which aren't in
+            data (e.g. because it is being streamed), to check the included ones against.
+
+    Raises:
+        ValueError: If two files have properties with the same name.
+
+    Returns:
+        dict: The project file's contents, with the properties of every included file and
+        without ``include``. The same dictionary if nothing is included.
+    """
+    return resolve_origins(data, source, use_cache, jobs, names)[0]
@@ -0,0 +1,305 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+"""Lazy, streaming access to the properties of large projects."""
+
+from __future__ import annotations
+from typing import Any, Callable, IO, Iterable, Iterator, overload
+
+from collections.abc import MutableSequence
+
+import json
+import os
+import pathlib
+
+from mavsec.properties import Property
+
+
+class LazyProperties(MutableSequence[Property]):
+    """A list of properties which only creates each Property when it is first accessed.
+
+    The raw property dictionaries are pulled from the source as they are needed, so a source
+    which reads a file incrementally is only read as far as the furthest property accessed.
+    Taking the length, indexing from the end or changing the list reads the whole source.
+    Errors in a property's data are raised when that property is accessed.
+
+    Args:
+        source (Iterable[dict | Property]): The properties, or their dictionaries.
+        created (Callable[[dict, Property], None] | None): Called with each dictionary and the
+            Property created from it.
+    """
+
+    def __init__(
+                self,
+                source: Iterable[dict | Property] = (),
+                created: Callable[[dict, Property], None] | None = None
+            ):
+        self._items: list[dict | Property] = []
+        self._source: Iterator[dict | Property] | None = iter(source)
+        self._created = created
+
+    def _pull(self, count: int | None = None) -> None:
+        """Reads from the source until there are count items, or all of it if count is None."""
+        if self._source is None:
+            return
+        for item in self._source:
+            self._items.append(item)
+            if count is not None and len(self._items) >= count:
+                return
+        self._source = None
+
+    def _get(self, idx: int) -> Property:
+        item = self._items[idx]
+        if isinstance(item, dict):
+            prop = Property.from_dict(item)
+            if self._created is not None:
+                self._created(item, prop)
+            self._items[idx] = prop
+            return prop
+        return item
+
+    def materialized(self) -> int:
+        """Gets the number of properties which have been created so far."""
+        return sum(isinstance(item, Property) for item in self._items)
+
+    @overload
+    def __getitem__(self, index: int) -> Property: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[Property]: ...
+
+    def __getitem__(self, index: int | slice) -> Property | list[Property]:
+        if isinstance(index, slice):
+            self._pull()
+            return [self._get(i) for i in range(*index.indices(len(self._items)))]
+        if index < 0:
+            self._pull()
+        else:
+            self._pull(index + 1)
+        return self._get(index)
+
+    def __setitem__(self, index: Any, value: Any) -> None:
+        self._pull()
+        self._items[index] = value
+
+    def __delitem__(self, index: int | slice) -> None:
+        self._pull()
+        del self._items[index]
+
+    def __len__(self) -> int:
+        self._pull()
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[Property]:
+        idx = 0
+        while True:
+            if idx >= len(self._items):
+                self._pull(idx + 1)
+                if idx >= len(self._items):
+                    return
+            yield self._get(idx)
+            idx += 1
+
+    def insert(self, index: int, value: Property) -> None:
+        self._pull()
+        self._items.insert(index, value)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, (LazyProperties, list)):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        state = "partially read" if self._source is not None else f"{len(self._items)} properties"
+        return f"LazyProperties({state}, {self.materialized()} created)"
+
+
+class _JsonReader:
+    """Reads JSON values one at a time from a text file without reading all of it."""
+
+    _WHITESPACE = " \t\n\r"
+
+    def __init__(self, file: IO[str], chunk: int = 1 << 16):
+        self._file = file
+        self._chunk = chunk
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self, size: int) -> bool:
+        if self._eof:
+            return False
+        data = self._file.read(size)
+        if not data:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + data
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Skips whitespace and returns the next character, or "" at the end of the file."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in self._WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill(self._chunk):
+                return ""
+
+    def expect(self, chars: str) -> str:
+        """Consumes the next character, which must be one of chars."""
+        char = self.peek()
+        if char == "" or char not in chars:
+            raise ValueError(f"Invalid JSON: expected one of {chars!r} but found {char!r}")
+        self._pos += 1
+        return char
+
+    def value(self) -> Any:
+        """Decodes the next JSON value."""
+        self.peek()
+        while True:
+            try:
+                obj, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                # The value may continue past the end of the buffer
+                if self._fill(max(self._chunk, len(self._buf))):
+                    continue
+                raise
+            # A number at the end of the buffer may also continue in the file
+            if end == len(self._buf) and self._fill(self._chunk):
+                continue
+            self._pos = end
+            return obj
+
+
+def iter_json(path: str | pathlib.Path) -> Iterator[tuple[str, Any]]:
+    """Reads a JSON project file incrementally.
+
+    Args:
+        path (str | pathlib.Path): The JSON project file.
+
+    Yields:
+        tuple[str, Any]: ``("project", info)`` for the project information,
+        ``("property", data)`` for each property and ``("include", paths)`` for the files it
+        includes (see :mod:`mavsec.include`), in the order they are in the file.
+    """
+    with open(path, "r") as file:
+        reader = _JsonReader(file)
+        reader.expect("{")
+        if reader.peek() == "}":
+            return
+        while True:
+            key = reader.value()
+            reader.expect(":")
+            if key == "properties":
+                reader.expect("[")
+                if reader.peek() == "]":
+                    reader.expect("]")
+                else:
+                    while True:
+                        yield "property", reader.value()
+                        if reader.expect(",]") == "]":
+                            break
+            elif key in ("project", "include"):
+                yield key, reader.value()
+            else:
+                reader.value()
+            if reader.expect(",}") == "}":
+                return
+
+
+def iter_jsonl(path: str | pathlib.Path) -> Iterator[tuple[str, Any]]:
+    """Reads a JSON Lines project file incrementally.
+
+    The first line holds ``{"project": {...}}``, and optionally ``"include"``, and each
+    following line holds one property.
+
+    Args:
+        path (str | pathlib.Path): The JSON Lines project file.
+
+    Yields:
+        tuple[str, Any]: ``("project", info)``, ``("include", paths)`` if the file includes
+        others, then ``("property", data)`` for each property.
+    """
+    with open(path, "r") as file:
+        header = file.readline()
+        if not header.strip():
+            raise ValueError(f"{path} does not start with a project header.")
+        header_data = json.loads(header)
+        yield "project", header_data["project"]
+        if "include" in header_data:
+            yield "include", header_data["include"]
+        for line in file:
+            if line.strip():
+                yield "property", json.loads(line)
+
+
+def append_jsonl(path: str | pathlib.Path, properties: Iterable[Property]) -> int:
+    """Appends properties to a JSON Lines project file without rewriting it.
+
+    The names are not checked against the properties already in the file, which would mean
+    reading all of it; duplicates are reported by validation.
+
+    Args:
+        path (str | pathlib.Path): The JSON Lines project file, which must already have its
+            project header.
+        properties (Iterable[Property]): The properties to add.
+
+    Returns:
+        int: The number of properties appended.
+    """
+    lines = [json.dumps(prop.to_dict()) + "\n" for prop in properties]
+    with open(path, "rb") as file:
+        if not file.readline().strip():
+            raise ValueError(f"{path} does not start with a project header.")
+        file.seek(-1, os.SEEK_END)
+        # A file whose last line wasn't ended (e.g. edited by hand) needs a newline first
+        ended = file.read(1) == b"\n"
+    # Written at once so an interrupted append leaves at most one broken line
+    with open(path, "a") as file:
+        file.write(("" if ended else "\n") + "".join(lines))
+    return len(lines)
+
+
+def split_stream(events: Iterator[tuple[str, Any]]) -> tuple[dict, Iterator[dict]]:
+    """Splits the events of a project file into the project information and properties.
+
+    Only the properties before the project information (normally none) are read straight away,
+    the rest are read as the returned iterator is consumed.
+
+    Args:
+        events (Iterator[tuple[str, Any]]): The events from iter_json or iter_jsonl.
+
+    Returns:
+        tuple[dict, Iterator[dict]]: The project information and the property data.
+    """
+    before: list[dict] = []
+    for kind, data in events:
+        if kind == "project":
+            return data, _chain_properties(before, events)
+        if kind == "property":
+            before.append(data)
+    raise ValueError("The project file has no project information.")
+
+
+def _chain_properties(before: list[dict], events: Iterator[tuple[str, Any]]) -> Iterator[dict]:
+    yield from before
+    for kind, data in events:
+        if kind == "property":
+            yield data
@@ -0,0 +1,312 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+"""Parsing, normalising and checking property preconditions.
+
+Preconditions are SystemVerilog style boolean expressions, e.g. ``pprot[2]==0 && penable``.
+Each distinct expression is parsed once and normalised, so that expressions which only differ
+in spacing, the order of commutative operands or repeated terms are treated as the same
+precondition. This lets a project define each precondition once in its TCL and lets the
+validator spot preconditions which can never be true.
+"""
+
+from __future__ import annotations
+from typing import Any, TypeAlias
+
+from dataclasses import dataclass, field
+
+import functools
+import hashlib
+import re
+
+from mavsec import svp
+
+
+Node: TypeAlias = tuple[Any, ...]
+"""A node of a parsed expression.
+
+``("sig", name)`` is a signal, ``("num", literal)`` a number, ``(op, operand)`` a unary
+operator, ``(op, left, right)`` a binary operator and ``("&&", *terms)``/``("||", *terms)``
+a conjunction or disjunction.
+"""
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<num>\d*\s*'[sS]?[bBoOdDhH]\s*[0-9a-fA-F_xXzZ?]+|'[01xXzZ]|\d[\d_]*)
+      | (?P<sig>[A-Za-z_][\w$]*(?:\s*\[[^\]]*\])*(?:\.[A-Za-z_][\w$]*(?:\s*\[[^\]]*\])*)*)
+      | (?P<op>===|!==|==|!=|<=|>=|&&|\|\||[!~()<>&|^])
+    )
+""", re.VERBOSE)
+
+_BINARY = {
+    "||": 1, "&&": 2, "|": 3, "^": 4, "&": 5,
+    "==": 6, "!=": 6, "===": 6, "!==": 6,
+    "<": 7, "<=": 7, ">": 7, ">=": 7,
+}
+"""The precedence of each binary operator (higher binds tighter)."""
+
+_UNARY = 8
+_COMMUTATIVE = frozenset(("==", "!=", "===", "!==", "&", "|", "^"))
+_FLATTENED = frozenset(("&&", "||"))
+_BASES = {"b": 2, "o": 8, "d": 10, "h": 16}
+
+
+class PreconditionError(ValueError):
+    """A precondition could not be parsed."""
+
+
+def _tokenize(text: str) -> list[tuple[str, str]]:
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if match is None or match.end() == pos:
+            raise PreconditionError(f"unexpected {text[pos:].strip()[:10]!r}")
+        kind = match.lastgroup
+        assert kind is not None
+        tokens.append((kind, re.sub(r"\s+", "", match.group(kind))))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    def __init__(self, text: str):
+        self._tokens = _tokenize(text)
+        self._pos = 0
+
+    def _peek(self) -> tuple[str, str] | None:
+        return self._tokens[self._pos] if self._pos < len(self._tokens) else None
+
+    def _next(self) -> tuple[str, str]:
+        token = self._peek()
+        if token is None:
+            raise PreconditionError("unexpected end of expression")
+        self._pos += 1
+        return token
+
+    def parse(self) -> Node:
+        node = self._expr(0)
+        if self._peek() is not None:
+            raise PreconditionError(f"unexpected {self._peek()[1]!r}")  # type: ignore[index]
+        return node
+
+    def _expr(self, min_prec: int) -> Node:
+        node = self._unary()
+        while True:
+            token = self._peek()
+            if token is None or token[0] != "op" or token[1] not in _BINARY:
+                return node
+            prec = _BINARY[token[1]]
+            if prec <= min_prec:
+                return node
+            self._next()
+            node = (token[1], node, self._expr(prec))
+
+    def _unary(self) -> Node:
+        kind, value = self._next()
+        if kind == "op" and value in ("!", "~"):
+            return (value, self._unary())
+        if kind == "op" and value == "(":
+            node = self._expr(0)
+            if self._next() != ("op", ")"):
+                raise PreconditionError("missing )")
+            return node
+        if kind in ("sig", "num"):
+            return (kind, value)
+        raise PreconditionError(f"unexpected {value!r}")
+
+
+def to_text(node: Node, parent_prec: int = 0) -> str:
+    """Prints a parsed expression, with only the brackets which are needed.
+
+    Args:
+        node (Node): The expression.
+        parent_prec (int): The precedence of the operator the expression is an operand of.
+
+    Returns:
+        str: The expression.
+    """
+    op = node[0]
+    if op in ("sig", "num"):
+        return node[1]
+    if len(node) == 2:
+        return op + to_text(node[1], _UNARY)
+
+    prec = _BINARY[op]
+    sep = f" {op} " if op in _FLATTENED else op
+    text = sep.join(to_text(operand, prec) for operand in node[1:])
+    return f"({text})" if prec <= parent_prec else text
+
+
+def normalise(node: Node) -> Node:
+    """Puts an expression into a canonical form.
+
+    ``&&`` and ``||`` are flattened and their repeated terms removed. The operands of
+    ``&&``, ``||`` and the other commutative operators are sorted. ``!!x`` becomes ``x``.
+
+    Args:
+        node (Node): The expression.
+
+    Returns:
+        Node: The normalised expression.
+    """
+    op = node[0]
+    if op in ("sig", "num"):
+        return node
+    if len(node) == 2:
+        operand = normalise(node[1])
+        if op == "!" and operand[0] == "!":
+            return operand[1]
+        return (op, operand)
+
+    if op in _FLATTENED:
+        terms: dict[str, Node] = {}
+        stack = list(node[1:])
+        while stack:
+            term = normalise(stack.pop())
+            if term[0] == op:
+                stack.extend(term[1:])
+            else:
+                terms[to_text(term)] = term
+        if len(terms) == 1:
+            return next(iter(terms.values()))
+        return (op, *(terms[key] for key in sorted(terms)))
+
+    left, right = normalise(node[1]), normalise(node[2])
+    if op in _COMMUTATIVE and _order(right) < _order(left):
+        left, right = right, left
+    return (op, left, right)
+
+
+def _order(node: Node) -> tuple[bool, str]:
+    # Constants are put after signals, e.g. pprot[2]==0 rather than 0==pprot[2]
+    return (node[0] == "num", to_text(node))
+
+
+def _number(literal: str) -> int | None:
+    """Gets the value of a number literal, or None if it has x or z bits."""
+    literal = literal.replace("_", "").lower()
+    if "'" not in literal:
+        return int(literal)
+    digits = literal.split("'", 1)[1].lstrip("s")
+    if len(digits) == 1:
+        # An unsized fill literal, only '0 has a value which doesn't depend on the width
+        return 0 if digits == "0" else None
+    try:
+        return int(digits[1:], _BASES[digits[0]])
+    except (KeyError, ValueError):
+        return None
+
+
+def contradictions(node: Node) -> list[str]:
+    """Finds the terms of a normalised expression which can never all be true.
+
+    Only conjunctions of simple terms are checked: a signal and its negation, or a signal
+    compared to two different values (or equal and not equal to the same value).
+
+    Args:
+        node (Node): The normalised expression.
+
+    Returns:
+        list[str]: A description of each contradiction.
+    """
+    terms = list(node[1:]) if node[0] == "&&" else [node]
+    texts = {to_text(term) for term in terms}
+    found = []
+
+    equal: dict[str, dict[int, str]] = {}
+    not_equal: dict[str, dict[int, str]] = {}
+    for term in terms:
+        if term[0] == "!" and to_text(term[1]) in texts:
+            found.append(f"{to_text(term[1])} and {to_text(term)}")
+        if term[0] in ("==", "!=", "===", "!==") and term[1][0] == "sig" and term[2][0] == "num":
+            value = _number(term[2][1])
+            if value is not None:
+                facts = equal if term[0] in ("==", "===") else not_equal
+                facts.setdefault(term[1][1], {})[value] = to_text(term)
+
+    for sig, values in equal.items():
+        if len(values) > 1:
+            found.append(" and ".join(values.values()))
+        for value, text in values.items():
+            if value in not_equal.get(sig, {}):
+                found.append(f"{text} and {not_equal[sig][value]}")
+    return found
+
+
+@dataclass(frozen=True)
+class Precondition:
+    """A parsed and normalised precondition."""
+
+    raw: str
+    """The precondition as it was written."""
+    text: str
+    """The normalised precondition, or the stripped raw one if it couldn't be parsed."""
+    node: Node | None = field(default=None, repr=False)
+    """The normalised expression, or None if it couldn't be parsed."""
+    error: str | None = None
+    """Why the precondition couldn't be parsed."""
+    contradictions: tuple[str, ...] = ()
+    """The terms of the precondition which can never all be true."""
+
+    @functools.cached_property
+    def var(self) -> str:
+        """The TCL variable the precondition is set in, if it is shared (see svp.precondition_defs).
+
+        The name comes from the text rather than the order preconditions are first used in, so
+        adding a precondition doesn't change the TCL of the properties which already refer to
+        the others. Two preconditions can have the same digest, Project.precondition_vars tells
+        them apart.
+        """
+        digest = hashlib.blake2b(self.text.encode(), digest_size=8).hexdigest()
+        return f"mavsec_pc_{digest}"
+
+    @functools.cached_property
+    def shared(self) -> bool:
+        """Whether the precondition is set once in a variable rather than written out in every
+        property, which is only done when referring to the variable is shorter."""
+        return len(self.var) + 1 < len(svp.escape(self.text))
+
+    def to_tcl(self, var: str | None = None) -> str:
+        """Gets the TCL word for the precondition, the variable if it is shared.
+
+        Args:
+            var (str | None): The variable the precondition is set in, if it isn't var.
+        """
+        return f"${var or self.var}" if self.shared else svp.escape(self.text)
+
+
+@functools.lru_cache(maxsize=4096)
+def parse(raw: str) -> Precondition:
+    """Parses and normalises a precondition.
+
+    The same precondition is usually repeated on many properties, so the results are cached.
+    A precondition which can't be parsed (e.g. it uses syntax this parser doesn't know) is
+    still returned, so it can be passed to JasperGold as it is.
+
+    Args:
+        raw (str): The precondition.
+
+    Returns:
+        Precondition: The parsed precondition.
+    """
+    try:
+        node = normalise(_Parser(raw).parse())
+    except PreconditionError as err:
+        return Precondition(raw, raw.strip(), error=str(err))
+    return Precondition(raw, to_text(node), node, contradictions=tuple(contradictions(node)))
@@ -17,12 +17,19 @@
 #####################################################################################
 
 from __future__ import annotations
+from typing import Any, Callable, Iterable, Iterator, MutableSequence
 
 from dataclasses import dataclass, field
 
-from mavsec.schema import Schema
-from mavsec.properties import Property
+from mavsec.schema import Schema, atomic_write
+from mavsec.properties import Property, SpecialRtlPaths
+from mavsec.rtl import DesignIndex
+from mavsec.lazy import LazyProperties, iter_json, iter_jsonl, split_stream
+from mavsec import cache, include, precond, store, svp, trace
 
+import contextlib
+import hashlib
+import os
 import pathlib
 
 
@@ -32,23 +39,198 @@ class Project(Schema):
 
     info: ProjectInfo
     """Information about the project."""
-    properties: list[Property] = field(default_factory=list)
+    properties: MutableSequence[Property] = field(default_factory=list)
+    """The properties of the project. A LazyProperties if the project was loaded lazily, or a
+    StoreProperties if it was opened from a store."""
+    origins: include.Origins | None = field(default=None, repr=False, compare=False)
+    """Which file each property came from, if the project file includes others."""
 
     @classmethod
-    def from_dict(cls, data: dict) -> Project:
+    @trace.traced("from_dict")
+    def from_dict(
+                cls,
+                data: dict,
+                lazy: bool = False,
+                origins: include.Origins | None = None
+            ) -> Project:
         """Get a Project object from a dictionary.
 
         Args:
             data (dict): The dictionary to convert to a Project object.
+            lazy (bool): Only create each Property when it is first accessed.
+            origins (include.Origins | None): Where the property dictionaries came from, which
+                is passed on to the properties created from them.
 
         Returns:
             Project: The Project object.
         """
+        created = None if origins is None else origins.adopt
+        if lazy:
+            properties: MutableSequence[Property] = LazyProperties(data["properties"], created)
+        else:
+            properties = [Property.from_dict(prop) for prop in data["properties"]]
+            if created is not None:
+                for raw, prop in zip(data["properties"], properties):
+                    created(raw, prop)
+            trace.count("properties.created", len(properties))
+
         return cls(
             info=ProjectInfo.from_dict(data["project"]),
-            properties=[Property.from_dict(prop) for prop in data["properties"]],
+            properties=properties,
+            origins=origins,
         )
 
+    @classmethod
+    @trace.traced("from_file")
+    def from_file(
+                cls,
+                path: str | pathlib.Path,
+                lazy: bool = False,
+                use_cache: bool = True
+            ) -> Project:
+        """Get a Project object from a file.
+
+        The properties of the files it includes are added (see :mod:`mavsec.include`). Saving
+        the project over the same file writes each property back to the file it came from. A
+        ``.db`` or ``.sqlite`` file is opened as a store (see :mod:`mavsec.store`).
+
+        Args:
+            path (str): The path to the file.
+            lazy (bool): Only create each Property when it is first accessed. JSON and JSON
+                Lines files are also only read as far as the properties accessed.
+            use_cache (bool): Load the parsed files from the binary cache in ``.mavsec-cache``
+                when they are up to date (see :mod:`mavsec.cache`).
+
+        Returns:
+            Project: The Project object.
+        """
+        path = pathlib.Path(path)
+        if path.suffix in store.SUFFIXES:
+            # Always lazy, the properties are read from the database as they are accessed
+            return store.load(path)
+        if lazy and path.suffix == ".json":
+            return cls.from_json(path, lazy=True)
+        if lazy and path.suffix == ".jsonl":
+            return cls.from_jsonl(path, lazy=True)
+
+        data = cache.read_data(path) if use_cache else cls.read_data(path)
+        merged, origins = include.resolve_origins(data, path, use_cache)
+        return cls.from_dict(merged, lazy=lazy, origins=origins)
+
+    @classmethod
+    def from_json(cls, path: str | pathlib.Path, lazy: bool = False) -> Project:
+        """Get a Project object from a JSON file.
+
+        Args:
+            path (str): The path to the JSON file.
+            lazy (bool): Only read and create each Property when it is first accessed.
+
+        Returns:
+            Project: The Project object.
+        """
+        if not lazy:
+            return cls.from_dict(cls._read_json(path))
+        return cls._from_stream(iter_json(path), path)
+
+    @classmethod
+    def from_jsonl(cls, path: str | pathlib.Path, lazy: bool = False) -> Project:
+        """Get a Project object from a JSON Lines file.
+
+        The first line holds the project information (and the files it includes) and each
+        following line one property, so properties can be added with lazy.append_jsonl.
+
+        Args:
+            path (str): The path to the JSON Lines file.
+            lazy (bool): Only read and create each Property when it is first accessed.
+
+        Returns:
+            Project: The Project object.
+        """
+        proj = cls._from_stream(iter_jsonl(path), path)
+        if not lazy:
+            proj.properties = list(proj.properties)
+        return proj
+
+    @classmethod
+    def iter_properties(
+                cls,
+                path: str | pathlib.Path,
+                use_cache: bool = True
+            ) -> Iterator[Property]:
+        """Reads the properties of a project file one at a time.
+
+        Unlike the properties of a lazily loaded project, they are not kept once they have
+        been yielded. JSON and JSON Lines files are only read as far as the properties yielded,
+        other formats are parsed first.
+
+        Args:
+            path (str): The path to the file.
+            use_cache (bool): Load the parsed files from the binary cache in ``.mavsec-cache``
+                when they are up to date (see :mod:`mavsec.cache`).
+
+        Yields:
+            Property: Each property, followed by those of the files it includes.
+        """
+        path = pathlib.Path(path)
+        if path.suffix == ".json":
+            props = cls._stream(iter_json(path), path)[1]
+        elif path.suffix == ".jsonl":
+            props = cls._stream(iter_jsonl(path), path)[1]
+        else:
+            data = cache.read_data(path) if use_cache else cls.read_data(path)
+            props = iter(include.resolve(data, path, use_cache)["properties"])
+        for prop in props:
+            yield Property.from_dict(prop)
+
+    @classmethod
+    def _from_stream(
+                cls,
+                events: Iterator[tuple[str, Any]],
+                source: str | pathlib.Path
+            ) -> Project:
+        def found(origins: include.Origins) -> None:
+            proj.origins = origins
+
+        def created(raw: dict, prop: Property) -> None:
+            if proj.origins is not None:
+                proj.origins.adopt(raw, prop)
+
+        info, props = cls._stream(events, source, found)
+        proj = cls(ProjectInfo.from_dict(info), LazyProperties(props, created))
+        return proj
+
+    @staticmethod
+    def _stream(
+                events: Iterator[tuple[str, Any]],
+                source: str | pathlib.Path,
+                found: Callable[[include.Origins], None] | None = None
+            ) -> tuple[dict, Iterator[dict]]:
+        patterns: list[str] = []
+
+        def without_includes() -> Iterator[tuple[str, Any]]:
+            for kind, data in events:
+                if kind == "include":
+                    patterns.extend([data] if isinstance(data, str) else data)
+                else:
+                    yield kind, data
+
+        info, props = split_stream(without_includes())
+
+        def with_includes() -> Iterator[dict]:
+            names: list[str] = []
+            for prop in props:
+                names.append(prop["name"])
+                yield prop
+            # The included files are only read once the file's own properties are
+            if patterns:
+                data = {"project": info, include.INCLUDE_KEY: patterns}
+                merged, origins = include.resolve_origins(data, source, names=names)
+                if found is not None and origins is not None:
+                    found(origins)
+                yield from merged["properties"]
+
+        return info, with_includes()
+
     def to_dict(self) -> dict:
         """Convert the object to a dictionary.
 
@@ -60,8 +242,18 @@ class Project(Schema):
             "properties": [prop.to_dict() for prop in self.properties],
         }
 
+    def _split_items(self) -> tuple[dict, Iterable[dict]]:
+        # Each property is only converted when it is written
+        return {"project": self.info.to_dict()}, (prop.to_dict() for prop in self.properties)
+
     def to_file(self, filename: str | pathlib.Path | None = None) -> None:
-        """Write the object to a file."""
+        """Write the object to a file.
+
+        The file is replaced atomically, so it is never left half written, and the properties
+        are written as they are converted (see Schema.to_yaml). Saving a project which includes
+        other files over its project file writes each property back to the file it came from
+        (see include.Origins), saving it anywhere else writes every property to the one file.
+        """
         if self.info.proj_file is None and filename is None:
             raise ValueError("Project file not set.")
 
@@ -73,18 +265,185 @@ class Project(Schema):
 
         filepath = pathlib.Path(self.info.proj_file)
 
+        if isinstance(self.properties, LazyProperties):
+            # A streamed project only finds the files it includes once it has read its own
+            len(self.properties)
+        if self.origins is not None and filepath.resolve() == self.origins.tree.source:
+            self.origins.save(self)
+            return
+
         if filepath.suffix in (".yaml", ".yml"):
             self.to_yaml(filepath)
         elif filepath.suffix == ".json":
             self.to_json(filepath)
         elif filepath.suffix == ".toml":
             self.to_toml(filepath)
+        elif filepath.suffix == ".jsonl":
+            self.to_jsonl(filepath)
+        elif filepath.suffix in store.SUFFIXES:
+            store.save(self, filepath)
         else:
             raise ValueError(f"Unsupported file type: {filepath.suffix}")
 
-    def to_tcl(self, filename: str | pathlib.Path | None = None) -> None:
-        """Write the object to a file."""
-        raise NotImplementedError()
+    def precondition_vars(self) -> dict[str, str]:
+        """Gets the TCL variable of each distinct shared precondition of the project's properties.
+
+        Each variable is named by precond.Precondition.var. If the digests of two preconditions
+        are the same, the one used later gets a numbered suffix so each variable holds one
+        precondition.
+
+        Returns:
+            dict[str, str]: The variable of each shared precondition (see
+            precond.Precondition.shared) by its normalised text, in the order they are first
+            used.
+        """
+        found: dict[str, str] = {}
+        taken: set[str] = set()
+        for prop in self.properties:
+            for parsed in prop.compiled_preconditions():
+                if not parsed.shared or parsed.text in found:
+                    continue
+                var, suffix = parsed.var, 1
+                while var in taken:
+                    var = f"{parsed.var}_{suffix}"
+                    suffix += 1
+                found[parsed.text] = var
+                taken.add(var)
+        return found
+
+    def precondition_defs(self) -> dict[str, str]:
+        """Gets the distinct shared preconditions of the project's properties.
+
+        Returns:
+            dict[str, str]: The normalised text of each shared precondition by the TCL variable
+            it is set in (see precondition_vars), in the order they are first used.
+        """
+        return {var: text for text, var in self.precondition_vars().items()}
+
+    def _tcl_header(self, design: DesignIndex | None, pc_vars: dict[str, str]) -> str:
+        header = svp.HEADER
+        if design is not None:
+            used = {
+                path for prop in self.properties for path in prop.flow_paths()
+                if isinstance(path, SpecialRtlPaths)
+            }
+            ports = {
+                path.design_info(): design.resolve(path) for path in SpecialRtlPaths if path in used
+            }
+            if ports:
+                header += svp.port_lists(ports)
+        defs = {var: text for text, var in pc_vars.items()}
+        return header + svp.precondition_defs(defs)
+
+    def iter_tcl(self, design: DesignIndex | None = None) -> Iterator[str]:
+        """Generate the SVP TCL for the project one chunk at a time.
+
+        Each property is converted only when the generator reaches it, so the
+        memory needed does not grow with the number of properties. Preconditions are
+        normalised and each long one is set once in a variable at the top of the file,
+        which the properties refer to.
+
+        Args:
+            design (DesignIndex | None): The design to expand special RTL paths (e.g.
+                ``@OUTPUTS``) with. The ports of each kind the properties use are listed once at
+                the top of the file and each property loops over the list. Without a design
+                JasperGold is asked for them.
+
+        Yields:
+            str: The next chunk of the TCL file.
+        """
+        pc_vars = self.precondition_vars()
+        yield self._tcl_header(design, pc_vars)
+        for prop in self.properties:
+            yield prop.to_svp(design is not None, shared_preconditions=pc_vars)
+        yield svp.FOOTER
+
+    def to_tcl(
+                self,
+                filename: str | pathlib.Path | None = None,
+                incremental: bool = False,
+                design: DesignIndex | None = None
+            ) -> int:
+        """Write the SVP TCL for the project to a file.
+
+        Args:
+            filename (str | pathlib.Path | None): The TCL file to write. Defaults to the
+                project file with a ``.tcl`` suffix.
+            incremental (bool): Only regenerate the properties which changed since the file was
+                last written, reusing the rest from the existing file. A manifest of the
+                property hashes is kept next to the TCL file.
+            design (DesignIndex | None): The design to expand special RTL paths with (see
+                iter_tcl).
+
+        Returns:
+            int: The number of properties which were converted to SVP.
+        """
+        if filename is None:
+            if self.info.proj_file is None:
+                raise ValueError("Project file not set.")
+            filename = pathlib.Path(self.info.proj_file).with_suffix(".tcl")
+
+        with trace.span("emit", file=str(filename), incremental=incremental):
+            if incremental:
+                emitted = self._to_tcl_incremental(pathlib.Path(filename), design)
+            else:
+                # A property which can't be converted leaves the previous file in place
+                with atomic_write(filename) as file:
+                    file.writelines(self.iter_tcl(design))
+                emitted = len(self.properties)
+        trace.count("properties.emitted", emitted)
+        return emitted
+
+    def _to_tcl_incremental(self, filename: pathlib.Path, design: DesignIndex | None) -> int:
+        # The fragments don't depend on the design's ports, only on whether it was given
+        generator = svp.GENERATOR if design is None else f"{svp.GENERATOR}-ports"
+        pc_vars = self.precondition_vars()
+        # A suffixed variable (see precondition_vars) isn't in the property hashes, so any
+        # change to them means no fragment can be reused
+        suffixed = [
+            f"{var}={text}" for text, var in pc_vars.items() if var != precond.parse(text).var
+        ]
+        if suffixed:
+            digest = hashlib.blake2b("\0".join(sorted(suffixed)).encode(), digest_size=8)
+            generator += f"-{digest.hexdigest()}"
+        header = self._tcl_header(design, pc_vars).encode()
+        old = svp.Manifest.load(filename, generator)
+        hashes = [prop.content_hash() for prop in self.properties]
+
+        if old is not None and [frag[0] for frag in old.fragments] == hashes:
+            # The port lists and preconditions in the header may still have changed
+            with open(filename, "rb") as file:
+                if file.read(len(header)) == header:
+                    return 0
+
+        reuse = {} if old is None else {frag[0]: frag[1:] for frag in old.fragments}
+        new = svp.Manifest(generator=generator)
+        emitted = 0
+
+        tmp = filename.with_name(filename.name + ".tmp")
+        try:
+            with contextlib.ExitStack() as stack:
+                out = stack.enter_context(open(tmp, "wb"))
+                src = stack.enter_context(open(filename, "rb")) if reuse else None
+
+                offset = out.write(header)
+                for prop, phash in zip(self.properties, hashes):
+                    if src is not None and phash in reuse:
+                        src.seek(reuse[phash][0])
+                        chunk = src.read(reuse[phash][1])
+                    else:
+                        chunk = prop.to_svp(design is not None, pc_vars).encode()
+                        emitted += 1
+                    new.fragments.append((phash, offset, len(chunk)))
+                    offset += out.write(chunk)
+                out.write(svp.FOOTER.encode())
+
+            os.replace(tmp, filename)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+        new.save(filename)
+        return emitted
 
 
 @dataclass
@@ -99,6 +458,10 @@ class ProjectInfo(Schema):
     """Description of the project."""
     proj_file: str | pathlib.Path | None = None
     """Path to the project file."""
+    rtl_filelist: str | None = None
+    """Path to the file list of the design's RTL, relative to the project file."""
+    rtl_top: str | None = None
+    """The top module of the design. Found from the file list if not set."""
 
     def to_dict(self) -> dict:
         """Convert the object to a dictionary.
@@ -107,8 +470,13 @@ class ProjectInfo(Schema):
         Returns:
             dict: The dictionary.
         """
-        return {
+        data = {
             "name": self.name,
             "version": self.version,
             "description": self.description,
         }
+        if self.rtl_filelist:
+            data["rtl_filelist"] = self.rtl_filelist
+        if self.rtl_top:
+            data["rtl_top"] = self.rtl_top
+        return data
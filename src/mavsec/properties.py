@@ -17,12 +17,17 @@
 #####################################################################################
 
 from __future__ import annotations
-from typing import ClassVar, Any, TypeAlias
+from typing import ClassVar, Any, Mapping, TypeAlias
 
 import enum
+import hashlib
+import importlib.metadata
+import json
+import sys
 
 from dataclasses import dataclass, field
 from mavsec.schema import Schema
+from mavsec import precond, svp
 
 
 class SpecialRtlPaths(enum.StrEnum):
@@ -30,9 +35,25 @@ class SpecialRtlPaths(enum.StrEnum):
   OUTPUTS = enum.auto()
   INPUTS = enum.auto()
 
+  @classmethod
+  def parse(cls, path: str) -> AnyRtlPath:
+    """Converts a project file path (e.g. ``@OUTPUTS``) into a special path if it is one."""
+    if isinstance(path, cls) or not path.startswith("@"):
+      return path
+    try:
+      return cls(path[1:].lower())
+    except ValueError:
+      raise ValueError(f"Unknown special RTL path {path}.") from None
+
+  def design_info(self) -> str:
+    """The ``get_design_info -list`` kind which expands to this path."""
+    return self.value[:-1]
+
 
 AnyRtlPath = str | SpecialRtlPaths
 
+_HASH_ENCODER = json.JSONEncoder(sort_keys=True, separators=(",", ":"), default=str)
+
 
 @dataclass
 class PropertyType():
@@ -43,33 +64,84 @@ class PropertyType():
   """A brief description of the property type."""
   meta: dict[str, type | TypeAlias] = field(default_factory=dict)
   """The information needed to generate the property."""
+  flow: tuple[str, str] | None = None
+  """The meta keys of the source and destination of the checked information flow."""
+  rtl_keys: frozenset[str] = field(init=False, repr=False, compare=False)
+  """The meta keys which hold RTL paths."""
 
   property_types: ClassVar[dict[str, PropertyType]] = {}
+  """The registry of every property type, by name."""
+
+  ENTRY_POINT_GROUP: ClassVar[str] = "mavsec.property_types"
+  """The entry point group third-party packages use to provide property types."""
+
+  _plugins: ClassVar[dict[str, importlib.metadata.EntryPoint] | None] = None
 
   def __post_init__(self):
+    self.rtl_keys = frozenset(key for key, mtype in self.meta.items() if mtype == AnyRtlPath)
+
     if self.name in self.property_types:
       raise ValueError(f"Property type {self.name} already exists.")
 
     self.property_types[self.name] = self
 
+  @classmethod
+  def plugins(cls) -> dict[str, importlib.metadata.EntryPoint]:
+    """Gets the third-party property types which haven't been loaded yet, by name.
+
+    The installed entry points are only scanned the first time this is called and none of
+    them are imported.
+    """
+    if cls._plugins is None:
+      cls._plugins = {
+        ep.name: ep for ep in importlib.metadata.entry_points(group=cls.ENTRY_POINT_GROUP)
+      }
+    return {name: ep for name, ep in cls._plugins.items() if name not in cls.property_types}
+
+  @classmethod
+  def _load_plugin(cls, name: str) -> None:
+    ptype = cls.plugins()[name].load()
+    if not isinstance(ptype, PropertyType) or ptype.name != name:
+      raise ValueError(f"Entry point {name} is not the property type {name}.")
+    # Creating the PropertyType registered it, but a plugin may build it without doing so
+    cls.property_types.setdefault(name, ptype)
+
   @classmethod
   def get_type(cls, name: str) -> PropertyType:
-    """Gets a property type by name."""
-    if name not in cls.property_types:
-      raise ValueError(f"Property type {name} not found.")
-    return cls.property_types[name]
+    """Gets a property type by name, loading it from its plugin if needed."""
+    ptype = cls.property_types.get(name)
+    if ptype is not None:
+      return ptype
+    if name in cls.plugins():
+      cls._load_plugin(name)
+      return cls.property_types[name]
+    raise ValueError(f"Property type {name} not found.")
+
+  @classmethod
+  def type_names(cls) -> list[str]:
+    """Gets the names of every property type, including plugins which aren't loaded yet."""
+    return [*cls.property_types, *cls.plugins()]
+
+  @classmethod
+  def all_types(cls) -> list[PropertyType]:
+    """Gets every property type, loading all the plugins."""
+    for name in list(cls.plugins()):
+      cls._load_plugin(name)
+    return list(cls.property_types.values())
 
 
 SecureKeyProperty = PropertyType(
   "SecureKey",
   "A property that ensures a given key is stored correctly.",
-  {"key_loc": AnyRtlPath, "key_size": int, "public_bus": AnyRtlPath}
+  {"key_loc": AnyRtlPath, "key_size": int, "public_bus": AnyRtlPath},
+  ("key_loc", "public_bus")
 )
 
 SecureKeyIntegrityProperty = PropertyType(
   "SecureKeyIntegrity",
   "A property that ensures a given key is not overwritten incorrectly.",
-  {"key_loc": AnyRtlPath, "key_size": int, "public_bus": AnyRtlPath}
+  {"key_loc": AnyRtlPath, "key_size": int, "public_bus": AnyRtlPath},
+  ("public_bus", "key_loc")
 )
 
 SecureKeyGenProperty = PropertyType(
@@ -86,7 +158,8 @@ SecureExternalMemoryProperty = PropertyType(
 SecureInternalStorageProperty = PropertyType(
   "SecureInternalStorage",
   "A property that ensures a given internal storage is not able to be accessed.",
-  {"storage_loc": AnyRtlPath, "storage_size": int, "public_bus": AnyRtlPath}
+  {"storage_loc": AnyRtlPath, "storage_size": int, "public_bus": AnyRtlPath},
+  ("storage_loc", "public_bus")
 )
 
 FaultTolerantFSMProperty = PropertyType(
@@ -95,7 +168,7 @@ FaultTolerantFSMProperty = PropertyType(
 )
 
 
-@dataclass
+@dataclass(slots=True)
 class Property(Schema):
   name: str
   """The name of the property."""
@@ -108,23 +181,24 @@ class Property(Schema):
   preconditions: str | list[str] | None = None
   """The preconditions for the property."""
 
-  property_types: ClassVar[list[PropertyType]] = [
-    SecureKeyProperty,
-    SecureKeyGenProperty,
-    SecureExternalMemoryProperty,
-    SecureInternalStorageProperty,
-    FaultTolerantFSMProperty
-  ]
-  """Available properties"""
-
   def __post_init__(self):
     if isinstance(self.ptype, str):
-      for ptype in self.property_types:
-        if ptype.name == self.ptype:
-          self.ptype = ptype
-          break
-      else:
-        raise ValueError(f"Property type {self.ptype} not found.")
+      self.ptype = PropertyType.get_type(self.ptype)
+    elif self.ptype is not None and not isinstance(self.ptype, PropertyType):
+      raise TypeError(f"Invalid property type {self.ptype!r}.")
+
+    # Large projects repeat the same keys, RTL paths and preconditions many times, so share
+    # one copy of each string between all the properties.
+    intern = sys.intern
+    rtl_keys = self.ptype.rtl_keys if self.ptype is not None else ()
+    self.meta = {
+      intern(key): intern(value) if key in rtl_keys and type(value) is str else value
+      for key, value in self.meta.items()
+    }
+    if isinstance(self.preconditions, str):
+      self.preconditions = intern(self.preconditions)
+    elif self.preconditions is not None:
+      self.preconditions = [intern(p) if type(p) is str else p for p in self.preconditions]
 
   def type_name(self) -> str:
     """Gets the name of the property type."""
@@ -132,17 +206,106 @@ class Property(Schema):
       return self.ptype.name
     return str(self.ptype)
 
-  def to_svp(self) -> str:
-    """Converts the property to an SVP principle."""
-    raise NotImplementedError()
+  def content_hash(self) -> str:
+    """Gets a stable hash of everything which affects the SVP generated for the property."""
+    content = _HASH_ENCODER.encode([self.name, self.type_name(), self.meta, self.preconditions])
+    return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+  def precondition_list(self) -> list[str]:
+    """Gets the non-empty preconditions of the property as a list."""
+    if self.preconditions is None:
+      return []
+    if isinstance(self.preconditions, str):
+      return [self.preconditions.strip()] if self.preconditions.strip() else []
+    return [p.strip() for p in self.preconditions if p.strip()]
+
+  def flow_paths(self) -> tuple[AnyRtlPath, AnyRtlPath]:
+    """Gets the RTL source and destination of the information flow checked by the property."""
+    if not isinstance(self.ptype, PropertyType):
+      raise ValueError(f"Property {self.name!r} has no property type.")
+    if self.ptype.flow is None:
+      raise NotImplementedError(
+        f"SVP generation is not supported for {self.ptype.name} properties."
+      )
+
+    paths = []
+    for key in self.ptype.flow:
+      path = self.meta.get(key)
+      if not isinstance(path, str) or path == "":
+        raise ValueError(f"Property {self.name!r} is missing the RTL path {key!r}.")
+      paths.append(SpecialRtlPaths.parse(path))
+    return paths[0], paths[1]
+
+  def compiled_preconditions(self) -> list[precond.Precondition]:
+    """Gets the parsed preconditions of the property, without any repeats.
+
+    Preconditions which only differ in spacing or operand order (see precond.normalise) are
+    repeats.
+    """
+    compiled: dict[str, precond.Precondition] = {}
+    for text in self.precondition_list():
+      parsed = precond.parse(text)
+      compiled.setdefault(parsed.text, parsed)
+    return list(compiled.values())
+
+  def to_svp(
+    self, design_ports: bool = False, shared_preconditions: bool | Mapping[str, str] = False
+  ) -> str:
+    """Converts the property to an SVP principle.
+
+    Args:
+      design_ports (bool): Loop special paths over the port lists set by svp.port_lists,
+        instead of asking JasperGold for the design's ports.
+      shared_preconditions (bool | Mapping[str, str]): Write the normalised preconditions,
+        referring to the variables set by svp.precondition_defs for the shared ones (see
+        Project.iter_tcl). A mapping gives the variable of each precondition by its text
+        (see Project.precondition_vars), otherwise precond.Precondition.var is used.
+    """
+    name = svp.identifier(self.name)
+
+    loops: list[tuple[str, SpecialRtlPaths]] = []
+    words = []
+    for path in self.flow_paths():
+      if isinstance(path, SpecialRtlPaths):
+        var = path.design_info()
+        if any(var == v for v, _ in loops):
+          var = f"{var}{len(loops)}"
+        loops.append((var, path))
+        name += f"_${{{var}}}"
+        words.append(f"${var}")
+      else:
+        words.append(svp.escape(path))
+
+    indent = "    " * len(loops)
+    if shared_preconditions is not False:
+      pc_vars = shared_preconditions if isinstance(shared_preconditions, Mapping) else {}
+      preconditions = [p.to_tcl(pc_vars.get(p.text)) for p in self.compiled_preconditions()]
+    else:
+      preconditions = [svp.escape(p) for p in self.precondition_list()]
+
+    def cmd(suffix: str) -> str:
+      return f"{indent}check_spv -create -name {name}{suffix} -from {words[0]} -to {words[1]}"
+
+    lines = []
+    for depth, (var, path) in enumerate(loops):
+      if design_ports:
+        ports = f"${svp.port_var(path.design_info())}"
+      else:
+        ports = f"[get_design_info -list {path.design_info()}]"
+      lines.append(f"{'    ' * depth}foreach {var} {ports} {{")
+    if not preconditions:
+      lines.append(cmd(""))
+    for i, text in enumerate(preconditions):
+      lines.append(cmd(f"_precond{i}") + f" -to_precond {text}")
+    for depth in reversed(range(len(loops))):
+      lines.append(f"{'    ' * depth}}}")
+
+    return svp.section(f"{self.name} Property") + "\n".join(lines) + "\n"
 
   @classmethod
   def ptype_from_str(cls, prop: str) -> PropertyType:
     """Gets a property type from a string."""
-    for ptype in cls.property_types:
-      if ptype.name == prop:
-        return ptype
-    raise ValueError(f"Property type {prop} not found.")
+    return PropertyType.get_type(prop)
 
   @classmethod
   def from_dict(cls, d: dict) -> Property:
@@ -151,18 +314,21 @@ class Property(Schema):
       name=d["name"],
       description=d["description"],
       meta=d["meta"],
-      ptype=cls.ptype_from_str(d["ptype"])
+      ptype=PropertyType.get_type(d["ptype"]),
+      preconditions=d.get("preconditions")
     )
 
   @classmethod
   def available_types(cls) -> list[PropertyType]:
     """Returns all the available property types."""
-    return cls.property_types
+    return PropertyType.all_types()
 
   @classmethod
   def add_type(cls, ptype: PropertyType) -> None:
     """Adds a property type to the available types."""
-    cls.property_types.append(ptype)
+    registered = PropertyType.property_types.setdefault(ptype.name, ptype)
+    if registered is not ptype:
+      raise ValueError(f"Property type {ptype.name} already exists.")
 
   def to_dict(self) -> dict:
     """Convert the object to a dictionary."""
@@ -173,4 +339,7 @@ class Property(Schema):
         "ptype": self.type_name()
       }
 
+    if self.preconditions is not None:
+      ret_val["preconditions"] = self.preconditions
+
     return ret_val
@@ -0,0 +1,609 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+"""An index of the modules and signals of a Verilog/SystemVerilog design.
+
+The index is built from a simulator style file list and used to check and complete the RTL
+paths of properties. The sources are scanned with regular expressions rather than fully
+parsed, which finds the ports, variables, nets and instances of ordinary RTL but can miss
+declarations made by macros or inside generate blocks.
+
+The index is stored in the ``.mavsec-cache`` directory next to the file list and only the
+source files which changed since it was stored are scanned again.
+"""
+
+from __future__ import annotations
+from typing import Iterator
+
+from dataclasses import dataclass, field
+
+import hashlib
+import marshal
+import os
+import pathlib
+import re
+import threading
+
+from mavsec import cache, trace
+from mavsec.properties import SpecialRtlPaths
+
+
+_COMMENT = re.compile(r"//[^\n]*|/\*.*?\*/", re.DOTALL)
+_DIRECTIVE = re.compile(r"^[ \t]*`[^\n]*", re.MULTILINE)
+_ATTRIBUTE = re.compile(r"\(\*.*?\*\)", re.DOTALL)
+_MODULE = re.compile(
+    r"\b(?:module|macromodule)\s+(?:(?:automatic|static)\s+)?([A-Za-z_][\w$]*)(.*?)\bendmodule\b",
+    re.DOTALL
+)
+_IDENT = re.compile(r"[A-Za-z_][\w$]*")
+_DIMS = re.compile(r"\[[^\]]*\]")
+_INSTANCE = re.compile(
+    r"([A-Za-z_][\w$]*)\s*(?:#\s*\(.*?\)\s*)?([A-Za-z_][\w$]*)\s*(?:\[[^\]]*\]\s*)?\(",
+    re.DOTALL
+)
+_TYPED_DECL = re.compile(
+    r"[A-Za-z_][\w$]*(?:::[A-Za-z_][\w$]*)?\s*(?:\[[^\]]*\]\s*)*\s"
+    r"[A-Za-z_][\w$]*\s*(?:\[[^\]]*\]\s*)*(?:,|=|$)",
+    re.DOTALL
+)
+
+_DIRECTIONS = frozenset(("input", "output", "inout", "ref"))
+_DECLARATIONS = frozenset((
+    "wire", "reg", "logic", "bit", "byte", "shortint", "int", "longint", "integer", "time",
+    "real", "tri", "tri0", "tri1", "wand", "wor", "supply0", "supply1", "var", "uwire",
+))
+_KEYWORDS = frozenset((
+    "assign", "always", "always_ff", "always_comb", "always_latch", "initial", "final",
+    "generate", "endgenerate", "if", "else", "for", "foreach", "while", "do", "repeat",
+    "forever", "begin", "end", "case", "casex", "casez", "endcase", "unique", "priority",
+    "function", "endfunction", "task", "endtask", "parameter", "localparam", "typedef",
+    "genvar", "import", "export", "default", "assert", "assume", "cover", "property",
+    "endproperty", "sequence", "endsequence", "return", "fork", "join", "join_any",
+    "join_none", "modport", "clocking", "endclocking", "specify", "endspecify", "defparam",
+    "bind", "wait", "disable", "force", "release", "deassign", "struct", "union", "enum",
+    "const", "static", "automatic", "signed", "unsigned", "packed", "string", "event",
+    "timeunit", "timeprecision", "covergroup", "endgroup", "constraint", "class", "endclass",
+))
+
+_GENERATOR = b"rtl-1"
+_MAGIC = b"MAVSEC-RTL\x01"
+
+
+@dataclass
+class RtlModule:
+    """The ports, signals and instances declared by a module."""
+
+    name: str
+    """The name of the module."""
+    ports: dict[str, str] = field(default_factory=dict)
+    """The direction (``input``, ``output``, ``inout`` or ``""`` if unknown) of each port."""
+    signals: list[str] = field(default_factory=list)
+    """The variables and nets declared in the module, other than the ports."""
+    instances: dict[str, str] = field(default_factory=dict)
+    """The module of each instance in the module."""
+
+    def names(self) -> Iterator[str]:
+        """Gets every name which can be the next part of a path through the module."""
+        yield from self.instances
+        yield from self.ports
+        yield from self.signals
+
+    def to_tuple(self) -> tuple:
+        """Converts the module to a tuple of builtins, for storing with marshal."""
+        return (self.name, self.ports, self.signals, self.instances)
+
+    @classmethod
+    def from_tuple(cls, data: tuple) -> RtlModule:
+        """Converts a tuple from to_tuple back into a module."""
+        return cls(*data)
+
+
+def _split_top(text: str, sep: str = ",") -> list[str]:
+    """Splits text on sep, except inside brackets."""
+    parts = []
+    depth = 0
+    start = 0
+    for idx, char in enumerate(text):
+        if char in "([{":
+            depth += 1
+        elif char in ")]}":
+            depth -= 1
+        elif char == sep and depth == 0:
+            parts.append(text[start:idx])
+            start = idx + 1
+    parts.append(text[start:])
+    return parts
+
+
+def _matching(text: str, start: int) -> int:
+    """Gets the position after the bracket which closes the one at start."""
+    depth = 0
+    for idx in range(start, len(text)):
+        if text[idx] == "(":
+            depth += 1
+        elif text[idx] == ")":
+            depth -= 1
+            if depth == 0:
+                return idx + 1
+    return len(text)
+
+
+def _declared_name(decl: str) -> str | None:
+    """Gets the name declared by e.g. ``output logic [7:0] data = 0``."""
+    names = _IDENT.findall(_DIMS.sub(" ", decl.split("=", 1)[0]))
+    return names[-1] if names else None
+
+
+def _parse_header(header: str, module: RtlModule) -> None:
+    pos = 0
+    header = header.lstrip()
+    if header.startswith("#"):
+        pos = _matching(header, header.index("("))
+    start = header.find("(", pos)
+    if start == -1:
+        return
+
+    direction = ""
+    for item in _split_top(header[start + 1:_matching(header, start) - 1]):
+        words = _IDENT.findall(item)
+        if words and words[0] in _DIRECTIONS:
+            direction = words[0]
+        name = _declared_name(item)
+        if name is not None and name not in _DIRECTIONS:
+            module.ports[name] = direction
+
+
+def _parse_body(body: str, module: RtlModule) -> None:
+    signals = dict.fromkeys(module.signals)
+    for stmt in body.split(";"):
+        stmt = stmt.strip()
+        first = _IDENT.match(stmt)
+        if first is None:
+            continue
+        word = first.group()
+
+        if word in _DIRECTIONS:
+            for decl in _split_top(stmt[first.end():]):
+                name = _declared_name(decl)
+                if name is not None:
+                    module.ports[name] = word
+        elif word in _DECLARATIONS:
+            for decl in _split_top(stmt[first.end():]):
+                name = _declared_name(decl)
+                if name is not None:
+                    signals[name] = None
+        elif word not in _KEYWORDS:
+            inst = _INSTANCE.match(stmt)
+            if inst is not None and inst.group(2) not in _KEYWORDS:
+                module.instances[inst.group(2)] = inst.group(1)
+            elif _TYPED_DECL.match(stmt):
+                # A variable of a user defined type, e.g. "state_t state, next_state"
+                for decl in _split_top(stmt[first.end():]):
+                    name = _declared_name(decl)
+                    if name is not None:
+                        signals[name] = None
+
+    module.signals = [name for name in signals if name not in module.ports]
+
+
+def parse_source(text: str) -> dict[str, RtlModule]:
+    """Finds the modules in Verilog/SystemVerilog source.
+
+    Args:
+        text (str): The source.
+
+    Returns:
+        dict[str, RtlModule]: The modules, by name.
+    """
+    text = _ATTRIBUTE.sub(" ", _DIRECTIVE.sub("", _COMMENT.sub(" ", text)))
+
+    modules = {}
+    for match in _MODULE.finditer(text):
+        module = RtlModule(match.group(1))
+        rest = match.group(2)
+        # The header is everything up to the first ; outside of brackets
+        header = _split_top(rest, ";")[0]
+        _parse_header(header, module)
+        _parse_body(rest[len(header) + 1:], module)
+        modules[module.name] = module
+    return modules
+
+
+def read_filelist(
+            filelist: str | pathlib.Path,
+            filelists: list[pathlib.Path] | None = None
+        ) -> list[pathlib.Path]:
+    """Reads the source files from a simulator style file list.
+
+    Paths are relative to the file list and may use environment variables. ``-f``/``-F``
+    include other file lists, other options (e.g. ``+incdir+``, ``-v``) are ignored, as are
+    blank lines and ``//`` or ``#`` comments.
+
+    Args:
+        filelist (str | pathlib.Path): The file list.
+        filelists (list[pathlib.Path] | None): A list to add the file list, and every file
+            list it includes, to.
+
+    Returns:
+        list[pathlib.Path]: The source files, in order.
+    """
+    filelist = pathlib.Path(filelist)
+    root = filelist.parent
+    sources: list[pathlib.Path] = []
+    if filelists is not None:
+        filelists.append(filelist)
+
+    with open(filelist, "r") as file:
+        lines = _COMMENT.sub(" ", file.read()).splitlines()
+    for line in lines:
+        parts = line.split("#", 1)[0].split()
+        idx = 0
+        while idx < len(parts):
+            part = parts[idx]
+            if part in ("-f", "-F") and idx + 1 < len(parts):
+                nested = root.joinpath(os.path.expandvars(parts[idx + 1]))
+                sources.extend(read_filelist(nested, filelists))
+                idx += 2
+                continue
+            if not part.startswith(("-", "+")):
+                sources.append(root.joinpath(os.path.expandvars(part)))
+            idx += 1
+
+    return sources
+
+
+@dataclass
+class _SourceEntry:
+    mtime_ns: int
+    size: int
+    modules: dict[str, RtlModule]
+
+
+class DesignIndex:
+    """The modules and signals of a design, used to check and complete RTL paths.
+
+    Paths are dotted hierarchical names from the top module, e.g. ``u_core.u_keys.key_q``.
+    The top module's name may be given as the first part and bit selects are ignored.
+
+    Args:
+        sources (list[pathlib.Path]): The Verilog/SystemVerilog source files.
+        top (str | None): The top module. Defaults to the only module which isn't
+            instantiated by another.
+    """
+
+    def __init__(self, sources: list[pathlib.Path], top: str | None = None):
+        self.sources = [pathlib.Path(src) for src in sources]
+        self._top = top
+        self._entries: dict[str, _SourceEntry] = {}
+        self.modules: dict[str, RtlModule] = {}
+        """Every module of the design, by name. It is replaced rather than changed by update, so
+        it can be read while another thread updates the index."""
+        self.version = 0
+        """Incremented whenever update changes the index."""
+        self.parsed = 0
+        """The number of source files scanned by the last update."""
+        self._resolved: dict[tuple[str, SpecialRtlPaths], list[str]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_filelist(
+                cls,
+                filelist: str | pathlib.Path,
+                top: str | None = None,
+                use_cache: bool = True
+            ) -> DesignIndex:
+        """Indexes the design in a file list, reusing the stored index where it is up to date.
+
+        Args:
+            filelist (str | pathlib.Path): The file list (see read_filelist).
+            top (str | None): The top module. Defaults to the only module which isn't
+                instantiated by another.
+            use_cache (bool): Load and store the index in the ``.mavsec-cache`` directory.
+
+        Returns:
+            DesignIndex: The up to date index.
+        """
+        index = cls(read_filelist(filelist), top)
+        use_cache = use_cache and cache.enabled()
+        entry = cls._cache_path(pathlib.Path(filelist))
+        if use_cache:
+            index._load(entry)
+        if index.update() and use_cache:
+            index._save(entry)
+        return index
+
+    @staticmethod
+    def _cache_path(filelist: pathlib.Path) -> pathlib.Path:
+        filelist = filelist.resolve()
+        key = hashlib.blake2b(str(filelist).encode() + _GENERATOR, digest_size=16).hexdigest()
+        return filelist.parent.joinpath(cache.CACHE_DIR, f"rtl-{key}.bin")
+
+    def _load(self, path: pathlib.Path) -> None:
+        try:
+            with open(path, "rb") as file:
+                if file.read(len(_MAGIC)) != _MAGIC:
+                    return
+                data = marshal.loads(file.read())
+        except (OSError, ValueError, EOFError, TypeError):
+            return
+
+        self._entries = {
+            src: _SourceEntry(mtime_ns, size, {
+                mod[0]: RtlModule.from_tuple(mod) for mod in modules
+            })
+            for src, (mtime_ns, size, modules) in data.items()
+        }
+
+    def _save(self, path: pathlib.Path) -> None:
+        data = {
+            src: (entry.mtime_ns, entry.size, [mod.to_tuple() for mod in entry.modules.values()])
+            for src, entry in self._entries.items()
+        }
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            path.parent.mkdir(exist_ok=True)
+            with open(tmp, "wb") as file:
+                file.write(_MAGIC)
+                file.write(marshal.dumps(data))
+            os.replace(tmp, path)
+        except (OSError, ValueError):
+            # Like the project cache, storing the index is best effort
+            tmp.unlink(missing_ok=True)
+
+    def update(self) -> bool:
+        """Scans the source files which changed since the last update.
+
+        Returns:
+            bool: Whether anything changed.
+        """
+        changed = False
+        self.parsed = 0
+        entries: dict[str, _SourceEntry] = {}
+
+        for src in self.sources:
+            key = str(src.resolve())
+            stat = os.stat(src)
+            entry = self._entries.get(key)
+            if entry is None or entry.mtime_ns != stat.st_mtime_ns or entry.size != stat.st_size:
+                with open(src, "r", errors="replace") as file:
+                    entry = _SourceEntry(stat.st_mtime_ns, stat.st_size, parse_source(file.read()))
+                self.parsed += 1
+                changed = True
+            entries[key] = entry
+
+        # Source files may also have been removed from the file list
+        changed = changed or entries.keys() != self._entries.keys()
+        if changed or not self.modules:
+            modules: dict[str, RtlModule] = {}
+            for entry in entries.values():
+                modules.update(entry.modules)
+            # The GUI reads the index while it is updated on a worker thread, so the new modules
+            # and their resolved ports replace the old ones in one step
+            with self._lock:
+                self._entries = entries
+                self.modules = modules
+                if changed:
+                    self.version += 1
+                    self._resolved = {}
+        trace.count("rtl.parsed", self.parsed)
+        return changed
+
+    def _top_of(self, modules: dict[str, RtlModule]) -> str | None:
+        if self._top is not None:
+            return self._top
+        instantiated = {mod for module in modules.values() for mod in module.instances.values()}
+        roots = [name for name in modules if name not in instantiated]
+        return roots[0] if len(roots) == 1 else None
+
+    @property
+    def top(self) -> str | None:
+        """The top module, or None if it isn't set and there is more than one candidate."""
+        return self._top_of(self.modules)
+
+    def _top_problem(self, modules: dict[str, RtlModule]) -> str | None:
+        top = self._top_of(modules)
+        if top is None:
+            return "the top module of the design isn't known, set rtl_top"
+        if top not in modules:
+            return f"the top module {top} is not in the design"
+        return None
+
+    def top_problem(self) -> str | None:
+        """Gets why the top module can't be used, or None if it can."""
+        return self._top_problem(self.modules)
+
+    def _walk(
+                self,
+                modules: dict[str, RtlModule],
+                parts: list[str]
+            ) -> tuple[RtlModule | None, str | None]:
+        """Follows the instances in parts, giving the module reached or the reason it wasn't."""
+        top = self._top_of(modules)
+        problem = self._top_problem(modules)
+        if top is None or problem is not None:
+            return None, problem
+        module = modules[top]
+
+        if parts and parts[0] == top and parts[0] not in module.instances:
+            parts = parts[1:]
+
+        for part in parts:
+            child = module.instances.get(part)
+            if child is None:
+                return None, f"{module.name} has no instance {part}"
+            if child not in modules:
+                # Probably a cell or IP which isn't in the file list, so it can't be checked
+                return None, None
+            module = modules[child]
+        return module, None
+
+    @staticmethod
+    def _parts(path: str) -> list[str]:
+        return [_DIMS.sub("", part).strip() for part in path.split(".")]
+
+    def check(self, path: str) -> str | None:
+        """Checks an RTL path is in the design.
+
+        Args:
+            path (str): The hierarchical path.
+
+        Returns:
+            str | None: Why the path isn't in the design, or None if it is (or it can't be
+            checked, e.g. it goes through a module which isn't in the file list).
+        """
+        parts = self._parts(path)
+        modules = self.modules
+        module, problem = self._walk(modules, parts[:-1])
+        if module is None:
+            return problem
+        name = parts[-1]
+        if name in module.ports or name in module.signals or name in module.instances:
+            return None
+        if not parts[:-1] and name == self._top_of(modules):
+            return None
+        return f"{module.name} has no signal {name}"
+
+    def complete(self, prefix: str, limit: int = 200) -> list[str]:
+        """Gets the paths in the design which start with a prefix.
+
+        Only the next part of the path is completed, e.g. ``u_core.k`` gives ``u_core.key_q``
+        and ``u_core.u_keys``.
+
+        Args:
+            prefix (str): The start of a path.
+            limit (int): The maximum number of completions.
+
+        Returns:
+            list[str]: The completions, sorted.
+        """
+        head, _, tail = prefix.rpartition(".")
+        module, _ = self._walk(self.modules, self._parts(head) if head else [])
+        if module is None:
+            return []
+
+        start = f"{head}." if head else ""
+        names = sorted({name for name in module.names() if name.startswith(tail)})
+        return [start + name for name in names[:limit]]
+
+    def resolve(self, path: SpecialRtlPaths, module: str | None = None) -> list[str]:
+        """Expands a special RTL path into the ports of a module.
+
+        The result is kept until the design changes, so it is only worked out once however
+        many properties use the path.
+
+        Args:
+            path (SpecialRtlPaths): The special path, e.g. ``@OUTPUTS``.
+            module (str | None): The module. Defaults to the top module.
+
+        Returns:
+            list[str]: The ports, in declaration order.
+        """
+        with self._lock:
+            modules, resolved = self.modules, self._resolved
+        if module is None:
+            module = self._top_of(modules)
+            if module is None:
+                raise ValueError("The top module of the design isn't known, set rtl_top.")
+        if module not in modules:
+            raise ValueError(f"The module {module} is not in the design.")
+
+        ports = resolved.get((module, path))
+        if ports is None:
+            direction = path.design_info()
+            ports = [name for name, pdir in modules[module].ports.items() if pdir == direction]
+            resolved[(module, path)] = ports
+        return ports
+
+    def ports(self, module: str, direction: str) -> list[str]:
+        """Gets the ports of a module with a direction.
+
+        Args:
+            module (str): The module.
+            direction (str): ``input``, ``output`` or ``inout``.
+
+        Returns:
+            list[str]: The ports, in declaration order.
+        """
+        return [name for name, pdir in self.modules[module].ports.items() if pdir == direction]
+
+
+_designs: dict[tuple[pathlib.Path, str | None], DesignIndex] = {}
+
+
+@trace.traced("design")
+def load_design(filelist: str | pathlib.Path, top: str | None = None) -> DesignIndex:
+    """Gets the index of the design in a file list, shared by every project which uses it.
+
+    The first call loads the index (see DesignIndex.from_filelist), later calls only bring it
+    up to date.
+
+    Args:
+        filelist (str | pathlib.Path): The file list.
+        top (str | None): The top module.
+
+    Returns:
+        DesignIndex: The up to date index.
+    """
+    key = (pathlib.Path(filelist).resolve(), top)
+    design = _designs.get(key)
+    if design is None:
+        design = DesignIndex.from_filelist(filelist, top)
+        _designs[key] = design
+    else:
+        design.sources = read_filelist(filelist)
+        design.update()
+    return design
+
+
+def design_for(
+            filelist: str | pathlib.Path | None,
+            project_file: str | pathlib.Path | None,
+            top: str | None = None
+        ) -> DesignIndex | None:
+    """Loads the design index for a project.
+
+    Args:
+        filelist (str | pathlib.Path | None): The file list, relative to the project file.
+        project_file (str | pathlib.Path | None): The project file.
+        top (str | None): The top module.
+
+    Returns:
+        DesignIndex | None: The index, or None if the project has no file list.
+    """
+    path = filelist_path(filelist, project_file)
+    return None if path is None else load_design(path, top)
+
+
+def filelist_path(
+            filelist: str | pathlib.Path | None,
+            project_file: str | pathlib.Path | None
+        ) -> pathlib.Path | None:
+    """Gets the path of a project's file list, which is relative to the project file.
+
+    Args:
+        filelist (str | pathlib.Path | None): The file list.
+        project_file (str | pathlib.Path | None): The project file.
+
+    Returns:
+        pathlib.Path | None: The file list, or None if the project has no file list.
+    """
+    if not filelist:
+        return None
+    path = pathlib.Path(filelist)
+    if project_file is not None and not path.is_absolute():
+        path = pathlib.Path(project_file).parent.joinpath(path)
+    return path
@@ -17,17 +17,85 @@
 #####################################################################################
 
 from __future__ import annotations
-from typing import TypeVar, Type
+from typing import IO, Any, Iterable, Iterator, TypeVar, Type
 
+import contextlib
+import itertools
+import os
 import pathlib
+import stat
+import threading
 
 import abc
 
+from mavsec import trace
+
 
 SchemaT = TypeVar("SchemaT", bound="Schema")
 
+JSONL_ITEMS = "properties"
+"""The list which is written one item per line in JSON Lines files, after a header line
+holding the rest of the dictionary."""
+
+_CHUNK = 256
+"""The number of properties converted and serialised at once when writing a file."""
+
+
+@contextlib.contextmanager
+def atomic_write(path: str | pathlib.Path, mode: str = "w") -> Iterator[IO[Any]]:
+    """Opens a temporary file next to a file, which is renamed over the file once written.
+
+    The file is either left as it was or completely replaced, even if writing fails part way
+    (e.g. the disk is full or the process is killed).
+
+    Args:
+        path (str | pathlib.Path): The file to write. A symbolic link is followed, so the
+            file it points to is replaced.
+        mode (str): The mode to open the temporary file with, ``"w"`` or ``"wb"``.
+
+    Yields:
+        IO: The temporary file.
+    """
+    path = pathlib.Path(os.path.realpath(path))
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp, mode) as file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+        with contextlib.suppress(FileNotFoundError):
+            # Keep the permissions of the file being replaced
+            os.chmod(tmp, stat.S_IMODE(os.stat(path).st_mode))
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def _chunks(items: Iterable[dict]) -> Iterator[list[dict]]:
+    it = iter(items)
+    while chunk := list(itertools.islice(it, _CHUNK)):
+        yield chunk
+
+
+def _yaml_loader() -> type:
+    """Gets the fastest available safe YAML loader (libyaml if PyYAML was built with it)."""
+    import yaml
+
+    return getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def _yaml_dumper() -> type:
+    """Gets the fastest available safe YAML dumper (libyaml if PyYAML was built with it)."""
+    import yaml
+
+    return getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
 
 class Schema(abc.ABC):
+    # Empty so subclasses can use __slots__
+    __slots__ = ()
+
     @classmethod
     def from_dict(cls: Type[SchemaT], data: dict) -> SchemaT:
         """Get a cls object from a dictionary.
@@ -49,7 +117,19 @@ class Schema(abc.ABC):
         """
         pass
 
+    def _split_items(self) -> tuple[dict, Iterable[dict] | None]:
+        """Splits the object into the dictionary written first and the properties, which are
+        written a few at a time.
+
+        Returns:
+            tuple[dict, Iterable[dict] | None]: The dictionary without its ``properties``, and
+            the properties or None if it has none.
+        """
+        data = self.to_dict()
+        return data, data.pop(JSONL_ITEMS, None)
+
     @classmethod
+    @trace.traced("from_file")
     def from_file(cls: Type[SchemaT], path: str | pathlib.Path) -> SchemaT:
         """Get a cls object from a file.
 
@@ -68,9 +148,68 @@ class Schema(abc.ABC):
             return cls.from_json(path)
         elif path.suffix == ".toml":
             return cls.from_toml(path)
+        elif path.suffix == ".jsonl":
+            return cls.from_jsonl(path)
+        else:
+            raise ValueError(f"Unsupported file type: {path.suffix}")
+
+    @staticmethod
+    def read_data(path: str | pathlib.Path) -> dict:
+        """Read the dictionary stored in a YAML, JSON, TOML or JSON Lines file.
+
+        Args:
+            path (str): The path to the file.
+
+        Returns:
+            dict: The parsed contents of the file.
+        """
+        if isinstance(path, str):
+            path = pathlib.Path(path)
+
+        if path.suffix in (".yaml", ".yml"):
+            return Schema._read_yaml(path)
+        elif path.suffix == ".json":
+            return Schema._read_json(path)
+        elif path.suffix == ".toml":
+            return Schema._read_toml(path)
+        elif path.suffix == ".jsonl":
+            return Schema._read_jsonl(path)
         else:
             raise ValueError(f"Unsupported file type: {path.suffix}")
 
+    @staticmethod
+    def _read_yaml(path: str | pathlib.Path) -> dict:
+        import yaml
+
+        with trace.span("parse", file=str(path)), open(path, "r") as file:
+            return yaml.load(file, Loader=_yaml_loader())
+
+    @staticmethod
+    def _read_json(path: str | pathlib.Path) -> dict:
+        import json
+
+        with trace.span("parse", file=str(path)), open(path, "r") as file:
+            return json.load(file)
+
+    @staticmethod
+    def _read_toml(path: str | pathlib.Path) -> dict:
+        import tomllib
+
+        with trace.span("parse", file=str(path)), open(path, "rb") as file:
+            return tomllib.load(file)
+
+    @staticmethod
+    def _read_jsonl(path: str | pathlib.Path) -> dict:
+        import json
+
+        with trace.span("parse", file=str(path)), open(path, "r") as file:
+            header = file.readline()
+            if not header.strip():
+                raise ValueError(f"{path} does not start with a header line.")
+            data = json.loads(header)
+            data[JSONL_ITEMS] = [json.loads(line) for line in file if line.strip()]
+            return data
+
     @classmethod
     def from_yaml(cls: Type[SchemaT], path: str | pathlib.Path) -> SchemaT:
         """Get a cls object from a YAML file.
@@ -81,12 +220,7 @@ class Schema(abc.ABC):
         Returns:
             cls: The cls object.
         """
-        import yaml
-
-        with open(path, "r") as file:
-            data = yaml.safe_load(file)
-
-        return cls.from_dict(data)
+        return cls.from_dict(cls._read_yaml(path))
 
     @classmethod
     def from_json(cls: Type[SchemaT], path: str | pathlib.Path) -> SchemaT:
@@ -98,12 +232,7 @@ class Schema(abc.ABC):
         Returns:
             cls: The cls object.
         """
-        import json
-
-        with open(path, "r") as file:
-            data = json.load(file)
-
-        return cls.from_dict(data)
+        return cls.from_dict(cls._read_json(path))
 
     @classmethod
     def from_toml(cls: Type[SchemaT], path: str | pathlib.Path) -> SchemaT:
@@ -115,42 +244,157 @@ class Schema(abc.ABC):
         Returns:
             cls: The cls object.
         """
-        import tomllib
+        return cls.from_dict(cls._read_toml(path))
 
-        with open(path, "rb") as file:
-            data = tomllib.load(file)
+    @classmethod
+    def from_jsonl(cls: Type[SchemaT], path: str | pathlib.Path) -> SchemaT:
+        """Get a cls object from a JSON Lines file.
 
-        return cls.from_dict(data)
+        Args:
+            path (str): The path to the JSON Lines file.
+
+        Returns:
+            cls: The cls object.
+        """
+        return cls.from_dict(cls._read_jsonl(path))
 
     def to_yaml(self, path: str | pathlib.Path) -> None:
         """Write the object to a YAML file.
 
+        The file is replaced atomically (see atomic_write) and the properties are serialised a
+        few at a time, rather than converting the whole object to a dictionary first.
+
         Args:
             path (str): The path to the YAML file.
         """
         import yaml
 
-        with open(path, "w") as file:
-            yaml.dump(self.to_dict(), file)
+        dumper = _yaml_dumper()
+        head, items = self._split_items()
+        with atomic_write(path) as file:
+            if items is None:
+                yaml.dump(head, file, Dumper=dumper)
+                return
+            # The keys are sorted, and no other key sorts after "properties"
+            if head:
+                yaml.dump(head, file, Dumper=dumper)
+            empty = True
+            for chunk in _chunks(items):
+                if empty:
+                    file.write(f"{JSONL_ITEMS}:\n")
+                    empty = False
+                # A list at the top level is written exactly as it is under a key
+                yaml.dump(chunk, file, Dumper=dumper)
+            if empty:
+                file.write(f"{JSONL_ITEMS}: []\n")
 
     def to_json(self, path: str | pathlib.Path) -> None:
         """Write the object to a JSON file.
 
+        The file is replaced atomically (see atomic_write) and the properties are serialised a
+        few at a time, rather than converting the whole object to a dictionary first.
+
         Args:
             path (str): The path to the JSON file.
         """
         import json
 
-        with open(path, "w") as file:
-            json.dump(self.to_dict(), file)
+        head, items = self._split_items()
+        with atomic_write(path) as file:
+            if items is None:
+                json.dump(head, file)
+                return
+            file.write(json.dumps(head)[:-1] + (", " if head else "") + f'"{JSONL_ITEMS}": [')
+            sep = ""
+            for chunk in _chunks(items):
+                file.write(sep + ", ".join(json.dumps(item) for item in chunk))
+                sep = ", "
+            file.write("]}")
 
     def to_toml(self, path: str | pathlib.Path) -> None:
         """Write the object to a TOML file.
 
+        The file is replaced atomically (see atomic_write) and the properties are serialised a
+        few at a time, as an array of tables, rather than converting the whole object to a
+        dictionary first.
+
         Args:
             path (str): The path to the TOML file.
         """
         import tomli_w
 
-        with open(path, "wb") as file:
-            tomli_w.dump(self.to_dict(), file)
+        head, items = self._split_items()
+        chunks = _chunks(items or [])
+        first = next(chunks, None)
+        with atomic_write(path, "wb") as file:
+            if first is None:
+                # Written in one go, so an empty list goes before the tables
+                if items is not None:
+                    head[JSONL_ITEMS] = []
+                tomli_w.dump(head, file)
+                return
+            file.write(tomli_w.dumps(head).encode())
+            for chunk in itertools.chain([first], chunks):
+                file.write("".join(_toml_table(tomli_w.dumps(item)) for item in chunk).encode())
+
+    def to_jsonl(self, path: str | pathlib.Path) -> None:
+        """Write the object to a JSON Lines file.
+
+        The first line holds the dictionary without its ``properties`` and each following line
+        one of the properties, so more can be appended without rewriting the file. The file is
+        replaced atomically (see atomic_write).
+
+        Args:
+            path (str): The path to the JSON Lines file.
+        """
+        import json
+
+        head, items = self._split_items()
+        with atomic_write(path) as file:
+            file.write(json.dumps(head) + "\n")
+            for chunk in _chunks(items or []):
+                file.write("".join(json.dumps(item) + "\n" for item in chunk))
+
+
+class _Document(Schema):
+    __slots__ = ("data",)
+
+    def __init__(self, data: dict):
+        self.data = data
+
+    def to_dict(self) -> dict:
+        return dict(self.data)
+
+
+def write_data(path: str | pathlib.Path, data: dict) -> None:
+    """Write a dictionary to a YAML, JSON, TOML or JSON Lines file, the reverse of
+    Schema.read_data.
+
+    Args:
+        path (str): The path to the file, which is replaced atomically.
+        data (dict): The dictionary.
+    """
+    path = pathlib.Path(path)
+    doc = _Document(data)
+    if path.suffix in (".yaml", ".yml"):
+        doc.to_yaml(path)
+    elif path.suffix == ".json":
+        doc.to_json(path)
+    elif path.suffix == ".toml":
+        doc.to_toml(path)
+    elif path.suffix == ".jsonl":
+        doc.to_jsonl(path)
+    else:
+        raise ValueError(f"Unsupported file type: {path.suffix}")
+
+
+def _toml_table(body: str) -> str:
+    """Turns a property written as a TOML document into a table of the properties array."""
+    # Only table headers start with "[", strings are written on one line and arrays indented
+    lines = [
+        f"[{JSONL_ITEMS}." + line[1:] if line.startswith("[") and not line.startswith("[[")
+        else f"[[{JSONL_ITEMS}." + line[2:] if line.startswith("[[")
+        else line
+        for line in body.splitlines(keepends=True)
+    ]
+    return f"\n[[{JSONL_ITEMS}]]\n" + "".join(lines)
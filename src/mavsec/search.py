@@ -0,0 +1,171 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+"""An incremental search index over the properties of a project."""
+
+from __future__ import annotations
+from typing import Iterable
+
+import bisect
+import itertools
+
+from mavsec.properties import Property
+
+
+_FIELD_SEP = "\x1f"
+_ROW_SEP = "\n"
+
+
+def search_text(prop: Property) -> str:
+    """Gets the text a property is searched by.
+
+    This is the name, description, type and RTL paths of the property, folded to lower case.
+
+    Args:
+        prop (Property): The property.
+
+    Returns:
+        str: The text, without any newlines.
+    """
+    fields = [prop.name, prop.description, prop.type_name()]
+    if prop.ptype is not None and not isinstance(prop.ptype, str):
+        fields.extend(
+            value for key, value in prop.meta.items()
+            if key in prop.ptype.rtl_keys and isinstance(value, str)
+        )
+    return _FIELD_SEP.join(fields).lower().replace(_ROW_SEP, " ")
+
+
+class SearchIndex:
+    """A case-insensitive substring index over the properties of a project.
+
+    A query is split on whitespace and matches the properties which contain every term, so
+    ``key u_core3`` matches a key whose RTL path is in ``u_core3``.
+
+    The search text of every property is kept in one string with a row offset table, so a
+    term is found with ``str.find``/``str.count`` in C rather than by testing each property
+    in Python. A query which only narrows the previous one (e.g. the next keystroke) is
+    answered from the previous result.
+
+    The index is kept in the same order as the properties and is updated as they are
+    inserted, removed or edited. Edited rows are checked separately until there are enough of
+    them to be worth rebuilding the string.
+    """
+
+    _DENSE = 8
+    """Terms in more than 1/_DENSE of the rows are checked row by row instead of by find."""
+
+    _MAX_DIRTY = 64
+    """The number of edited rows at which the string is rebuilt."""
+
+    def __init__(self, props: Iterable[Property] = ()):
+        self._texts = [search_text(prop) for prop in props]
+        self._blob: str | None = None
+        self._offsets: list[int] = []
+        self._dirty: set[int] = set()
+        self._last: tuple[list[str], list[int]] | None = None
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def _changed(self) -> None:
+        self._blob = None
+        self._dirty.clear()
+        self._last = None
+
+    def insert(self, row: int, prop: Property) -> None:
+        """Adds a property which was inserted at row."""
+        self._texts.insert(row, search_text(prop))
+        self._changed()
+
+    def remove(self, row: int) -> None:
+        """Removes the property which was at row."""
+        del self._texts[row]
+        self._changed()
+
+    def update(self, row: int, prop: Property) -> None:
+        """Updates the property at row after it was edited."""
+        text = search_text(prop)
+        if self._texts[row] == text:
+            return
+
+        self._texts[row] = text
+        self._last = None
+        if self._blob is not None and len(self._dirty) < self._MAX_DIRTY:
+            # The rows don't move, so the string is still right for every other row
+            self._dirty.add(row)
+        else:
+            self._changed()
+
+    def _build(self) -> str:
+        if self._blob is None:
+            self._blob = _ROW_SEP.join(self._texts) + _ROW_SEP
+            self._offsets = [0, *itertools.accumulate(len(text) + 1 for text in self._texts)]
+        return self._blob
+
+    def _find(self, term: str) -> list[int]:
+        """Finds every row containing term."""
+        blob = self._build()
+        if blob.count(term) * self._DENSE > len(self._texts):
+            return [row for row, text in enumerate(self._texts) if term in text]
+
+        rows = []
+        offsets = self._offsets
+        pos = blob.find(term)
+        while pos != -1:
+            row = bisect.bisect_right(offsets, pos) - 1
+            rows.append(row)
+            pos = blob.find(term, offsets[row + 1])
+
+        if self._dirty:
+            # The string still holds the text from before these rows were edited
+            dirty = self._dirty
+            rows = [row for row in rows if row not in dirty]
+            rows.extend(row for row in dirty if term in self._texts[row])
+            rows.sort()
+        return rows
+
+    def search(self, query: str) -> list[int]:
+        """Finds the properties matching a query.
+
+        Args:
+            query (str): The terms to search for.
+
+        Returns:
+            list[int]: The rows of the matching properties, in order. An empty query matches
+            every property.
+        """
+        terms = sorted(set(query.lower().split()), key=len, reverse=True)
+        if not terms:
+            return list(range(len(self._texts)))
+
+        last = self._last
+        if last is not None and all(any(old in new for new in terms) for old in last[0]):
+            # Everything matching this query also matched the last one
+            rows = last[1]
+            pending = terms
+        else:
+            # Start with the longest term, which is usually the most selective
+            rows = self._find(terms[0])
+            pending = terms[1:]
+
+        texts = self._texts
+        for term in pending:
+            rows = [row for row in rows if term in texts[row]]
+
+        self._last = (terms, rows)
+        return rows
@@ -0,0 +1,450 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+"""Projects stored in an SQLite database.
+
+A store keeps one row per property, indexed by name, type and RTL path, so a property can be
+found, read or changed without reading the rest of the project, and every change is committed
+on its own. Project.from_file and Project.to_file use a store for ``.db`` and ``.sqlite`` files.
+"""
+
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, overload
+
+from collections.abc import MutableSequence
+
+import json
+import os
+import pathlib
+import sqlite3
+
+from mavsec.properties import Property, PropertyType
+from mavsec import trace
+
+if TYPE_CHECKING:
+    from mavsec.project import Project, ProjectInfo
+
+
+SUFFIXES = (".db", ".sqlite")
+"""The file suffixes of project stores."""
+
+_VERSION = 1
+"""The layout of the database, kept in ``PRAGMA user_version``."""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS project (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    info TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS properties (
+    id INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    ptype TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rtl_paths (
+    property INTEGER NOT NULL REFERENCES properties (id) ON DELETE CASCADE,
+    key TEXT NOT NULL,
+    path TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS properties_position ON properties (position);
+CREATE INDEX IF NOT EXISTS properties_name ON properties (name);
+CREATE INDEX IF NOT EXISTS properties_ptype ON properties (ptype);
+CREATE INDEX IF NOT EXISTS rtl_paths_path ON rtl_paths (path);
+CREATE INDEX IF NOT EXISTS rtl_paths_property ON rtl_paths (property);
+"""
+
+
+def _rtl_paths(prop: Property) -> list[tuple[str, str]]:
+    if not isinstance(prop.ptype, PropertyType):
+        return []
+    return [
+        (key, value) for key, value in prop.meta.items()
+        if key in prop.ptype.rtl_keys and isinstance(value, str) and value != ""
+    ]
+
+
+def _after(prefix: str) -> str:
+    """Gets the first string after every string starting with prefix."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class ProjectStore:
+    """An SQLite database holding a project.
+
+    The properties are kept in order by their position, which is their index in the project.
+
+    Args:
+        path (str | pathlib.Path): The database file, which is created if it doesn't exist.
+
+    Raises:
+        ValueError: If the file is a store written by a newer version of mavsec.
+    """
+
+    def __init__(self, path: str | pathlib.Path):
+        self.path = pathlib.Path(path)
+        # The GUI opens projects on a worker thread, then uses them on the GUI thread
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        version = self._db.execute("PRAGMA user_version").fetchone()[0]
+        if version > _VERSION:
+            self._db.close()
+            raise ValueError(f"{self.path} was written by a newer version of mavsec.")
+        self._db.execute("PRAGMA foreign_keys = ON")
+        # Each edit is its own transaction, which the write-ahead log makes cheap
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.execute("PRAGMA synchronous = NORMAL")
+        if version < _VERSION:
+            self._db.executescript(_SCHEMA)
+            self._db.execute(f"PRAGMA user_version = {_VERSION}")
+
+    @classmethod
+    @trace.traced("store.create")
+    def create(cls, path: str | pathlib.Path, project: Project) -> ProjectStore:
+        """Writes a project to a new store, replacing the file if there is one.
+
+        The store is written next to the file and moved over it, so the file is never left
+        half written.
+
+        Args:
+            path (str | pathlib.Path): The database file.
+            project (Project): The project to write.
+
+        Returns:
+            ProjectStore: The new store.
+        """
+        path = pathlib.Path(path)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.unlink(missing_ok=True)
+        try:
+            db = sqlite3.connect(tmp)
+            try:
+                db.executescript(_SCHEMA)
+                db.execute(f"PRAGMA user_version = {_VERSION}")
+                with db:
+                    db.execute(
+                        "INSERT INTO project VALUES (0, ?)", (json.dumps(project.info.to_dict()),)
+                    )
+                    rows = []
+                    paths: list[tuple[int, str, str]] = []
+                    for pos, prop in enumerate(project.properties):
+                        rows.append((
+                            pos + 1, pos, prop.name, prop.type_name(), json.dumps(prop.to_dict())
+                        ))
+                        paths.extend((pos + 1, key, value) for key, value in _rtl_paths(prop))
+                    db.executemany("INSERT INTO properties VALUES (?, ?, ?, ?, ?)", rows)
+                    db.executemany("INSERT INTO rtl_paths VALUES (?, ?, ?)", paths)
+            finally:
+                db.close()
+            for suffix in ("-wal", "-shm"):
+                pathlib.Path(f"{path}{suffix}").unlink(missing_ok=True)
+            os.replace(tmp, path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        return cls(path)
+
+    def close(self) -> None:
+        """Closes the database."""
+        self._db.close()
+
+    def info(self) -> ProjectInfo:
+        """Reads the project information.
+
+        Raises:
+            ValueError: If the store has no project information.
+        """
+        from mavsec.project import ProjectInfo
+
+        row = self._db.execute("SELECT info FROM project").fetchone()
+        if row is None:
+            raise ValueError(f"{self.path} has no project information.")
+        return ProjectInfo.from_dict(json.loads(row[0]))
+
+    def set_info(self, info: ProjectInfo) -> None:
+        """Replaces the project information."""
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO project VALUES (0, ?)", (json.dumps(info.to_dict()),)
+            )
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM properties").fetchone()[0]
+
+    def get(self, position: int) -> Property:
+        """Reads one property.
+
+        Args:
+            position (int): The index of the property in the project.
+
+        Raises:
+            IndexError: If there is no property at the position.
+        """
+        row = self._db.execute(
+            "SELECT data FROM properties WHERE position = ?", (position,)
+        ).fetchone()
+        if row is None:
+            raise IndexError(f"No property at {position}.")
+        return Property.from_dict(json.loads(row[0]))
+
+    def iter_data(self) -> Iterator[tuple[int, dict]]:
+        """Reads the properties in order, without creating them.
+
+        Yields:
+            tuple[int, dict]: The position and dictionary of each property.
+        """
+        cursor = self._db.execute("SELECT position, data FROM properties ORDER BY position")
+        for position, data in cursor:
+            yield position, json.loads(data)
+
+    def find(
+                self,
+                name: str | None = None,
+                ptype: PropertyType | str | None = None,
+                rtl: str | None = None
+            ) -> list[int]:
+        """Finds properties by the indexed fields, without reading the others.
+
+        Args:
+            name (str | None): The name of the property.
+            ptype (PropertyType | str | None): The type of the property, or its name.
+            rtl (str | None): An RTL path one of the property's RTL paths is equal to or inside
+                (``key`` matches ``key``, ``key[3]`` and ``key.lo`` but not ``key_en``).
+
+        Returns:
+            list[int]: The positions of the properties matching every field given, in order.
+        """
+        where = []
+        args: list[Any] = []
+        if name is not None:
+            where.append("name = ?")
+            args.append(name)
+        if ptype is not None:
+            where.append("ptype = ?")
+            args.append(ptype.name if isinstance(ptype, PropertyType) else ptype)
+        if rtl is not None:
+            # Ranges rather than LIKE, so the index on the path is always used
+            where.append(
+                "id IN (SELECT property FROM rtl_paths WHERE path = ? OR "
+                "(path >= ? AND path < ?) OR (path >= ? AND path < ?))"
+            )
+            args.extend([rtl, f"{rtl}.", _after(f"{rtl}."), f"{rtl}[", _after(f"{rtl}[")])
+
+        query = "SELECT position FROM properties"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        with trace.span("store.find"):
+            return [row[0] for row in self._db.execute(query + " ORDER BY position", args)]
+
+    def _write_paths(self, prop_id: int, prop: Property) -> None:
+        self._db.execute("DELETE FROM rtl_paths WHERE property = ?", (prop_id,))
+        self._db.executemany(
+            "INSERT INTO rtl_paths VALUES (?, ?, ?)",
+            [(prop_id, key, value) for key, value in _rtl_paths(prop)]
+        )
+
+    def update(self, position: int, prop: Property) -> None:
+        """Replaces one property.
+
+        Args:
+            position (int): The index of the property in the project.
+            prop (Property): The new property.
+
+        Raises:
+            IndexError: If there is no property at the position.
+        """
+        with self._db:
+            row = self._db.execute(
+                "SELECT id FROM properties WHERE position = ?", (position,)
+            ).fetchone()
+            if row is None:
+                raise IndexError(f"No property at {position}.")
+            self._db.execute(
+                "UPDATE properties SET name = ?, ptype = ?, data = ? WHERE id = ?",
+                (prop.name, prop.type_name(), json.dumps(prop.to_dict()), row[0])
+            )
+            self._write_paths(row[0], prop)
+
+    def insert(self, position: int, prop: Property) -> None:
+        """Inserts a property, moving the ones from its position on down by one.
+
+        Args:
+            position (int): The index to insert the property at.
+            prop (Property): The property.
+        """
+        with self._db:
+            self._db.execute(
+                "UPDATE properties SET position = position + 1 WHERE position >= ?", (position,)
+            )
+            cursor = self._db.execute(
+                "INSERT INTO properties (position, name, ptype, data) VALUES (?, ?, ?, ?)",
+                (position, prop.name, prop.type_name(), json.dumps(prop.to_dict()))
+            )
+            assert cursor.lastrowid is not None
+            self._write_paths(cursor.lastrowid, prop)
+
+    def remove(self, position: int) -> None:
+        """Removes a property, moving the ones after it up by one.
+
+        Args:
+            position (int): The index of the property in the project.
+        """
+        with self._db:
+            self._db.execute("DELETE FROM properties WHERE position = ?", (position,))
+            self._db.execute(
+                "UPDATE properties SET position = position - 1 WHERE position > ?", (position,)
+            )
+
+
+class StoreProperties(MutableSequence[Property]):
+    """The properties of a project in a store.
+
+    Each Property is read when it is first accessed and kept, so it can be edited in place;
+    call changed() after editing one to write it back. Changing the list writes the change to
+    the store straight away. Iterating reads the properties which haven't been accessed without
+    keeping them, so converting or building a large project doesn't hold it all in memory.
+
+    Args:
+        store (ProjectStore): The store.
+    """
+
+    def __init__(self, store: ProjectStore):
+        self.store = store
+        self._items: list[Property | None] = [None] * len(store)
+
+    def _get(self, index: int) -> Property:
+        item = self._items[index]
+        if item is None:
+            item = self.store.get(range(len(self._items))[index])
+            self._items[index] = item
+        return item
+
+    def changed(self, index: int) -> None:
+        """Writes a property back to the store after it was edited in place.
+
+        Args:
+            index (int): The position of the property.
+        """
+        self.store.update(range(len(self._items))[index], self._get(index))
+
+    def materialized(self) -> int:
+        """Gets the number of properties which have been read so far."""
+        return sum(item is not None for item in self._items)
+
+    @overload
+    def __getitem__(self, index: int) -> Property: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[Property]: ...
+
+    def __getitem__(self, index: int | slice) -> Property | list[Property]:
+        if isinstance(index, slice):
+            return [self._get(i) for i in range(*index.indices(len(self._items)))]
+        return self._get(index)
+
+    @overload
+    def __setitem__(self, index: int, value: Property) -> None: ...
+
+    @overload
+    def __setitem__(self, index: slice, value: Iterable[Property]) -> None: ...
+
+    def __setitem__(self, index: int | slice, value: Any) -> None:
+        if isinstance(index, slice):
+            positions = range(*index.indices(len(self._items)))
+            values = list(value)
+            if len(values) != len(positions):
+                raise ValueError("Only slices of the same length can be assigned.")
+            for pos, prop in zip(positions, values):
+                self[pos] = prop
+            return
+        pos = range(len(self._items))[index]
+        self.store.update(pos, value)
+        self._items[pos] = value
+
+    def __delitem__(self, index: int | slice) -> None:
+        if isinstance(index, slice):
+            for pos in sorted(range(*index.indices(len(self._items))), reverse=True):
+                del self[pos]
+            return
+        pos = range(len(self._items))[index]
+        self.store.remove(pos)
+        del self._items[pos]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[Property]:
+        items = self._items
+        if all(item is not None for item in items):
+            yield from items  # type: ignore[misc]
+            return
+        for pos, data in self.store.iter_data():
+            item = items[pos]
+            yield Property.from_dict(data) if item is None else item
+
+    def insert(self, index: int, value: Property) -> None:
+        pos = min(max(index + len(self._items) if index < 0 else index, 0), len(self._items))
+        self.store.insert(pos, value)
+        self._items.insert(pos, value)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, (StoreProperties, list)):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return f"StoreProperties({self.store.path}, {len(self)} properties)"
+
+
+def load(path: str | pathlib.Path) -> Project:
+    """Opens the project in a store.
+
+    Args:
+        path (str | pathlib.Path): The database file.
+
+    Returns:
+        Project: The project, whose properties are a StoreProperties.
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist.
+    """
+    from mavsec.project import Project
+
+    path = pathlib.Path(path)
+    if not path.exists():
+        # Connecting would create an empty database
+        raise FileNotFoundError(f"No such file: {path}")
+    store = ProjectStore(path)
+    return Project(store.info(), StoreProperties(store))
+
+
+def save(project: Project, path: str | pathlib.Path) -> None:
+    """Writes a project to a store.
+
+    A project which was opened from the store only has its information written, since every
+    change to its properties was written when it was made.
+
+    Args:
+        project (Project): The project.
+        path (str | pathlib.Path): The database file.
+    """
+    path = pathlib.Path(path)
+    props = project.properties
+    if isinstance(props, StoreProperties) and props.store.path.resolve() == path.resolve():
+        props.store.set_info(project.info)
+        return
+    ProjectStore.create(path, project).close()
@@ -0,0 +1,221 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+"""Helpers for emitting JasperGold SVP TCL."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+import hashlib
+import json
+import os
+import pathlib
+import re
+
+from mavsec import _info
+
+
+RULE = "#" * 100
+"""The rule placed under every section comment."""
+
+HEADER = f"""clear -all
+check_spv -init
+
+# Set up the design
+{RULE}
+#  This file needs to:
+#  - Analyze (i.e. parse) the design
+#  - Elaborate (i.e. compile) the design
+#  - Set the Clock and Resets to the design
+source ./jg_setup.tcl
+"""
+"""The preamble written at the top of every generated TCL file."""
+
+FOOTER = """
+check_spv -prove
+"""
+"""The postamble written at the end of every generated TCL file."""
+
+_TCL_SPECIAL = re.compile(r'([\\\[\]{}$"; \t])')
+_TCL_LINE_BREAKS = {"\n": "\\n", "\r": "\\r"}
+_NON_IDENT = re.compile(r"[^0-9a-zA-Z]+")
+
+
+def escape(text: str) -> str:
+    """Escapes a string so it is passed to a TCL command as a single word.
+
+    Line breaks are written as ``\\n`` and ``\\r`` so the command stays on one line.
+
+    Args:
+        text (str): The string to escape.
+
+    Returns:
+        str: The escaped string.
+    """
+    text = _TCL_SPECIAL.sub(r"\\\1", text)
+    for char, sequence in _TCL_LINE_BREAKS.items():
+        text = text.replace(char, sequence)
+    return text
+
+
+def identifier(text: str) -> str:
+    """Converts a free-form name into a TCL/SVP safe identifier.
+
+    Args:
+        text (str): The name to convert.
+
+    Returns:
+        str: The lower case identifier with runs of other characters replaced by ``_``.
+    """
+    return _NON_IDENT.sub("_", text).strip("_").lower()
+
+
+def port_var(kind: str) -> str:
+    """Gets the TCL variable holding a list of the top module's ports.
+
+    Args:
+        kind (str): The ``get_design_info -list`` kind, ``output`` or ``input``.
+
+    Returns:
+        str: The variable name.
+    """
+    return f"mavsec_{kind}s"
+
+
+def port_lists(ports: dict[str, list[str]]) -> str:
+    """Creates the section which sets the port list variables (see port_var).
+
+    Args:
+        ports (dict[str, list[str]]): The ports of each kind.
+
+    Returns:
+        str: The TCL.
+    """
+    lines = [
+        f"set {port_var(kind)} [{' '.join(['list', *map(escape, names)])}]"
+        for kind, names in ports.items()
+    ]
+    return section("Design Ports") + "\n".join(lines) + "\n"
+
+
+def precondition_defs(defs: dict[str, str]) -> str:
+    """Creates the section which sets the shared precondition variables.
+
+    Args:
+        defs (dict[str, str]): The precondition held by each variable.
+
+    Returns:
+        str: The TCL, or an empty string if there are no preconditions.
+    """
+    if not defs:
+        return ""
+    lines = [f"set {var} {escape(text)}" for var, text in defs.items()]
+    return section("Preconditions") + "\n".join(lines) + "\n"
+
+
+def section(title: str) -> str:
+    """Creates a section comment.
+
+    Args:
+        title (str): The title of the section.
+
+    Returns:
+        str: The section comment, including the trailing rule.
+    """
+    title = " ".join(title.split())
+    return f"\n# {title}\n{RULE}\n"
+
+
+_FORMAT = "64-bit-precondition-digests"
+"""Changed whenever the fragments written for the same property change."""
+
+GENERATOR = hashlib.blake2b(
+    f"{_info.__version__}\0{_FORMAT}\0{HEADER}\0{FOOTER}".encode(), digest_size=8
+).hexdigest()
+"""Identifies the emitter which produced a TCL file, so fragments from other versions are not
+reused."""
+
+
+@dataclass
+class Manifest:
+    """The record of where each property's fragment is in a generated TCL file."""
+
+    fragments: list[tuple[str, int, int]] = field(default_factory=list)
+    """The content hash, byte offset and byte length of each property fragment, in order."""
+    size: int = 0
+    """The size of the TCL file when it was written."""
+    mtime_ns: int = 0
+    """The modification time of the TCL file when it was written."""
+    generator: str = GENERATOR
+    """The emitter which wrote the TCL file."""
+
+    @staticmethod
+    def path_for(tcl: pathlib.Path) -> pathlib.Path:
+        """Gets the manifest file which sits next to a TCL file."""
+        return tcl.with_name(tcl.name + ".manifest.json")
+
+    @classmethod
+    def load(cls, tcl: pathlib.Path, generator: str = GENERATOR) -> Manifest | None:
+        """Loads the manifest of a TCL file.
+
+        Args:
+            tcl (pathlib.Path): The TCL file.
+            generator (str): The emitter the fragments must have been written by.
+
+        Returns:
+            Manifest | None: The manifest, or None if there isn't one which still describes the
+            TCL file (e.g. it was edited by hand or written by another version of mavsec).
+        """
+        try:
+            with open(cls.path_for(tcl), "r") as file:
+                data = json.load(file)
+            stat = os.stat(tcl)
+        except (OSError, ValueError):
+            return None
+
+        if (
+            data.get("generator") != generator or
+            data.get("size") != stat.st_size or
+            data.get("mtime_ns") != stat.st_mtime_ns
+        ):
+            return None
+
+        return cls(
+            [(frag[0], frag[1], frag[2]) for frag in data["fragments"]],
+            data["size"],
+            data["mtime_ns"],
+            generator,
+        )
+
+    def save(self, tcl: pathlib.Path) -> None:
+        """Saves the manifest next to the TCL file it describes.
+
+        Args:
+            tcl (pathlib.Path): The TCL file, which must already be written.
+        """
+        stat = os.stat(tcl)
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+
+        with open(self.path_for(tcl), "w") as file:
+            json.dump({
+                "generator": self.generator,
+                "size": self.size,
+                "mtime_ns": self.mtime_ns,
+                "fragments": self.fragments,
+            }, file)
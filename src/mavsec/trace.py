@@ -0,0 +1,217 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+"""Opt-in timing spans and counters for finding where the time goes.
+
+Tracing is off by default, when each span and counter costs one check of a flag. Turn it on
+with enable() (or ``mavsec --trace``/``--profile``, or ``MAVSEC_TRACE=1`` in the environment),
+then export what was recorded with write_chrome(), for ``chrome://tracing`` or Perfetto, or
+summary() for a plain table.
+
+.. code-block:: python
+
+    with trace.span("emit", properties=len(props)):
+        ...
+    trace.count("cache.hit")
+"""
+
+from __future__ import annotations
+from typing import Any, Callable, ContextManager, Iterator, TypeVar
+
+import contextlib
+import functools
+import json
+import os
+import pathlib
+import threading
+import time
+
+
+ENABLE_ENV = "MAVSEC_TRACE"
+"""The environment variable which turns tracing on when set to a non-empty value, so worker
+processes trace too."""
+
+FuncT = TypeVar("FuncT", bound=Callable[..., Any])
+
+_Event = tuple[str, int, int, int, int, dict]
+"""The name, start and duration in microseconds, process and thread of a span, and its
+arguments."""
+
+_enabled = bool(os.environ.get(ENABLE_ENV))
+_events: list[_Event] = []
+_counters: dict[str, int] = {}
+_lock = threading.Lock()
+_NULL = contextlib.nullcontext()
+
+
+def enabled() -> bool:
+    """Whether spans and counters are being recorded."""
+    return _enabled
+
+
+def enable() -> None:
+    """Starts recording spans and counters."""
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    """Stops recording spans and counters, keeping what was recorded."""
+    global _enabled
+    _enabled = False
+
+
+def reset() -> None:
+    """Forgets everything recorded so far."""
+    with _lock:
+        _events.clear()
+        _counters.clear()
+
+
+@contextlib.contextmanager
+def _span(name: str, args: dict) -> Iterator[None]:
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        end = time.perf_counter_ns()
+        _events.append((
+            name, start // 1000, (end - start) // 1000, os.getpid(), threading.get_ident(), args
+        ))
+
+
+def span(name: str, **args: Any) -> ContextManager[None]:
+    """Times a block of code.
+
+    Args:
+        name (str): The name of the span, spans with the same name are added up by summary().
+        **args: Extra information shown with the span in the Chrome trace.
+
+    Returns:
+        ContextManager[None]: The context manager to time the block with.
+    """
+    if not _enabled:
+        return _NULL
+    return _span(name, args)
+
+
+def traced(name: str) -> Callable[[FuncT], FuncT]:
+    """Decorates a function so each call to it is a span.
+
+    Args:
+        name (str): The name of the span.
+    """
+    def decorator(func: FuncT) -> FuncT:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _span(name, {}):
+                return func(*args, **kwargs)
+        return wrapper  # type: ignore[return-value]
+    return decorator
+
+
+def count(name: str, value: int = 1) -> None:
+    """Adds to a counter.
+
+    Args:
+        name (str): The name of the counter.
+        value (int): The amount to add.
+    """
+    if _enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + value
+
+
+def take() -> tuple[list[_Event], dict[str, int]]:
+    """Gets and forgets everything recorded so far, e.g. to send it from a worker process.
+
+    Returns:
+        tuple[list, dict[str, int]]: The spans and counters, to be passed to merge().
+    """
+    with _lock:
+        taken = (list(_events), dict(_counters))
+        _events.clear()
+        _counters.clear()
+    return taken
+
+
+def merge(events: list[_Event], counters: dict[str, int]) -> None:
+    """Adds the spans and counters recorded elsewhere (see take).
+
+    Args:
+        events (list): The spans.
+        counters (dict[str, int]): The counters.
+    """
+    with _lock:
+        _events.extend(events)
+        for name, value in counters.items():
+            _counters[name] = _counters.get(name, 0) + value
+
+
+def chrome_events() -> list[dict]:
+    """Converts what was recorded to Chrome trace events.
+
+    Returns:
+        list[dict]: A complete (``X``) event per span, then a counter (``C``) event per counter.
+    """
+    events: list[dict] = [
+        {"name": name, "ph": "X", "ts": ts, "dur": dur, "pid": pid, "tid": tid, "args": args}
+        for name, ts, dur, pid, tid, args in _events
+    ]
+    end = max((ts + dur for _, ts, dur, *_ in _events), default=0)
+    events.extend(
+        {"name": name, "ph": "C", "ts": end, "pid": os.getpid(), "args": {"value": value}}
+        for name, value in sorted(_counters.items())
+    )
+    return events
+
+
+def write_chrome(path: str | pathlib.Path) -> None:
+    """Writes what was recorded as a Chrome trace event JSON file.
+
+    Args:
+        path (str | pathlib.Path): The file to write.
+    """
+    with open(path, "w") as file:
+        json.dump({"traceEvents": chrome_events(), "displayTimeUnit": "ms"}, file)
+
+
+def summary() -> str:
+    """Creates a plain text table of what was recorded.
+
+    Returns:
+        str: The number of calls and the total, mean and longest time of each span, slowest
+        first, followed by the counters.
+    """
+    spans: dict[str, list[int]] = {}
+    for name, _, dur, *_ in _events:
+        spans.setdefault(name, []).append(dur)
+
+    width = max([len(name) for name in [*spans, *_counters]] + [4])
+    lines = [f"{'span':<{width}} {'calls':>8} {'total s':>10} {'mean ms':>10} {'max ms':>10}"]
+    for name, durs in sorted(spans.items(), key=lambda item: -sum(item[1])):
+        lines.append(
+            f"{name:<{width}} {len(durs):>8} {sum(durs) / 1e6:>10.3f} "
+            f"{sum(durs) / len(durs) / 1e3:>10.3f} {max(durs) / 1e3:>10.3f}"
+        )
+    if _counters:
+        lines.append("")
+        lines.append(f"{'counter':<{width}} {'value':>8}")
+        lines.extend(f"{name:<{width}} {value:>8}" for name, value in sorted(_counters.items()))
+    return "\n".join(lines)
@@ -0,0 +1,230 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+"""Checking the properties of a project before SVP generation."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+import enum
+
+from mavsec.project import Project
+from mavsec.properties import AnyRtlPath, Property, PropertyType, SpecialRtlPaths
+from mavsec.rtl import DesignIndex
+from mavsec import svp, trace
+
+
+class Severity(enum.StrEnum):
+    """How serious a diagnostic is."""
+    ERROR = enum.auto()
+    """The property cannot be converted to SVP."""
+    WARNING = enum.auto()
+    """The property can be converted, but is probably not what was intended."""
+
+
+@dataclass(frozen=True)
+class Diagnostic:
+    """A problem found with a property."""
+
+    severity: Severity
+    """How serious the problem is."""
+    index: int
+    """The position of the property in the project."""
+    prop: str
+    """The name of the property."""
+    field: str
+    """The field of the property with the problem (e.g. ``meta.key_loc``)."""
+    message: str
+    """A description of the problem."""
+
+    def __str__(self) -> str:
+        return (
+            f"{self.severity}: property {self.index} ({self.prop!r}) {self.field}: {self.message}"
+        )
+
+    def to_dict(self) -> dict:
+        """Convert the diagnostic to a dictionary."""
+        return {
+            "severity": str(self.severity),
+            "index": self.index,
+            "property": self.prop,
+            "field": self.field,
+            "message": self.message,
+        }
+
+
+_Finding = tuple[Severity, str, str]
+"""A diagnostic without the position of the property, which is what is cached."""
+
+
+def _check_value(mtype: object, value: object) -> str | None:
+    if mtype == AnyRtlPath:
+        if not isinstance(value, str):
+            return f"expected an RTL path but found {type(value).__name__}"
+        if value.strip() == "":
+            return "RTL path is empty"
+        if value.startswith("@"):
+            try:
+                SpecialRtlPaths.parse(value)
+            except ValueError as err:
+                return str(err)
+    elif mtype is int:
+        if not isinstance(value, int) or isinstance(value, bool):
+            return f"expected an int but found {type(value).__name__}"
+    elif isinstance(mtype, type) and not isinstance(value, mtype):
+        return f"expected a {mtype.__name__} but found {type(value).__name__}"
+    return None
+
+
+def check_property(prop: Property, design: DesignIndex | None = None) -> list[_Finding]:
+    """Checks a single property.
+
+    Only the fields covered by Property.content_hash are checked, so the result can be cached
+    by the hash (and the design's version).
+
+    Args:
+        prop (Property): The property to check.
+        design (DesignIndex | None): The design to look the RTL paths up in.
+
+    Returns:
+        list[tuple[Severity, str, str]]: The severity, field and message of each problem.
+    """
+    findings: list[_Finding] = []
+
+    if svp.identifier(prop.name) == "":
+        findings.append((Severity.ERROR, "name", "property has no name"))
+
+    if not isinstance(prop.ptype, PropertyType):
+        findings.append((Severity.ERROR, "ptype", "property has no type"))
+        return findings
+
+    for key, mtype in prop.ptype.meta.items():
+        if key not in prop.meta:
+            findings.append((Severity.ERROR, f"meta.{key}", "missing"))
+            continue
+        value = prop.meta[key]
+        problem = _check_value(mtype, value)
+        if problem is not None:
+            findings.append((Severity.ERROR, f"meta.{key}", problem))
+        elif design is not None and key in prop.ptype.rtl_keys and value.startswith("@"):
+            # Special paths are expanded from the top module's ports when the TCL is built
+            problem = design.top_problem()
+            if problem is not None:
+                findings.append((Severity.ERROR, f"meta.{key}", f"can't expand {value}, {problem}"))
+        elif design is not None and key in prop.ptype.rtl_keys:
+            # The design is scanned rather than elaborated, so this is only a warning
+            problem = design.check(value)
+            if problem is not None:
+                findings.append((Severity.WARNING, f"meta.{key}", problem))
+
+    for key in [key for key in prop.meta if key not in prop.ptype.meta]:
+        findings.append((Severity.WARNING, f"meta.{key}", f"not used by {prop.ptype.name}"))
+
+    if prop.ptype.flow is None:
+        findings.append(
+            (Severity.WARNING, "ptype", f"SVP generation is not supported for {prop.ptype.name}")
+        )
+
+    preconds = prop.preconditions
+    if preconds is not None and not (
+        isinstance(preconds, str) or
+        (isinstance(preconds, list) and all(isinstance(p, str) for p in preconds))
+    ):
+        findings.append(
+            (Severity.ERROR, "preconditions", "expected a string or a list of strings")
+        )
+        return findings
+
+    for parsed in prop.compiled_preconditions():
+        if parsed.error is not None:
+            findings.append((
+                Severity.WARNING, "preconditions",
+                f"could not parse {parsed.raw!r} ({parsed.error}), it is passed on unchecked"
+            ))
+        for contradiction in parsed.contradictions:
+            findings.append((
+                Severity.ERROR, "preconditions",
+                f"{parsed.raw!r} is never true ({contradiction})"
+            ))
+
+    return findings
+
+
+@dataclass
+class Validator:
+    """Checks every property of a project, caching the result of each property.
+
+    Results are cached by Property.content_hash, so checking a project again after editing
+    one property only checks that property. The cache only keeps the properties seen in the
+    last check, so a validator should be used for one project.
+    """
+
+    design: DesignIndex | None = None
+    """The design to check the RTL paths against, if there is one."""
+
+    _cache: dict[str, list[_Finding]] = field(default_factory=dict, repr=False)
+    _design_version: int | None = field(default=None, repr=False)
+
+    checked: int = 0
+    """The number of properties actually checked (rather than found in the cache) by the last
+    call to check."""
+
+    @trace.traced("validate")
+    def check(self, project: Project) -> list[Diagnostic]:
+        """Checks every property of a project.
+
+        Args:
+            project (Project): The project to check.
+
+        Returns:
+            list[Diagnostic]: The problems found, in property order.
+        """
+        cache: dict[str, list[_Finding]] = {}
+        names: dict[str, int] = {}
+        diagnostics = []
+        self.checked = 0
+
+        version = None if self.design is None else self.design.version
+        if version != self._design_version:
+            self._cache = {}
+            self._design_version = version
+
+        for idx, prop in enumerate(project.properties):
+            phash = prop.content_hash()
+            findings = cache.get(phash)
+            if findings is None:
+                findings = self._cache.get(phash)
+            if findings is None:
+                findings = check_property(prop, self.design)
+                self.checked += 1
+            cache[phash] = findings
+
+            for severity, fld, message in findings:
+                diagnostics.append(Diagnostic(severity, idx, prop.name, fld, message))
+
+            # The SVP checks are named after the property, so these must be unique
+            first = names.setdefault(svp.identifier(prop.name), idx)
+            if first != idx:
+                diagnostics.append(Diagnostic(
+                    Severity.ERROR, idx, prop.name, "name",
+                    f"same SVP name as property {first}"
+                ))
+
+        self._cache = cache
+        trace.count("properties.checked", self.checked)
+        return diagnostics
@@ -0,0 +1,517 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+"""Regenerating a project's TCL whenever its files change.
+
+A WatchSession keeps the project, its design and the validation results in memory between
+builds. When files change only the affected stages are run again:
+
+- A changed project or included file is read again (only that file, through the cache) and
+  the properties of the other files are reused. Properties of the changed file which are the
+  same as before are reused too.
+- A changed file list or RTL source brings the design index up to date.
+- The properties are validated, which only checks the changed ones, and if there are no errors
+  the TCL is regenerated incrementally.
+
+Changes are found with inotify on Linux and by polling the files elsewhere (or when inotify
+can't be used). Bursts of writes, e.g. an editor saving through a temporary file, are
+debounced into one build.
+"""
+
+from __future__ import annotations
+from typing import Callable, Iterable
+
+from dataclasses import dataclass, field
+
+import abc
+import ctypes
+import ctypes.util
+import fnmatch
+import glob
+import os
+import pathlib
+import select
+import struct
+import time
+
+from mavsec import cache, include, rtl, trace
+from mavsec.project import Project, ProjectInfo
+from mavsec.properties import Property
+from mavsec.validate import Diagnostic, Severity, Validator
+
+
+class Watcher(abc.ABC):
+    """Waits for any of a set of files to change."""
+
+    def __init__(self) -> None:
+        self.files: set[pathlib.Path] = set()
+        """The files watched, resolved."""
+        self.globs: list[str] = []
+        """Absolute glob patterns, a new file matching one is a change."""
+
+    def watch(self, files: Iterable[pathlib.Path], globs: Iterable[str] = ()) -> None:
+        """Sets the files to watch.
+
+        Args:
+            files (Iterable[pathlib.Path]): The files.
+            globs (Iterable[str]): Absolute glob patterns, a file created which matches one of
+                them is a change.
+        """
+        self.files = {pathlib.Path(path).resolve() for path in files}
+        self.globs = list(globs)
+
+    def _matches(self, path: pathlib.Path) -> bool:
+        return path in self.files or any(fnmatch.fnmatch(str(path), pat) for pat in self.globs)
+
+    @abc.abstractmethod
+    def poll(self, timeout: float | None) -> set[pathlib.Path]:
+        """Waits for files to change.
+
+        Args:
+            timeout (float | None): The most seconds to wait, or None to wait until a change.
+
+        Returns:
+            set[pathlib.Path]: The files which changed, empty if the timeout ran out.
+        """
+
+    def wait(self, debounce: float = 0.2) -> set[pathlib.Path]:
+        """Waits for files to change, then until they stop changing.
+
+        Args:
+            debounce (float): The seconds without a change which end a burst of changes.
+
+        Returns:
+            set[pathlib.Path]: The files which changed.
+        """
+        changed = self.poll(None)
+        while True:
+            more = self.poll(debounce)
+            if not more:
+                return changed
+            changed |= more
+
+    def close(self) -> None:
+        """Stops watching."""
+
+
+class PollingWatcher(Watcher):
+    """Finds changes by checking the modification time and size of the files.
+
+    Args:
+        interval (float): The seconds between checks.
+    """
+
+    def __init__(self, interval: float = 0.5):
+        super().__init__()
+        self.interval = interval
+        self._state: dict[pathlib.Path, tuple[int, int] | None] = {}
+
+    def _snapshot(self) -> dict[pathlib.Path, tuple[int, int] | None]:
+        paths = set(self.files)
+        for pat in self.globs:
+            paths.update(pathlib.Path(match) for match in glob.glob(pat, recursive=True))
+        state: dict[pathlib.Path, tuple[int, int] | None] = {}
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                state[path] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                state[path] = None
+        return state
+
+    def watch(self, files: Iterable[pathlib.Path], globs: Iterable[str] = ()) -> None:
+        super().watch(files, globs)
+        # Files which were already watched keep their old state, so a change made since the
+        # last poll is still seen
+        state = self._snapshot()
+        self._state = {path: self._state.get(path, now) for path, now in state.items()}
+
+    def poll(self, timeout: float | None) -> set[pathlib.Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            state = self._snapshot()
+            changed = {
+                path for path in state.keys() | self._state.keys()
+                if state.get(path) != self._state.get(path)
+            }
+            self._state = state
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            delay = self.interval
+            if deadline is not None:
+                delay = min(delay, max(deadline - time.monotonic(), 0))
+            time.sleep(delay)
+
+
+class InotifyWatcher(Watcher):
+    """Finds changes with Linux's inotify, watching the directories of the files.
+
+    Directories are watched rather than the files, since editors often save by writing a new
+    file and renaming it over the old one.
+
+    Raises:
+        OSError: If inotify isn't available.
+    """
+
+    _IN_ATTRIB = 0x004
+    _IN_CLOSE_WRITE = 0x008
+    _IN_MOVED_FROM = 0x040
+    _IN_MOVED_TO = 0x080
+    _IN_CREATE = 0x100
+    _IN_DELETE = 0x200
+    _IN_Q_OVERFLOW = 0x4000
+    _IN_NONBLOCK = 0o4000
+    _IN_CLOEXEC = 0o2000000
+    _MASK = _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self) -> None:
+        super().__init__()
+        name = ctypes.util.find_library("c")
+        if name is None:
+            raise OSError("The C library was not found.")
+        self._libc = ctypes.CDLL(name, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not available.")
+        self._fd = self._libc.inotify_init1(self._IN_NONBLOCK | self._IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs: dict[int, pathlib.Path] = {}
+
+    def watch(self, files: Iterable[pathlib.Path], globs: Iterable[str] = ()) -> None:
+        super().watch(files, globs)
+        dirs = {path.parent for path in self.files}
+        for pat in self.globs:
+            # The deepest directory without a wildcard, new matches directly in it are seen
+            base = pathlib.Path(pat)
+            while glob.has_magic(str(base)):
+                base = base.parent
+            dirs.add(base)
+
+        current = {path: wd for wd, path in self._dirs.items()}
+        for path, wd in current.items():
+            if path not in dirs:
+                self._libc.inotify_rm_watch(self._fd, wd)
+                del self._dirs[wd]
+        for path in dirs - current.keys():
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), self._MASK)
+            if wd >= 0:
+                self._dirs[wd] = path
+
+    def poll(self, timeout: float | None) -> set[pathlib.Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            ready, _, _ = select.select([self._fd], [], [], remaining)
+            if not ready:
+                return set()
+            changed = self._read()
+            if changed:
+                return changed
+
+    def _read(self) -> set[pathlib.Path]:
+        try:
+            data = os.read(self._fd, 1 << 16)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        pos = 0
+        while pos < len(data):
+            wd, mask, _, length = self._EVENT.unpack_from(data, pos)
+            pos += self._EVENT.size
+            name = data[pos:pos + length].rstrip(b"\0")
+            pos += length
+            if mask & self._IN_Q_OVERFLOW:
+                # Events were lost, so anything may have changed
+                return set(self.files)
+            if wd in self._dirs and name:
+                path = self._dirs[wd].joinpath(os.fsdecode(name))
+                if self._matches(path):
+                    changed.add(path)
+        return changed
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def create_watcher(poll: bool = False, interval: float = 0.5) -> Watcher:
+    """Creates the best watcher available.
+
+    Args:
+        poll (bool): Poll the files even if inotify is available.
+        interval (float): The seconds between checks when polling.
+
+    Returns:
+        Watcher: An InotifyWatcher if possible, otherwise a PollingWatcher.
+    """
+    if not poll:
+        try:
+            return InotifyWatcher()
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(interval)
+
+
+@dataclass
+class BuildReport:
+    """The outcome of one build of a WatchSession."""
+
+    reloaded: list[pathlib.Path] = field(default_factory=list)
+    """The project files which were read again."""
+    design: bool = False
+    """Whether the design was brought up to date."""
+    diagnostics: list[Diagnostic] = field(default_factory=list)
+    """The problems found with the properties."""
+    emitted: int | None = None
+    """The number of properties regenerated, or None if the TCL wasn't written."""
+    error: str | None = None
+    """Why the build failed, or None if it succeeded."""
+    seconds: float = 0.0
+    """The time the build took."""
+
+    def summary(self) -> str:
+        """Gets a one line description of the build."""
+        if self.error is not None:
+            return f"failed: {self.error}"
+        errors = sum(diag.severity is Severity.ERROR for diag in self.diagnostics)
+        parts = [f"{len(self.reloaded)} file(s) read"]
+        if self.design:
+            parts.append("design updated")
+        parts.append(f"{errors} error(s), {len(self.diagnostics) - errors} warning(s)")
+        if self.emitted is None:
+            parts.append("TCL not written")
+        else:
+            parts.append(f"{self.emitted} propert{'y' if self.emitted == 1 else 'ies'} "
+                         "regenerated")
+        return f"{', '.join(parts)} in {self.seconds:.2f}s"
+
+
+class WatchSession:
+    """Keeps a project loaded and rebuilds its TCL as its files change.
+
+    Args:
+        project_file (str | pathlib.Path): The project file.
+        output (str | pathlib.Path | None): The TCL file. Defaults to the project file with a
+            ``.tcl`` suffix.
+        validate (bool): Check the properties before writing the TCL, which isn't written if
+            there are errors.
+    """
+
+    def __init__(
+                self,
+                project_file: str | pathlib.Path,
+                output: str | pathlib.Path | None = None,
+                validate: bool = True
+            ):
+        self.source = pathlib.Path(project_file).resolve()
+        self.output = pathlib.Path(output) if output is not None else self.source.with_suffix(
+            ".tcl"
+        )
+        self.validate = validate
+        self.project: Project | None = None
+        """The project as of the last successful load."""
+        self.design: rtl.DesignIndex | None = None
+        """The design as of the last successful load."""
+        self.validator = Validator()
+
+        self._tree: include.IncludeTree | None = None
+        self._props: dict[pathlib.Path, list[tuple[dict, Property]]] = {}
+        self._filelists: list[pathlib.Path] = []
+
+    def watched(self) -> tuple[set[pathlib.Path], list[str]]:
+        """Gets the files the session depends on.
+
+        Returns:
+            tuple[set[pathlib.Path], list[str]]: The project file, the files it includes, the
+            file lists and the RTL sources, and the include globs.
+        """
+        files = {self.source}
+        globs: list[str] = []
+        if self._tree is not None:
+            files.update(self._tree.files)
+            globs = list(self._tree.globs)
+        files.update(self._filelists)
+        if self.design is not None:
+            files.update(self.design.sources)
+        return {path.resolve() for path in files}, globs
+
+    def _rtl_files(self) -> set[pathlib.Path]:
+        files = set(self._filelists)
+        if self.design is not None:
+            files.update(self.design.sources)
+        return {path.resolve() for path in files}
+
+    def _load(self, changed: set[pathlib.Path] | None) -> list[pathlib.Path]:
+        """Reads the changed project files and rebuilds the property list."""
+        tree = self._tree
+        loaded: dict[pathlib.Path, dict] = {}
+        if changed is not None and tree is not None:
+            loaded = {path: data for path, data in tree.files.items() if path not in changed}
+
+        data = loaded.get(self.source)
+        if data is None:
+            data = cache.read_data(self.source)
+        new_tree = include.load(data, self.source, loaded=loaded)
+        reread = [path for path in new_tree.files if path not in loaded]
+
+        props: dict[pathlib.Path, list[tuple[dict, Property]]] = {}
+        for path in new_tree.order():
+            old = self._props.get(path, [])
+            if path not in reread:
+                props[path] = old
+                continue
+            # Reuse the properties of a changed file which are still the same
+            by_name = {raw.get("name"): (raw, prop) for raw, prop in old}
+            pairs = []
+            for raw in new_tree.files[path].get("properties") or []:
+                pair = by_name.get(raw.get("name"))
+                if pair is None or pair[0] != raw:
+                    pair = (raw, Property.from_dict(raw))
+                pairs.append(pair)
+            props[path] = pairs
+
+        merged = include.merge(
+            ((path, props[path]) for path in new_tree.order()), lambda pair: pair[1].name
+        )
+        info = ProjectInfo.from_dict(data["project"])
+        info.proj_file = self.source
+
+        self._tree = new_tree
+        self._props = props
+        self.project = Project(info, [prop for _, prop in merged])
+        return reread
+
+    def _load_design(self) -> None:
+        assert self.project is not None
+        info = self.project.info
+        filelist = rtl.filelist_path(info.rtl_filelist, self.source)
+        self._filelists = []
+        if filelist is not None:
+            rtl.read_filelist(filelist, self._filelists)
+        self.design = rtl.design_for(info.rtl_filelist, self.source, info.rtl_top)
+
+    def build(self, changed: set[pathlib.Path] | None = None) -> BuildReport:
+        """Runs the stages affected by a change.
+
+        A failed build (e.g. a project file with a syntax error mid edit) leaves the session
+        as it was, so the next build only needs the files changed since.
+
+        Args:
+            changed (set[pathlib.Path] | None): The files which changed, resolved. None runs
+                every stage.
+
+        Returns:
+            BuildReport: The outcome of the build.
+        """
+        start = time.perf_counter()
+        report = BuildReport()
+        try:
+            with trace.span("watch.build"):
+                self._build(changed, report)
+        except Exception as err:
+            report.error = f"{type(err).__name__}: {err}"
+        report.seconds = time.perf_counter() - start
+        return report
+
+    def _build(self, changed: set[pathlib.Path] | None, report: BuildReport) -> None:
+        project_files = set() if self._tree is None else set(self._tree.files)
+        if changed is None or self.project is None:
+            load = True
+            design = True
+        else:
+            # A changed file which isn't already included must be a new match of a glob
+            load = bool(changed & project_files or changed - self._rtl_files())
+            design = bool(changed & self._rtl_files())
+
+        if load:
+            old_info = None if self.project is None else self.project.info
+            report.reloaded = self._load(changed)
+            assert self.project is not None
+            info = self.project.info
+            if old_info is None or (old_info.rtl_filelist, old_info.rtl_top) != (
+                info.rtl_filelist, info.rtl_top
+            ):
+                design = True
+
+        assert self.project is not None
+        if design:
+            self._load_design()
+            report.design = True
+
+        if self.validate:
+            self.validator.design = self.design
+            report.diagnostics = self.validator.check(self.project)
+            if any(diag.severity is Severity.ERROR for diag in report.diagnostics):
+                return
+
+        report.emitted = self.project.to_tcl(self.output, incremental=True, design=self.design)
+
+
+def _modified_since(path: pathlib.Path, time_ns: int) -> bool:
+    try:
+        return os.stat(path).st_mtime_ns >= time_ns
+    except OSError:
+        return True
+
+
+def watch(
+            session: WatchSession,
+            watcher: Watcher | None = None,
+            debounce: float = 0.2,
+            on_build: Callable[[BuildReport], None] | None = None,
+            builds: int | None = None
+        ) -> None:
+    """Builds a project, then rebuilds it each time its files change.
+
+    Args:
+        session (WatchSession): The project to build.
+        watcher (Watcher | None): Finds the changes. Defaults to create_watcher().
+        debounce (float): The seconds without a change which end a burst of changes.
+        on_build (Callable[[BuildReport], None] | None): Called with the outcome of each build.
+        builds (int | None): Stop after this many builds, or None to watch until interrupted.
+    """
+    own = watcher is None
+    watcher = create_watcher() if watcher is None else watcher
+    try:
+        changed: set[pathlib.Path] | None = None
+        count = 0
+        while True:
+            # Watch the files before building, so changes made during the build are seen
+            before, globs = session.watched()
+            watcher.watch(before, globs)
+            start = time.time_ns()
+            report = session.build(changed)
+            count += 1
+            if on_build is not None:
+                on_build(report)
+            if builds is not None and count >= builds:
+                return
+            files, globs = session.watched()
+            watcher.watch(files, globs)
+            # Files found by the build were only watched from now, so check they weren't
+            # changed after the build read them
+            changed = {path for path in files - before if _modified_since(path, start)}
+            if not changed:
+                changed = {path.resolve() for path in watcher.wait(debounce)}
+    finally:
+        if own:
+            watcher.close()
@@ -0,0 +1,95 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+
+import json
+import os
+import time
+
+import pytest
+
+from mavsec.project import Project, ProjectInfo
+from mavsec.properties import Property, SecureKeyProperty
+
+
+def _key(name: str, key_loc: str = "key", bus: str = "prdata", *, key_size: object = 8,
+         description: str = "", ptype: type[Property] = SecureKeyProperty,
+         preconditions: str | list[str] | None = None, **meta) -> Property:
+  return Property(name, description,
+                  {"key_loc": key_loc, "key_size": key_size, "public_bus": bus, **meta},
+                  ptype, preconditions)
+
+
+def _props(*names: str, bus: str = "prdata") -> list[dict]:
+  return [_key(name, bus=bus).to_dict() for name in names]
+
+
+def _write(path, data) -> None:
+  path.parent.mkdir(parents=True, exist_ok=True)
+  path.write_text(json.dumps(data))
+  # Make sure the change is seen even on file systems with coarse timestamps
+  os.utime(path, ns=(time.time_ns(), time.time_ns() + 10**9))
+
+
+def _project(count: int) -> Project:
+  return Project(ProjectInfo("keys", "1.0", "Generated keys"), [
+    _key(f"Key {i}", f"key{i}", description="A key " * 10,
+         preconditions=["pprot[2]==0"] if i % 2 else None)
+    for i in range(count)
+  ])
+
+
+@pytest.fixture
+def make_key():
+  """Makes a secure key property, with the meta data any of the arguments don't override."""
+  return _key
+
+
+@pytest.fixture
+def make_props():
+  """Makes the dictionaries of secure key properties, as they are written to a project file."""
+  return _props
+
+
+@pytest.fixture
+def write_json():
+  """Writes data to a JSON file, creating its directory."""
+  return _write
+
+
+@pytest.fixture
+def make_project():
+  """Makes a project with a number of secure key properties."""
+  return _project
+
+
+@pytest.fixture
+def chip(tmp_path):
+  """Writes a project split over included files, with a design, and gives the top file."""
+  info = ProjectInfo("chip", "1.0", "", rtl_filelist="design.f").to_dict()
+  _write(tmp_path.joinpath("chip.json"), {
+    "project": info, "include": ["cpu.json", "periph/*.json", "cpu.json"],
+    "properties": _props("top", bus="@OUTPUTS"),
+  })
+  _write(tmp_path.joinpath("cpu.json"), {"properties": _props("cpu0", "cpu1")})
+  _write(tmp_path.joinpath("periph/uart.json"), {"properties": _props("uart")})
+  # Nested includes are relative to the file which includes them
+  _write(tmp_path.joinpath("periph/gpio.json"), {"include": "gpio/*.json", "properties": []})
+  _write(tmp_path.joinpath("periph/gpio/a.json"), _props("gpio_a"))
+  tmp_path.joinpath("top.v").write_text("module chip(input clk, output [7:0] prdata);\nendmodule\n")
+  tmp_path.joinpath("design.f").write_text("top.v\n")
+  return tmp_path.joinpath("chip.json")
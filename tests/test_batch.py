@@ -0,0 +1,65 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+
+import pathlib
+import shutil
+
+from mavsec import batch, cli
+
+
+EXAMPLES = pathlib.Path(__file__).parent.parent.joinpath("examples")
+
+
+def test_build_many(tmp_path):
+  for i in range(3):
+    shutil.copy(EXAMPLES.joinpath("one-time-pad.yaml"), tmp_path.joinpath(f"otp{i}.yaml"))
+  shutil.copy(EXAMPLES.joinpath("example_project.yaml"), tmp_path.joinpath("unsupported.yaml"))
+  tmp_path.joinpath("manifest.txt").write_text("# Extra projects\nmissing.yaml\n")
+
+  projects = batch.expand_projects([tmp_path.joinpath("*.yaml")], tmp_path.joinpath("manifest.txt"))
+  assert len(projects) == 5
+
+  report = batch.build_many(projects, jobs=2, output_dir=tmp_path.joinpath("out"))
+
+  assert [res.project.name for res in report.failed] == ["unsupported.yaml", "missing.yaml"]
+  assert sorted(p.name for p in tmp_path.joinpath("out").iterdir()) == [
+    "otp0.tcl", "otp1.tcl", "otp2.tcl"
+  ]
+  assert report.summary().endswith(
+    f"3 built, 2 failed, 14 properties (9 regenerated) in {report.seconds:.2f}s"
+  )
+
+
+def test_unmatched_globs(tmp_path, capsys):
+  shutil.copy(EXAMPLES.joinpath("one-time-pad.yaml"), tmp_path.joinpath("otp.yaml"))
+  tmp_path.joinpath("manifest.txt").write_text("nomatch/*.yaml\n")
+
+  unmatched: list[str] = []
+  projects = batch.expand_projects(
+    [tmp_path.joinpath("*.yaml"), tmp_path.joinpath("*.toml")], tmp_path.joinpath("manifest.txt"),
+    unmatched
+  )
+  assert projects == [tmp_path.joinpath("otp.yaml")]
+  assert unmatched == [str(tmp_path.joinpath("*.toml")), str(tmp_path.joinpath("nomatch/*.yaml"))]
+
+  # A build which finds no projects fails rather than building nothing
+  assert cli.main(["build", str(tmp_path.joinpath("nomatch/*.yaml"))]) == 1
+  err = capsys.readouterr().err
+  assert f"mavsec: warning: {tmp_path.joinpath('nomatch/*.yaml')} matched no project files" in err
+  assert "mavsec: error: No project files to build." in err
+  assert cli.main(["build"]) == 1
@@ -0,0 +1,62 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+
+import os
+import pathlib
+import shutil
+
+from mavsec import cache
+from mavsec.project import Project
+
+
+EXAMPLES = pathlib.Path(__file__).parent.parent.joinpath("examples")
+
+
+def test_cache_invalidation(tmp_path, monkeypatch):
+  monkeypatch.delenv(cache.DISABLE_ENV, raising=False)
+  src = tmp_path.joinpath("otp.yaml")
+  shutil.copy(EXAMPLES.joinpath("one-time-pad.yaml"), src)
+  entry = cache.entry_path(src)
+
+  Project.from_file(src, use_cache=False)
+  assert not entry.exists()
+
+  proj = Project.from_file(src)
+  assert entry.exists()
+  assert Project.from_file(src) == proj
+
+  # A new mtime with the same content is still a hit
+  os.utime(src, ns=(0, 0))
+  assert Project.from_file(src) == proj
+
+  src.write_text(src.read_text().replace("APB-One-Time-Pad", "Changed"))
+  assert Project.from_file(src).info.name == "Changed"
+
+
+def test_cache_eviction(tmp_path, monkeypatch):
+  monkeypatch.delenv(cache.DISABLE_ENV, raising=False)
+  for i in range(3):
+    shutil.copy(EXAMPLES.joinpath("one-time-pad.yaml"), tmp_path.joinpath(f"otp{i}.yaml"))
+    Project.from_file(tmp_path.joinpath(f"otp{i}.yaml"))
+    os.utime(cache.entry_path(tmp_path.joinpath(f"otp{i}.yaml")), ns=(i, i))
+
+  cache_dir = tmp_path.joinpath(cache.CACHE_DIR)
+  cache.evict(cache_dir, cache.entry_path(tmp_path.joinpath("otp0.yaml")).stat().st_size * 2)
+
+  assert not cache.entry_path(tmp_path.joinpath("otp0.yaml")).exists()
+  assert cache.entry_path(tmp_path.joinpath("otp2.yaml")).exists()
@@ -0,0 +1,78 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+
+import json
+
+from mavsec.diff import MISSING, FieldChange, diff
+from mavsec.project import Project, ProjectInfo
+from mavsec.properties import SecureKeyIntegrityProperty
+from mavsec import cli
+
+
+def test_diff(make_key):
+  old = Project(ProjectInfo("otp", "1.0", ""), [
+    make_key("A"), make_key("B"), make_key("C", preconditions="a==0"), make_key("dup"),
+    make_key("dup"),
+  ])
+  new = Project(ProjectInfo("otp", "1.1", ""), [
+    make_key("dup"), make_key("C", preconditions=["a==0"]),
+    make_key("B", bus="pwdata", description="b"),
+    make_key("D", ptype=SecureKeyIntegrityProperty), make_key("dup", bus="paddr"),
+  ])
+  new.properties[2].meta["extra"] = 1
+  del new.properties[2].meta["key_size"]
+
+  result = diff(old, new)
+  assert result.info == [FieldChange("version", "1.0", "1.1")]
+  assert [(idx, prop.name) for idx, prop in result.added] == [(3, "D")]
+  assert [(idx, prop.name) for idx, prop in result.removed] == [(0, "A")]
+  assert [(c.name, c.old_index, c.new_index) for c in result.changed] == [
+    ("B", 1, 2), ("dup", 4, 4)
+  ]
+  assert result.changed[0].fields == [
+    FieldChange("description", "", "b"),
+    FieldChange("meta.key_size", 8, MISSING),
+    FieldChange("meta.public_bus", "prdata", "pwdata"),
+    FieldChange("meta.extra", MISSING, 1),
+  ]
+  assert result.unchanged == 2
+  assert result.summary() == "1 added, 1 removed, 2 changed, 2 unchanged"
+
+  data = result.to_dict()
+  assert data["changed"][0]["fields"][1] == {"field": "meta.key_size", "old": 8}
+  assert data["added"][0]["index"] == 3 and data["added"][0]["ptype"] == "SecureKeyIntegrity"
+
+  assert not diff(old, Project.from_dict(old.to_dict()))
+
+
+def test_cli_diff(tmp_path, capsys, make_key):
+  old = Project(ProjectInfo("otp", "1.0", ""), [make_key("A"), make_key("B")])
+  new = Project(ProjectInfo("otp", "1.0", ""), [make_key("B"), make_key("A", bus="pwdata")])
+  old.to_yaml(tmp_path.joinpath("old.yaml"))
+  new.to_json(tmp_path.joinpath("new.json"))
+  files = [str(tmp_path.joinpath("old.yaml")), str(tmp_path.joinpath("new.json"))]
+
+  assert cli.main(["diff", *files]) == 0
+  assert capsys.readouterr().out == (
+    "~ A [0 -> 1]\n    meta.public_bus: 'prdata' -> 'pwdata'\n"
+    "0 added, 0 removed, 1 changed, 1 unchanged\n"
+  )
+
+  assert cli.main(["diff", "--json", "--exit-code", *files]) == 1
+  assert json.loads(capsys.readouterr().out)["changed"][0]["name"] == "A"
+  assert cli.main(["diff", "--exit-code", files[0], files[0]]) == 0
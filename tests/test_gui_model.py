@@ -0,0 +1,133 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+
+import pytest
+
+pytest.importorskip("PySide6")
+
+from mavsec._gui.proj_tabs import PropertyTableModel  # noqa: E402
+from mavsec._gui.workers import FileTask  # noqa: E402
+from mavsec.lazy import LazyProperties  # noqa: E402
+from mavsec.project import Project, ProjectInfo  # noqa: E402
+from mavsec.properties import Property, SecureKeyProperty  # noqa: E402
+
+
+def _data(name: str) -> dict:
+  return Property(name, "", {}, SecureKeyProperty).to_dict()
+
+
+def test_model_reads_rows_on_demand():
+  props = LazyProperties(_data(f"P{i}") for i in range(1000))
+  model = PropertyTableModel(Project(ProjectInfo("", "", ""), props))
+
+  assert model.rowCount() == 1000
+  assert props.materialized() == 0
+  assert model.data(model.index(500, 0)) == "P500"
+  assert model.data(model.index(500, 1)) == "SecureKey"
+  assert props.materialized() == 1
+
+
+def test_model_insert_remove_signals():
+  proj = Project(ProjectInfo("", "", ""), [Property("A", "", {}, SecureKeyProperty)])
+  model = PropertyTableModel(proj)
+  events = []
+  model.rowsInserted.connect(lambda parent, first, last: events.append(("insert", first)))
+  model.rowsRemoved.connect(lambda parent, first, last: events.append(("remove", first)))
+
+  model.insert_property(0, Property("B", "", {}, SecureKeyProperty))
+  model.remove_property(1)
+
+  assert [prop.name for prop in proj.properties] == ["B"]
+  assert events == [("insert", 0), ("remove", 1)]
+  # Tabs are only saved by Save All if this changed since they were last saved
+  assert model.changes == 2
+
+
+def test_file_task_outcomes():
+  events = []
+
+  def track(task: FileTask) -> FileTask:
+    task.signals.finished.connect(lambda task, result: events.append(("finished", result)))
+    task.signals.failed.connect(lambda task, error: events.append(("failed", error)))
+    task.signals.cancelled.connect(lambda task: events.append(("cancelled", None)))
+    return task
+
+  track(FileTask("ok", lambda: 42)).run()
+  track(FileTask("bad", lambda: open("/nonexistent/project.yaml"))).run()
+
+  cancelled = track(FileTask("cancelled", lambda: 42))
+  cancelled.cancel()
+  cancelled.run()
+
+  # A save which already started still reports that it finished
+  save = track(FileTask("save", lambda: save.cancel(), discard=False))
+  save.run()
+
+  assert [kind for kind, _ in events] == ["finished", "failed", "cancelled", "finished"]
+  assert events[0][1] == 42
+  assert events[1][1].startswith("FileNotFoundError")
+
+
+def test_model_coalesces_edits():
+  proj = Project(ProjectInfo("", "", ""), [Property(f"P{i}", "", {}, SecureKeyProperty)
+                                           for i in range(3)])
+  model = PropertyTableModel(proj)
+  refreshed = []
+  model.dataChanged.connect(
+    lambda first, last, roles: refreshed.append((first.row(), first.column()))
+  )
+
+  for _ in range(10):
+    model.property_changed(1, PropertyTableModel.DESCRIPTION)
+  model.property_changed(2, PropertyTableModel.NAME)
+  assert refreshed == []
+
+  model.flush()
+  assert refreshed == [(1, PropertyTableModel.DESCRIPTION), (2, PropertyTableModel.NAME)]
+  assert (model.edits, model.refreshes, model.refresh_rate()) == (11, 2, 2)
+
+
+def test_model_filter():
+  proj = Project(ProjectInfo("", "", ""), [Property(f"P{i}", "", {}, SecureKeyProperty)
+                                           for i in range(30)])
+  model = PropertyTableModel(proj)
+
+  model.set_filter("p2")
+  assert model.rowCount() == 11
+  assert model.data(model.index(1, PropertyTableModel.NAME)) == "P20"
+  assert model.property_row(1) == 20
+
+  proj.properties[3].name = "Renamed P2"
+  model.property_changed(3, PropertyTableModel.NAME)
+  model.set_filter("renamed")
+  assert [model.property_row(row) for row in range(model.rowCount())] == [3]
+
+  model.set_filter("")
+  assert model.rowCount() == 30
+
+
+def test_model_commits_edits_to_store(tmp_path):
+  path = tmp_path.joinpath("proj.db")
+  Project(ProjectInfo("", "", ""), [Property("A", "", {}, SecureKeyProperty)]).to_file(path)
+  model = PropertyTableModel(Project.from_file(path))
+
+  model.data(model.index(0, 0))
+  model._proj.properties[0].name = "B"
+  model.property_changed(0, PropertyTableModel.NAME)
+
+  assert Project.from_file(path).properties[0].name == "B"
@@ -16,6 +16,34 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 #####################################################################################
 
+import json
+import subprocess
+import sys
+
+
+IMPORT_BUDGET = 0.5
+"""Seconds allowed for a cold import of the headless modules."""
+
+
+def _cold_import(module: str) -> dict:
+  code = (
+    "import json, sys, time\n"
+    "start = time.perf_counter()\n"
+    f"import {module}\n"
+    "print(json.dumps({'time': time.perf_counter() - start,"
+    " 'qt': any(m.startswith('PySide6') for m in sys.modules)}))\n"
+  )
+  out = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True)
+  return json.loads(out.stdout)
+
 
 def test_import():
-  pass
+  result = _cold_import("mavsec.project")
+  assert not result["qt"]
+  assert result["time"] < IMPORT_BUDGET
+
+
+def test_cli_import():
+  result = _cold_import("mavsec.cli")
+  assert not result["qt"]
+  assert result["time"] < IMPORT_BUDGET
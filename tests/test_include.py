@@ -0,0 +1,130 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+
+import json
+
+import pytest
+
+from mavsec.project import Project, ProjectInfo
+from mavsec.properties import Property, SecureKeyProperty
+from mavsec import cache, include
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+@pytest.mark.parametrize("cpus", [1, 4])
+def test_include(chip, lazy, cpus, monkeypatch):
+  # With more CPUs the files are parsed in worker processes
+  monkeypatch.setattr(include.os, "cpu_count", lambda: cpus)
+  proj = Project.from_file(chip, lazy=lazy, use_cache=False)
+  assert [prop.name for prop in proj.properties] == ["top", "cpu0", "cpu1", "gpio_a", "uart"]
+
+
+def test_include_off_main_thread(chip, monkeypatch):
+  monkeypatch.setattr(include.os, "cpu_count", lambda: 4)
+  contexts = []
+  pool = include.futures.ProcessPoolExecutor
+
+  def process_pool(*args, mp_context=None, **kwargs):
+    contexts.append(mp_context)
+    return pool(*args, mp_context=mp_context, **kwargs)
+
+  monkeypatch.setattr(include.futures, "ProcessPoolExecutor", process_pool)
+
+  # Like the GUI, which loads projects on worker threads
+  with include.futures.ThreadPoolExecutor(1) as worker:
+    proj = worker.submit(Project.from_file, chip, use_cache=False).result()
+  assert [prop.name for prop in proj.properties] == ["top", "cpu0", "cpu1", "gpio_a", "uart"]
+  assert [ctx.get_start_method() for ctx in contexts] == ["spawn"]
+
+
+def test_duplicate_names(chip, make_props, write_json):
+  write_json(chip.parent.joinpath("periph/gpio/b.json"), make_props("cpu1"))
+  with pytest.raises(ValueError, match="'cpu1' is in both .*cpu.json and .*b.json"):
+    Project.from_file(chip, use_cache=False)
+
+  write_json(chip.parent.joinpath("periph/gpio/b.json"), make_props("top"))
+  with pytest.raises(ValueError, match="'top' is in both .*chip.json and .*b.json"):
+    Project.from_file(chip, lazy=True).properties[-1]
+
+
+def test_cached_includes(chip, monkeypatch, make_props, write_json):
+  monkeypatch.delenv(cache.DISABLE_ENV, raising=False)
+  Project.from_file(chip)
+
+  parsed = []
+  read_data = cache.Schema.read_data
+  monkeypatch.setattr(cache.Schema, "read_data", lambda path: parsed.append(path.name) or
+                      read_data(path))
+
+  write_json(chip.parent.joinpath("cpu.json"), {"properties": make_props("cpu0", "cpu2")})
+  proj = Project.from_file(chip)
+  assert parsed == ["cpu.json"]
+  assert [prop.name for prop in proj.properties][1:3] == ["cpu0", "cpu2"]
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_save_include_tree(chip, lazy):
+  proj = Project.from_file(chip, lazy=lazy, use_cache=False)
+  uart = chip.parent.joinpath("periph/uart.json")
+  uart_before = uart.read_text()
+  proj.properties[1].description = "Edited"
+  proj.properties.append(Property("new", "", {}, SecureKeyProperty))
+  del proj.properties[3]
+  proj.to_file(chip)
+
+  # Each property is written back to the file it came from
+  top = json.loads(chip.read_text())
+  assert top["include"] == ["cpu.json", "periph/*.json", "cpu.json"]
+  assert [prop["name"] for prop in top["properties"]] == ["top", "new"]
+  cpu = json.loads(chip.parent.joinpath("cpu.json").read_text())
+  assert [prop["description"] for prop in cpu["properties"]] == ["Edited", ""]
+  assert json.loads(chip.parent.joinpath("periph/gpio/a.json").read_text()) == \
+    {"properties": []}
+  assert uart.read_text() == uart_before
+
+  reloaded = Project.from_file(chip, use_cache=False)
+  assert [prop.name for prop in reloaded.properties] == ["top", "new", "cpu0", "cpu1", "uart"]
+
+  # Saving elsewhere writes a single file and leaves the tree alone
+  reloaded.to_file(chip.parent.joinpath("flat.json"))
+  flat = json.loads(chip.parent.joinpath("flat.json").read_text())
+  assert "include" not in flat and len(flat["properties"]) == 5
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_save_renamed(chip, lazy, write_json):
+  other = chip.parent.joinpath("other.json")
+  write_json(other, {"project": ProjectInfo("other", "1.0", "").to_dict(), "include": "cpu.json"})
+  proj = Project.from_file(chip, lazy=lazy, use_cache=False)
+  proj.properties[1].name = "cpu0_renamed"
+  proj.properties[0].name = "top_renamed"
+  proj.to_file(chip)
+
+  # A renamed property stays in its file, so the other projects including it still have it
+  top = json.loads(chip.read_text())
+  assert [prop["name"] for prop in top["properties"]] == ["top_renamed"]
+  cpu = json.loads(chip.parent.joinpath("cpu.json").read_text())
+  assert [prop["name"] for prop in cpu["properties"]] == ["cpu0_renamed", "cpu1"]
+  assert [prop.name for prop in Project.from_file(other, use_cache=False).properties] == \
+    ["cpu0_renamed", "cpu1"]
+
+  # Saving again follows the same properties
+  proj.properties[1].name = "cpu0"
+  proj.to_file(chip)
+  cpu = json.loads(chip.parent.joinpath("cpu.json").read_text())
+  assert [prop["name"] for prop in cpu["properties"]] == ["cpu0", "cpu1"]
@@ -0,0 +1,91 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+
+import pytest
+
+from mavsec.lazy import append_jsonl
+from mavsec.project import Project
+from mavsec.properties import Property, SecureKeyProperty
+
+
+def test_lazy_json(tmp_path, make_project):
+  proj = make_project(2000)
+  proj.to_json(tmp_path.joinpath("proj.json"))
+
+  lazy = Project.from_file(tmp_path.joinpath("proj.json"), lazy=True)
+  assert lazy.info == proj.info
+  assert lazy.properties[10] == proj.properties[10]
+  assert lazy.properties.materialized() == 1
+
+  assert lazy.properties == proj.properties
+
+
+def test_lazy_jsonl(tmp_path, make_project):
+  proj = make_project(2000)
+  proj.to_jsonl(tmp_path.joinpath("proj.jsonl"))
+
+  lazy = Project.from_jsonl(tmp_path.joinpath("proj.jsonl"), lazy=True)
+  assert next(iter(lazy.properties)) == proj.properties[0]
+  assert lazy.properties.materialized() == 1
+
+  lazy.properties.insert(0, Property("New", "", ptype=SecureKeyProperty))
+  assert len(lazy.properties) == 2001
+  assert lazy.properties[1:] == proj.properties
+
+
+def test_jsonl_format(tmp_path, make_project):
+  proj = make_project(20)
+  proj.to_file(tmp_path.joinpath("proj.mavsec.jsonl"))
+  proj.to_file(tmp_path.joinpath("proj.yaml"))
+
+  # Converting between the formats goes through the same API
+  from_jsonl = Project.from_file(tmp_path.joinpath("proj.mavsec.jsonl"), use_cache=False)
+  assert from_jsonl.properties == proj.properties
+  from_jsonl.to_file(tmp_path.joinpath("copy.jsonl"))
+  assert Project.from_file(tmp_path.joinpath("copy.jsonl")).to_dict() == \
+    Project.from_file(tmp_path.joinpath("proj.yaml")).to_dict()
+  assert len(Project.read_data(tmp_path.joinpath("copy.jsonl"))["properties"]) == 20
+
+
+def test_jsonl_append(tmp_path, make_project):
+  path = tmp_path.joinpath("proj.jsonl")
+  proj = make_project(10)
+  Project(proj.info, proj.properties[:4]).to_jsonl(path)
+  before = path.read_text()
+
+  assert append_jsonl(path, proj.properties[4:8]) == 4
+  # A last line without a newline (e.g. after a hand edit) is still ended
+  path.write_text(path.read_text().rstrip("\n"))
+  append_jsonl(path, proj.properties[8:])
+
+  assert path.read_text().startswith(before)
+  assert Project.from_file(path).properties == proj.properties
+
+  path.write_text("")
+  with pytest.raises(ValueError):
+    append_jsonl(path, proj.properties)
+
+
+@pytest.mark.parametrize("suffix", [".jsonl", ".json", ".yaml"])
+def test_iter_properties(tmp_path, suffix, make_project):
+  proj = make_project(50)
+  proj.to_file(tmp_path.joinpath("proj" + suffix))
+
+  props = Project.iter_properties(tmp_path.joinpath("proj" + suffix))
+  assert next(props) == proj.properties[0]
+  assert list(props) == proj.properties[1:]
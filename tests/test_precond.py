@@ -0,0 +1,117 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+
+import pytest
+
+from mavsec.project import Project, ProjectInfo
+from mavsec.validate import Severity, Validator
+from mavsec import precond
+
+
+def test_normalise():
+  assert precond.parse("0 == pprot[2]").text == "pprot[2]==0"
+  assert precond.parse("b && (a && b)").text == "a && b"
+  assert precond.parse("!!(c || a&b)").text == "a&b || c"
+  assert precond.parse("!(a && b) || x.y[3:0] >= 4'hF").text == "!(a && b) || x.y[3:0]>=4'hF"
+
+  same = precond.parse("pprot[1] == 0 && pprot[2]==0")
+  assert precond.parse("pprot[2]==0&&0==pprot[1]").var == same.var
+  assert precond.parse("pprot[2]==0").var != same.var
+
+
+def test_unparsable():
+  parsed = precond.parse(" a == ")
+  assert parsed.node is None
+  assert parsed.error is not None
+  assert parsed.text == "a =="
+
+
+def test_contradictions():
+  assert precond.parse("a && b && !a").contradictions == ("a and !a",)
+  assert precond.parse("mode == 2'b01 && mode == 2").contradictions == ("mode==2 and mode==2'b01",)
+  assert precond.parse("mode != 0 && mode == 'h0").contradictions == ("mode=='h0 and mode!=0",)
+  assert precond.parse("a == 1 && a == '1").contradictions == ()
+  assert precond.parse("a == 1 || a == 2").contradictions == ()
+
+
+def test_shared_tcl(tmp_path, make_key):
+  long = "apb.pprot[2]==1'b0 && apb.psel"
+  write = "apb.penable && apb.psel && apb.pwrite"
+  proj = Project(ProjectInfo("", "", ""), [
+    make_key("A", preconditions=["apb.psel && apb.pprot[2] == 1'b0", "a==0", long]),
+    make_key("B", preconditions=[long, "apb.pwrite && apb.psel && apb.penable"]),
+    make_key("C", preconditions=[]),
+  ])
+  out = tmp_path.joinpath("shared.tcl")
+  proj.to_tcl(out)
+  text = out.read_text()
+
+  var = precond.parse(long).var
+  assert proj.precondition_defs() == {var: long, precond.parse(write).var: write}
+  assert f"set {var} apb.pprot\\[2\\]==1'b0\\ &&\\ apb.psel\n" in text
+  assert text.count(f"${var}") == 2
+  assert "-name a_precond1 -from key -to prdata -to_precond a==0\n" in text
+
+  # A new precondition only changes the header, the other fragments are reused
+  assert proj.to_tcl(out, incremental=True) == 3
+  proj.properties[2].preconditions = ["apb.penable && !apb.pwrite"]
+  assert proj.to_tcl(out, incremental=True) == 1
+  assert f"set {precond.parse('apb.penable && !apb.pwrite').var} " in out.read_text()
+
+
+@pytest.fixture
+def colliding(monkeypatch):
+  """Gives every precondition the same variable."""
+  monkeypatch.setattr(precond.Precondition, "var", property(lambda self: "mavsec_pc_0"))
+  # The parsed preconditions are cached, and so is whether they are shared
+  precond.parse.cache_clear()
+  yield
+  precond.parse.cache_clear()
+
+
+def test_shared_var_collision(tmp_path, colliding, make_key):
+  proj = Project(ProjectInfo("", "", ""), [
+    make_key("A", preconditions=["apb.pprot[2]==1'b0 && apb.psel"]),
+    make_key("B", preconditions=["apb.penable && apb.pwrite", "apb.pprot[2]==1'b0 && apb.psel"]),
+  ])
+
+  # The later precondition gets its own variable rather than reusing the first one's
+  assert proj.precondition_defs() == {
+    "mavsec_pc_0": "apb.pprot[2]==1'b0 && apb.psel",
+    "mavsec_pc_0_1": "apb.penable && apb.pwrite",
+  }
+  out = tmp_path.joinpath("collide.tcl")
+  proj.to_tcl(out, incremental=True)
+  text = out.read_text()
+  assert "-name b_precond0 -from key -to prdata -to_precond $mavsec_pc_0_1\n" in text
+  assert "-name b_precond1 -from key -to prdata -to_precond $mavsec_pc_0\n" in text
+
+  # Dropping the first use swaps the variables, so nothing is reused
+  proj.properties[0].preconditions = []
+  assert proj.to_tcl(out, incremental=True) == 2
+  text = out.read_text()
+  assert "-name b_precond0 -from key -to prdata -to_precond $mavsec_pc_0\n" in text
+  assert "-name b_precond1 -from key -to prdata -to_precond $mavsec_pc_0_1\n" in text
+
+
+def test_validate(make_key):
+  proj = Project(ProjectInfo("", "", ""), [
+    make_key("A", preconditions=["a == 1 && a == 2", "b +"]),
+  ])
+  found = [(d.severity, d.field) for d in Validator().check(proj)]
+  assert found == [(Severity.ERROR, "preconditions"), (Severity.WARNING, "preconditions")]
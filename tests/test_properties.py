@@ -0,0 +1,56 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+
+import sys
+
+import pytest
+
+from mavsec import properties
+from mavsec.properties import Property, PropertyType
+
+
+def test_registry():
+  assert Property.ptype_from_str("SecureKeyIntegrity") is properties.SecureKeyIntegrityProperty
+  assert Property("Key", "", ptype="SecureKey").ptype is properties.SecureKeyProperty
+
+  with pytest.raises(ValueError):
+    Property.ptype_from_str("NotAType")
+
+
+def test_plugin_discovery(tmp_path, monkeypatch):
+  tmp_path.joinpath("mavsec_plugin.py").write_text(
+    "from mavsec.properties import PropertyType\n"
+    "TrojanProperty = PropertyType('Trojan', 'No hardware trojans.')\n"
+  )
+  dist = tmp_path.joinpath("mavsec_plugin-1.0.dist-info")
+  dist.mkdir()
+  dist.joinpath("METADATA").write_text("Metadata-Version: 2.1\nName: mavsec-plugin\nVersion: 1.0\n")
+  dist.joinpath("entry_points.txt").write_text(
+    "[mavsec.property_types]\nTrojan = mavsec_plugin:TrojanProperty\n"
+  )
+  monkeypatch.syspath_prepend(str(tmp_path))
+  monkeypatch.setattr(PropertyType, "_plugins", None)
+  monkeypatch.setattr(PropertyType, "property_types", dict(PropertyType.property_types))
+
+  assert "Trojan" in PropertyType.type_names()
+  assert "mavsec_plugin" not in sys.modules
+
+  assert Property.from_dict(
+    {"name": "No Trojans", "description": "", "meta": {}, "ptype": "Trojan"}
+  ).type_name() == "Trojan"
+  assert "mavsec_plugin" in sys.modules
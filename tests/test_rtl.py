@@ -0,0 +1,127 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+
+import os
+import pathlib
+
+from mavsec.project import Project, ProjectInfo
+from mavsec.properties import Property, SecureKeyProperty
+from mavsec.rtl import DesignIndex, parse_source, read_filelist
+from mavsec.validate import Validator
+from mavsec import cache
+
+
+TOP = """
+// The top level
+module soc_top #(parameter W = 8) (
+  input  logic clk, rst_n,
+  output logic [W-1:0] prdata,
+  input  wire  [W-1:0] pwdata /* the bus */
+);
+  logic [127:0] key_q;
+  state_t state, next_state;
+  core #(.W(W), .D(2)) u_core (.clk(clk), .key(key_q));
+  always_ff @(posedge clk) key_q <= '0;
+  assign prdata = key_q[7:0];
+endmodule
+"""
+
+CORE = """
+module core(clk, key);
+  input clk;
+  output [127:0] key;
+  reg [127:0] key_reg;
+  vendor_ram u_ram (.clk(clk));
+endmodule
+"""
+
+
+def _design(tmp_path: pathlib.Path) -> pathlib.Path:
+  tmp_path.joinpath("top.sv").write_text(TOP)
+  tmp_path.joinpath("core.v").write_text(CORE)
+  tmp_path.joinpath("core.f").write_text("core.v  # the core\n")
+  filelist = tmp_path.joinpath("design.f")
+  filelist.write_text("+incdir+include\n// sources\ntop.sv\n-f core.f\n")
+  return filelist
+
+
+def test_parse_source():
+  top = parse_source(TOP)["soc_top"]
+  assert top.ports == {"clk": "input", "rst_n": "input", "prdata": "output", "pwdata": "input"}
+  assert top.signals == ["key_q", "state", "next_state"]
+  assert top.instances == {"u_core": "core"}
+
+  core = parse_source(CORE)["core"]
+  assert core.ports == {"clk": "input", "key": "output"}
+  assert core.signals == ["key_reg"]
+
+
+def test_check_and_complete(tmp_path):
+  filelist = _design(tmp_path)
+  assert read_filelist(filelist) == [tmp_path / "top.sv", tmp_path / "core.v"]
+
+  design = DesignIndex.from_filelist(filelist)
+  assert design.top == "soc_top"
+  assert design.check("u_core.key_reg[3]") is None
+  assert design.check("soc_top.key_q") is None
+  assert design.check("u_core.key_regx") == "core has no signal key_regx"
+  assert design.check("u_cpu.key") == "soc_top has no instance u_cpu"
+  # Modules which aren't in the file list can't be checked
+  assert design.check("u_core.u_ram.data") is None
+
+  assert design.complete("u_core.k") == ["u_core.key", "u_core.key_reg"]
+  assert design.complete("p") == ["prdata", "pwdata"]
+  assert design.ports("soc_top", "output") == ["prdata"]
+
+
+def test_incremental_index(tmp_path, monkeypatch):
+  monkeypatch.delenv(cache.DISABLE_ENV, raising=False)
+  filelist = _design(tmp_path)
+  assert DesignIndex.from_filelist(filelist).parsed == 2
+
+  # The stored index is reused
+  design = DesignIndex.from_filelist(filelist)
+  assert design.parsed == 0
+  assert design.check("u_core.key_reg") is None
+
+  core = tmp_path / "core.v"
+  core.write_text(CORE.replace("key_reg", "key_q"))
+  os.utime(core, ns=(1, 1))
+  design = DesignIndex.from_filelist(filelist)
+  assert design.parsed == 1
+  assert design.check("u_core.key_reg") == "core has no signal key_reg"
+
+  # The modules are replaced rather than changed, so a reader never sees them part way
+  modules = design.modules
+  core.write_text(CORE)
+  os.utime(core, ns=(2, 2))
+  assert design.update()
+  assert design.modules is not modules and "key_q" in modules["core"].signals
+  assert design.check("u_core.key_reg") is None
+
+
+def test_validate_rtl_paths(tmp_path):
+  design = DesignIndex.from_filelist(_design(tmp_path))
+  proj = Project(ProjectInfo("", "", ""), [
+    Property("Key", "", {"key_loc": "u_core.key_regx", "key_size": 128, "public_bus": "prdata"},
+             SecureKeyProperty),
+  ])
+
+  assert Validator().check(proj) == []
+  found = [(d.field, d.message) for d in Validator(design).check(proj)]
+  assert found == [("meta.key_loc", "core has no signal key_regx")]
@@ -0,0 +1,63 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+
+import json
+
+import pytest
+import tomli_w
+import yaml
+
+from mavsec.project import Project
+
+
+_DUMPS = {
+  ".json": json.dumps,
+  ".yaml": lambda data: yaml.dump(data, Dumper=yaml.SafeDumper),
+  ".toml": tomli_w.dumps,
+}
+
+
+@pytest.mark.parametrize("suffix", list(_DUMPS))
+@pytest.mark.parametrize("count", [0, 1, 600])
+def test_streamed_save(tmp_path, suffix, count, make_project):
+  proj = make_project(count)
+  path = tmp_path.joinpath("proj" + suffix)
+  proj.to_file(path)
+
+  # Writing the properties a few at a time gives the same file as dumping them all at once
+  assert path.read_text() == _DUMPS[suffix](proj.to_dict())
+  assert Project.from_file(path, use_cache=False).to_dict() == proj.to_dict()
+
+
+@pytest.mark.parametrize("suffix", [*_DUMPS, ".jsonl"])
+def test_failed_save_keeps_file(tmp_path, suffix, make_project):
+  path = tmp_path.joinpath("proj" + suffix)
+  make_project(300).to_file(path)
+  path.chmod(0o640)
+  before = path.read_bytes()
+
+  broken = make_project(600)
+  broken.properties[550].meta["key_size"] = object()
+  with pytest.raises(Exception):
+    broken.to_file(path)
+
+  assert path.read_bytes() == before
+  assert [p.name for p in tmp_path.iterdir()] == [path.name]
+
+  make_project(10).to_file(path)
+  assert path.stat().st_mode & 0o777 == 0o640
@@ -0,0 +1,67 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+
+import pytest
+
+from mavsec.properties import Property
+from mavsec.search import SearchIndex
+
+
+@pytest.fixture
+def props(make_key) -> list[Property]:
+  return [make_key(f"Key {i}", f"u_core{i % 4}.key{i}", description="Line one\nline two")
+          for i in range(200)]
+
+
+def _brute(props: list[Property], query: str) -> list[int]:
+  texts = [f"{p.name} {p.description} {p.type_name()} {p.meta['key_loc']}".lower() for p in props]
+  return [i for i, text in enumerate(texts) if all(term in text for term in query.lower().split())]
+
+
+def test_search_terms(props):
+  index = SearchIndex(props)
+
+  assert index.search("") == list(range(200))
+  assert index.search("KEY 123") == [123]
+  assert index.search("u_core3.key1 ") == _brute(props, "u_core3.key1")
+  assert index.search("securekey one two") == list(range(200))
+  assert index.search("key 1 two securekey") == _brute(props, "key 1")
+  assert index.search("zzz") == []
+
+  # Narrowing the previous query, as when typing, gives the same answer
+  for end in range(1, 13):
+    assert index.search("u_core3.key1"[:end]) == _brute(props, "u_core3.key1"[:end])
+
+
+def test_search_updates(props, make_key):
+  index = SearchIndex(props)
+  assert index.search("u_top") == []
+
+  props[7].meta["key_loc"] = "u_top.secret"
+  index.update(7, props[7])
+  assert index.search("secret") == [7]
+  assert index.search("key7") == _brute(props, "key7")
+
+  props.insert(0, make_key("Inserted", "u_top.other"))
+  index.insert(0, props[0])
+  assert index.search("u_top") == [0, 8]
+
+  del props[8]
+  index.remove(8)
+  assert index.search("u_top") == [0]
+  assert len(index) == 200
@@ -0,0 +1,100 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+
+import pytest
+
+from mavsec.project import Project, ProjectInfo
+from mavsec.properties import Property, SecureKeyGenProperty, SecureKeyProperty
+from mavsec.store import ProjectStore, StoreProperties
+
+
+def _project() -> Project:
+  props = []
+  for i in range(6):
+    props.append(Property(f"Key {i}", "", {
+      "key_loc": ["key", "key[3]", "key.lo", "key_en", "core.key", "key"][i],
+      "key_size": 8, "public_bus": "prdata",
+    }, SecureKeyProperty))
+  props.append(Property("Gen", "", {
+    "public_key_loc": "key.pub", "key_size": 8, "public_bus": "prdata",
+  }, SecureKeyGenProperty))
+  return Project(ProjectInfo("store", "1.0", "A store", rtl_filelist="design.f"), props)
+
+
+def test_round_trip(tmp_path):
+  proj = _project()
+  proj.to_file(tmp_path.joinpath("proj.db"))
+
+  opened = Project.from_file(tmp_path.joinpath("proj.db"))
+  assert isinstance(opened.properties, StoreProperties)
+  assert opened.info == ProjectInfo("store", "1.0", "A store", rtl_filelist="design.f")
+  assert opened.properties[3] == proj.properties[3]
+  assert opened.properties.materialized() == 1
+  assert list(opened.properties) == proj.properties
+  assert opened.properties.materialized() == 1
+
+  # Exporting goes through the usual formats
+  opened.to_file(tmp_path.joinpath("proj.yaml"))
+  assert Project.from_file(tmp_path.joinpath("proj.yaml")).to_dict() == proj.to_dict()
+
+  with pytest.raises(FileNotFoundError):
+    Project.from_file(tmp_path.joinpath("missing.db"))
+
+
+def test_find(tmp_path):
+  store = ProjectStore.create(tmp_path.joinpath("proj.db"), _project())
+
+  assert store.find(ptype=SecureKeyProperty, rtl="key") == [0, 1, 2, 5]
+  assert store.find(rtl="key") == [0, 1, 2, 5, 6]
+  assert store.find(rtl="key[3]") == [1]
+  assert store.find(name="Gen") == [6]
+  assert store.find(name="Gen", ptype="SecureKey") == []
+  assert store.find() == list(range(7))
+
+  plan = " ".join(
+    row[-1] for row in store._db.execute(
+      "EXPLAIN QUERY PLAN SELECT property FROM rtl_paths WHERE path = 'key'"
+    )
+  )
+  assert "rtl_paths_path" in plan
+
+
+def test_edits_are_committed(tmp_path):
+  path = tmp_path.joinpath("proj.db")
+  _project().to_file(path)
+  proj = Project.from_file(path)
+  props = proj.properties
+  assert isinstance(props, StoreProperties)
+
+  props[0].meta["key_loc"] = "secret"
+  props.changed(0)
+  props.insert(1, Property("New", "", {"key_loc": "key"}, SecureKeyProperty))
+  del props[3]
+  props.append(Property("Last", "", {}, SecureKeyProperty))
+
+  # Every change is in the file without saving the project
+  reopened = Project.from_file(path).properties
+  assert [prop.name for prop in reopened][:4] == ["Key 0", "New", "Key 1", "Key 3"]
+  assert reopened[-1].name == "Last"
+  assert isinstance(reopened, StoreProperties)
+  assert reopened.store.find(rtl="secret") == [0]
+  assert reopened.store.find(rtl="key.lo") == []
+
+  proj.info.version = "2.0"
+  proj.to_file(path)
+  assert Project.from_file(path).info.version == "2.0"
@@ -0,0 +1,181 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+
+import pathlib
+
+import pytest
+
+from mavsec.project import Project, ProjectInfo
+from mavsec.rtl import DesignIndex
+from mavsec.validate import Severity, Validator
+from mavsec import properties, svp
+
+
+EXAMPLES = pathlib.Path(__file__).parent.parent.joinpath("examples")
+
+
+def test_special_path_loop():
+  prop = properties.Property(
+    "OTP Key", "",
+    {"key_loc": "key", "key_size": 0, "public_bus": "@OUTPUTS"},
+    properties.SecureKeyProperty,
+    ["pprot[2]==0", "pprot[1]==0"]
+  )
+
+  assert prop.to_svp().splitlines()[3:] == [
+    "foreach output [get_design_info -list output] {",
+    "    check_spv -create -name otp_key_${output}_precond0 -from key -to $output"
+    " -to_precond pprot\\[2\\]==0",
+    "    check_spv -create -name otp_key_${output}_precond1 -from key -to $output"
+    " -to_precond pprot\\[1\\]==0",
+    "}",
+  ]
+
+
+def test_multiline_precondition():
+  prop = properties.Property(
+    "OTP Key", "",
+    {"key_loc": "key", "key_size": 0, "public_bus": "prdata"},
+    properties.SecureKeyProperty,
+    "pprot[2]==0\r\npprot[1]==0"
+  )
+  proj = Project(ProjectInfo("multi", "1.0", ""), [prop])
+
+  assert prop.to_svp().splitlines()[-1] == (
+    "check_spv -create -name otp_key_precond0 -from key -to prdata"
+    " -to_precond pprot\\[2\\]==0\\r\\npprot\\[1\\]==0"
+  )
+  defs = svp.precondition_defs(proj.precondition_defs()).splitlines()
+  assert defs[-1].endswith(" pprot\\[2\\]==0\\r\\npprot\\[1\\]==0")
+
+
+def test_integrity_flow():
+  prop = properties.Property(
+    "OTP Key Integrity", "",
+    {"key_loc": "key", "key_size": 0, "public_bus": "pwdata"},
+    properties.SecureKeyIntegrityProperty
+  )
+
+  assert prop.to_svp().splitlines()[-1] == (
+    "check_spv -create -name otp_key_integrity -from pwdata -to key"
+  )
+
+
+def test_project_tcl(tmp_path):
+  proj = Project.from_file(EXAMPLES.joinpath("one-time-pad.yaml"), use_cache=False)
+  out = tmp_path.joinpath("otp.tcl")
+  proj.to_tcl(out)
+
+  text = out.read_text()
+  assert text.startswith("clear -all\ncheck_spv -init\n")
+  assert text.endswith("check_spv -prove\n")
+  assert text.count("check_spv -create") == 4
+
+
+def test_incremental_tcl(tmp_path):
+  proj = Project.from_file(EXAMPLES.joinpath("one-time-pad.yaml"), use_cache=False)
+  out = tmp_path.joinpath("otp.tcl")
+
+  assert proj.to_tcl(out, incremental=True) == 3
+  assert proj.to_tcl(out, incremental=True) == 0
+
+  proj.properties[1].meta["public_bus"] = "paddr"
+  assert proj.to_tcl(out, incremental=True) == 1
+
+  full = tmp_path.joinpath("full.tcl")
+  proj.to_tcl(full)
+  assert out.read_bytes() == full.read_bytes()
+
+
+def test_failed_tcl(tmp_path):
+  proj = Project.from_file(EXAMPLES.joinpath("one-time-pad.yaml"), use_cache=False)
+  out = tmp_path.joinpath("otp.tcl")
+  proj.to_tcl(out)
+  before = out.read_bytes()
+
+  proj.properties.append(properties.Property(
+    "Broken", "", {"key_loc": "key", "key_size": 0}, properties.SecureKeyProperty
+  ))
+  with pytest.raises(ValueError, match="public_bus"):
+    proj.to_tcl(out)
+  assert out.read_bytes() == before
+  assert list(tmp_path.iterdir()) == [out]
+
+
+def _design(tmp_path: pathlib.Path, outputs: str) -> DesignIndex:
+  tmp_path.joinpath("top.v").write_text(
+    f"module otp_top(input clk, input [7:0] paddr, output [7:0] {outputs});\nendmodule\n"
+  )
+  tmp_path.joinpath("design.f").write_text("top.v\n")
+  return DesignIndex.from_filelist(tmp_path.joinpath("design.f"), use_cache=False)
+
+
+def test_design_ports(tmp_path):
+  proj = Project.from_file(EXAMPLES.joinpath("one-time-pad.yaml"), use_cache=False)
+  out = tmp_path.joinpath("otp.tcl")
+  design = _design(tmp_path, "prdata, pslverr")
+
+  assert design.resolve(properties.SpecialRtlPaths.OUTPUTS) == ["prdata", "pslverr"]
+  assert design.resolve(properties.SpecialRtlPaths.OUTPUTS) is design.resolve(
+    properties.SpecialRtlPaths.OUTPUTS
+  )
+
+  proj.to_tcl(out, design=design)
+  text = out.read_text()
+  assert "set mavsec_outputs [list prdata pslverr]\n" in text
+  assert "mavsec_inputs" not in text
+  assert "foreach output $mavsec_outputs {" in text
+  assert "get_design_info" not in text
+
+  # A change to the ports is picked up even when no property changed
+  assert proj.to_tcl(out, incremental=True, design=design) == 3
+  assert proj.to_tcl(out, incremental=True, design=design) == 0
+  assert proj.to_tcl(out, incremental=True, design=_design(tmp_path, "prdata")) == 0
+  assert "set mavsec_outputs [list prdata]\n" in out.read_text()
+
+
+def test_ambiguous_top(tmp_path):
+  tmp_path.joinpath("top.v").write_text(
+    "module a(output x);\nendmodule\nmodule b(output y);\nendmodule\n"
+  )
+  tmp_path.joinpath("design.f").write_text("top.v\n")
+  design = DesignIndex.from_filelist(tmp_path.joinpath("design.f"), use_cache=False)
+  prop = properties.Property(
+    "Key", "", {"key_loc": "key", "key_size": 0, "public_bus": "prdata"},
+    properties.SecureKeyProperty
+  )
+  proj = Project(ProjectInfo("two-roots", "1.0", ""), [prop])
+
+  # Only the special paths the properties use need the top module
+  proj.to_tcl(tmp_path.joinpath("out.tcl"), design=design)
+  assert "Design Ports" not in tmp_path.joinpath("out.tcl").read_text()
+
+  prop.meta["public_bus"] = "@OUTPUTS"
+  found = [(d.severity, d.field, d.message) for d in Validator(design).check(proj)]
+  assert found == [
+    (Severity.WARNING, "meta.key_loc", "the top module of the design isn't known, set rtl_top"),
+    (Severity.ERROR, "meta.public_bus",
+     "can't expand @OUTPUTS, the top module of the design isn't known, set rtl_top"),
+  ]
+  with pytest.raises(ValueError, match="rtl_top"):
+    proj.to_tcl(tmp_path.joinpath("out.tcl"), design=design)
+
+  design = DesignIndex.from_filelist(tmp_path.joinpath("design.f"), "c", use_cache=False)
+  found = [d.message for d in Validator(design).check(proj)]
+  assert found == ["the top module c is not in the design",
+                   "can't expand @OUTPUTS, the top module c is not in the design"]
@@ -0,0 +1,84 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+
+import json
+import pathlib
+import shutil
+
+import pytest
+
+from mavsec import cli, trace
+
+
+EXAMPLES = pathlib.Path(__file__).parent.parent.joinpath("examples")
+
+
+@pytest.fixture(autouse=True)
+def _clean_trace():
+  trace.reset()
+  yield
+  trace.disable()
+  trace.reset()
+
+
+def test_disabled():
+  with trace.span("load"):
+    trace.count("properties")
+  assert trace.take() == ([], {})
+
+
+def test_spans_and_counters(tmp_path):
+  trace.enable()
+  with trace.span("load", file="a.yaml"):
+    with trace.span("parse"):
+      trace.count("properties", 3)
+  trace.count("properties")
+
+  events = trace.chrome_events()
+  assert [(e["name"], e["ph"]) for e in events] == [
+    ("parse", "X"), ("load", "X"), ("properties", "C")
+  ]
+  parse, load = events[0], events[1]
+  assert load["args"] == {"file": "a.yaml"}
+  assert load["ts"] <= parse["ts"] and parse["ts"] + parse["dur"] <= load["ts"] + load["dur"]
+  assert events[2]["args"] == {"value": 4}
+
+  lines = trace.summary().splitlines()
+  assert lines[0].split() == ["span", "calls", "total", "s", "mean", "ms", "max", "ms"]
+  assert [line.split()[:2] for line in lines[1:3]] == [["load", "1"], ["parse", "1"]]
+  assert lines[-1].split() == ["properties", "4"]
+
+  trace.write_chrome(tmp_path.joinpath("trace.json"))
+  assert json.loads(tmp_path.joinpath("trace.json").read_text())["traceEvents"] == events
+
+
+def test_cli_trace(tmp_path, capsys):
+  for i in range(2):
+    shutil.copy(EXAMPLES.joinpath("one-time-pad.yaml"), tmp_path.joinpath(f"otp{i}.yaml"))
+  out = tmp_path.joinpath("trace.json")
+
+  assert cli.main([
+    "--trace", str(out), "--profile", "build", str(tmp_path.joinpath("*.yaml")), "-j", "2"
+  ]) == 0
+
+  events = json.loads(out.read_text())["traceEvents"]
+  # The spans of the worker processes are sent back to the parent
+  names = [e["name"] for e in events if e["ph"] == "X"]
+  assert sorted(set(names)) == ["build", "emit", "from_dict", "from_file", "parse"]
+  assert names.count("build") == 2
+  assert "properties.emitted" in capsys.readouterr().err
@@ -0,0 +1,49 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+
+from mavsec.project import Project, ProjectInfo
+from mavsec.validate import Severity, Validator
+
+
+def test_diagnostics(make_key):
+  proj = Project(ProjectInfo("", "", ""), [
+    make_key("Good"),
+    make_key("Bad", key_loc="", key_size="128", public_bus="@NOWHERE", extra=1),
+    make_key("good"),
+  ])
+
+  found = [(d.severity, d.index, d.field) for d in Validator().check(proj)]
+  assert found == [
+    (Severity.ERROR, 1, "meta.key_loc"),
+    (Severity.ERROR, 1, "meta.key_size"),
+    (Severity.ERROR, 1, "meta.public_bus"),
+    (Severity.WARNING, 1, "meta.extra"),
+    (Severity.ERROR, 2, "name"),
+  ]
+
+
+def test_cached_recheck(make_key):
+  proj = Project(ProjectInfo("", "", ""), [make_key(f"Key {i}") for i in range(1000)])
+  validator = Validator()
+
+  assert validator.check(proj) == []
+  assert validator.checked == 1000
+
+  proj.properties[10].meta["key_loc"] = ""
+  assert len(validator.check(proj)) == 1
+  assert validator.checked == 1
@@ -0,0 +1,136 @@
+#####################################################################################
+# A tool for the creation of JasperGold SVP principle tcl files.
+# Copyright (C) 2024  RISCY-Lib Contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#####################################################################################
+
+import threading
+import time
+
+import pytest
+
+from mavsec import watch
+
+
+def test_session(chip, make_props, write_json):
+  root = chip.parent
+  session = watch.WatchSession(chip)
+  first = session.build()
+  assert first.error is None
+  assert first.design and first.emitted == 5
+  assert [prop.name for prop in session.project.properties] == \
+    ["top", "cpu0", "cpu1", "gpio_a", "uart"]
+  files, globs = session.watched()
+  assert root.joinpath("top.v").resolve() in files and root.joinpath("design.f") in files
+  assert globs == [str(root.joinpath("periph/*.json")), str(root.joinpath("periph/gpio/*.json"))]
+
+  # Only the changed file is read and only its changed property is regenerated
+  props = list(session.project.properties)
+  cpu = root.joinpath("cpu.json")
+  write_json(cpu, {"properties": make_props("cpu0") + make_props("cpu1", bus="pwdata")})
+  report = session.build({cpu})
+  assert report.reloaded == [cpu]
+  assert not report.design and report.emitted == 1
+  now = session.project.properties
+  assert now[0] is props[0] and now[1] is props[1] and now[3] is props[3] and now[4] is props[4]
+  assert now[2] is not props[2]
+
+  # A change to the RTL doesn't read the project again
+  root.joinpath("top.v").write_text("module chip(input clk, output [7:0] prdata, pready);\n"
+                                    "endmodule\n")
+  report = session.build({root.joinpath("top.v")})
+  assert report.reloaded == [] and report.design and report.emitted == 0
+  assert "set mavsec_outputs [list prdata pready]" in root.joinpath("chip.tcl").read_text()
+
+  # A new file matching a glob is picked up
+  gpio = root.joinpath("periph/gpio/b.json")
+  write_json(gpio, make_props("gpio_b"))
+  report = session.build({gpio})
+  assert report.reloaded == [gpio]
+  assert session.project.properties[4].name == "gpio_b"
+
+
+def test_failed_build(chip, make_props, write_json):
+  uart = chip.parent.joinpath("periph/uart.json")
+  session = watch.WatchSession(chip)
+  session.build()
+  project = session.project
+
+  uart.write_text("[{")
+  report = session.build({uart})
+  assert report.error is not None and report.summary().startswith("failed: ")
+  assert session.project is project
+
+  write_json(uart, make_props("uart", "cpu0"))
+  report = session.build({uart})
+  assert "'cpu0' is in both" in report.error
+
+  write_json(uart, make_props("uart", "uart2"))
+  assert session.build({uart}).emitted == 1
+
+
+def _watchers() -> list:
+  watchers = [watch.PollingWatcher(0.02)]
+  try:
+    watchers.append(watch.InotifyWatcher())
+  except OSError:
+    pass
+  return watchers
+
+
+@pytest.mark.parametrize("watcher", _watchers(), ids=lambda w: type(w).__name__)
+def test_watcher(tmp_path, watcher, write_json):
+  target = tmp_path.joinpath("a.json")
+  write_json(target, [])
+  watcher.watch([target], [str(tmp_path.joinpath("new/*.json"))])
+  tmp_path.joinpath("new").mkdir()
+  watcher.watch([target], [str(tmp_path.joinpath("new/*.json"))])
+
+  assert watcher.poll(0.05) == set()
+  tmp_path.joinpath("other.txt").write_text("not watched")
+  assert watcher.poll(0.1) == set()
+
+  def edit() -> None:
+    time.sleep(0.05)
+    for i in range(3):
+      write_json(target, [i])
+    write_json(tmp_path.joinpath("new/b.json"), [])
+
+  thread = threading.Thread(target=edit, daemon=True)
+  thread.start()
+  changed = watcher.wait(debounce=0.3)
+  thread.join()
+  watcher.close()
+  assert changed == {target, tmp_path.joinpath("new/b.json")}
+
+
+def test_watch_loop(chip, make_props, write_json):
+  session = watch.WatchSession(chip)
+  reports = []
+  built = threading.Event()
+
+  def on_build(report) -> None:
+    reports.append(report)
+    built.set()
+
+  def edit() -> None:
+    if built.wait(10):
+      write_json(chip.parent.joinpath("periph/uart.json"), make_props("uart", "uart1"))
+
+  thread = threading.Thread(target=edit, daemon=True)
+  thread.start()
+  watch.watch(session, watch.PollingWatcher(0.02), 0.05, on_build, builds=2)
+  thread.join()
+  assert [report.emitted for report in reports] == [5, 1]